@@ -1,19 +1,192 @@
-import time
-class Notifier:
-    def __init__(self, board, gpio_cfg):
-        self.board = board
-        self.on_ms = gpio_cfg["buzzer_on_ms"]
-        self.off_ms = gpio_cfg["buzzer_off_ms"]
-        self._last = 0.0
-        self._beep_on = False
-
-    def alert(self, active: bool):
-        if not active:
-            self.board.led_off(); self.board.buzz_off(); self._beep_on = False
-            return
-        self.board.led_on()
-        now = time.time()*1000
-        if not self._beep_on and now - self._last > self.off_ms:
-            self.board.buzz_on(); self._beep_on = True; self._last = now
-        elif self._beep_on and now - self._last > self.on_ms:
-            self.board.buzz_off(); self._beep_on = False; self._last = now
+import time
+import threading
+
+
+# ---------------------------------------
+#   alert 타입 → 경보 레벨
+#   (write_csv의 SAFE / WARNING / DANGER 구분과 동일)
+# ---------------------------------------
+LEVELS = ("safe", "warning", "danger")
+
+
+def level_for(alert_type):
+    if alert_type == "ok":
+        return "safe"
+    if alert_type in ["no_helmet", "no_vest"]:
+        return "warning"
+    return "danger"
+
+
+def default_patterns(gpio_cfg):
+    """
+    레벨별 LED/부저 패턴.
+    각 단계는 {"led": bool, "buzz": bool, "ms": 유지시간} 이고 끝나면 처음부터 반복.
+    빈 리스트는 전부 OFF.
+    """
+    on_ms = gpio_cfg.get("buzzer_on_ms", 500)
+    off_ms = gpio_cfg.get("buzzer_off_ms", 500)
+    return {
+        "safe": [],
+        "warning": [
+            {"led": True, "buzz": True, "ms": on_ms},
+            {"led": True, "buzz": False, "ms": off_ms},
+        ],
+        "danger": [
+            {"led": True, "buzz": True, "ms": max(1, on_ms // 2)},
+            {"led": False, "buzz": False, "ms": max(1, off_ms // 2)},
+        ],
+    }
+
+
+def _check_patterns(patterns):
+    """모양 / 값이 틀리면 ValueError (hot reload가 잡아서 이전 설정 유지)."""
+    for level, steps in patterns.items():
+        if steps is None:
+            continue
+        if not isinstance(steps, list):
+            raise ValueError(f"pattern '{level}': expected a list of steps, got {steps!r}")
+        for st in steps:
+            if not isinstance(st, dict):
+                raise ValueError(f"pattern '{level}': step must be a mapping like "
+                                 f"{{led: true, buzz: false, ms: 200}}, got {st!r}")
+            ms = st.get("ms", 0)
+            if isinstance(ms, bool) or not isinstance(ms, (int, float)):
+                raise ValueError(f"pattern '{level}': step ms must be a number, got {ms!r}")
+            if ms <= 0:
+                raise ValueError(f"pattern '{level}': step ms must be > 0")
+            for k in ("led", "buzz"):
+                if not isinstance(st.get(k, False), bool):
+                    raise ValueError(f"pattern '{level}': step {k} must be true/false, got {st[k]!r}")
+
+
+class PatternPlayer:
+    """
+    프레임 속도와 상관없이 시간 기준으로 패턴을 재생하는 엔진.
+    - set_level()로 원하는 레벨만 바꿔주면 되고
+    - 실제 GPIO 토글은 전용 스레드(start) 또는 tick() 호출로 진행된다.
+    board는 led_on/led_off/buzz_on/buzz_off 만 있으면 되므로 가짜 GPIOBoard로도 테스트 가능.
+    """
+
+    def __init__(self, board, patterns, clock=time.monotonic):
+        _check_patterns(patterns)
+        self.board = board
+        self.patterns = patterns
+        self.clock = clock
+
+        self.level = "safe"
+        self._step = 0
+        self._step_start = 0.0
+        self._led = None     # 마지막으로 보드에 쓴 값 (None: 아직 모름)
+        self._buzz = None
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ------------------------------------------------------------------
+    def set_level(self, level):
+        if level not in self.patterns:
+            raise ValueError(f"unknown alert level: {level}")
+        with self._lock:
+            if level == self.level:
+                return
+            self.level = level
+            self._step = 0
+            self._step_start = self.clock()
+        self._wake.set()
+
+    def set_patterns(self, patterns):
+        _check_patterns(patterns)
+        with self._lock:
+            self.patterns = patterns
+            if self.level not in patterns:
+                self.level = "safe"
+            self._step = 0
+            self._step_start = self.clock()
+        self._wake.set()
+
+    def tick(self, now=None):
+        """
+        현재 시각 기준으로 출력 상태를 맞추고,
+        다음 상태 변화까지 남은 시간(초)을 리턴. 패턴이 없으면 None.
+        """
+        with self._lock:
+            if now is None:
+                now = self.clock()
+            steps = self.patterns.get(self.level) or []
+
+            if not steps:
+                self._apply(False, False)
+                return None
+
+            # 밀린 단계는 건너뛰기 (스레드가 늦게 깨어나도 박자 유지)
+            elapsed = (now - self._step_start) * 1000.0
+            while elapsed >= steps[self._step]["ms"]:
+                elapsed -= steps[self._step]["ms"]
+                self._step_start += steps[self._step]["ms"] / 1000.0
+                self._step = (self._step + 1) % len(steps)
+
+            cur = steps[self._step]
+            self._apply(cur.get("led", False), cur.get("buzz", False))
+            return (cur["ms"] - elapsed) / 1000.0
+
+    def _apply(self, led, buzz):
+        # 값이 바뀔 때만 GPIO 호출
+        if led != self._led:
+            self.board.led_on() if led else self.board.led_off()
+            self._led = led
+        if buzz != self._buzz:
+            self.board.buzz_on() if buzz else self.board.buzz_off()
+            self._buzz = buzz
+
+    # ------------------------------------------------------------------
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        with self._lock:
+            self._apply(False, False)
+
+    def _run(self):
+        while not self._stop.is_set():
+            wait = self.tick()
+            self._wake.wait(wait)
+            self._wake.clear()
+
+
+class Notifier:
+    def __init__(self, board, gpio_cfg, start=True):
+        self.board = board
+        self.player = PatternPlayer(board, self._patterns(gpio_cfg))
+        if start:
+            self.player.start()
+
+    @staticmethod
+    def _patterns(gpio_cfg):
+        patterns = default_patterns(gpio_cfg)
+        patterns.update(gpio_cfg.get("patterns") or {})
+        return patterns
+
+    def reconfigure(self, gpio_cfg):
+        """패턴만 교체 (hot reload). 핀 번호 변경은 재시작해야 반영된다."""
+        self.player.set_patterns(self._patterns(gpio_cfg))
+
+    def set_level(self, level):
+        self.player.set_level(level)
+
+    def alert(self, active: bool):
+        # 예전 인터페이스 호환: True면 warning 패턴
+        self.set_level("warning" if active else "safe")
+
+    def close(self):
+        self.player.stop()
@@ -0,0 +1,419 @@
+"""
+녹화 영상 오프라인 일괄 분석 (안전 감사용).
+
+영상 파일 여러 개, 또는 긴 파일 하나를 chunk로 나눠서 프로세스 풀에 나눠 주고
+워커마다 자기 detector + HelmetJudge로 돌린 뒤
+결과를 시간순 이벤트 로그(CSV) 하나로 합친다.
+
+    python batch.py videos/*.mp4 --workers 4
+    python batch.py long.mp4 --chunk-s 300 --out audit.csv
+    python batch.py videos/*.mp4 --stride 3             # 3프레임마다 하나만 분석
+    python batch.py clips/*.mp4 --source synth          # 모델 없이 파이프라인 / 처리량 확인
+
+끝난 chunk는 <out>.ckpt 에 바로 기록되고, 중단 후 같은 명령을 다시 실행하면 남은 chunk만 돈다
+(설정이 바뀌었으면 --fresh 로 새로 시작). 열 수 없는 파일 / 에러 난 chunk는 로그만 남기고 건너뛰며
+(종료 코드 1), 다시 실행하면 그 chunk만 다시 돈다.
+
+워커는 프레임마다 독립인 부분(디코딩, detection, 사람별 판정)만 하고, 프레임 사이에 이어지는 상태
+(vest 히스토리, TemporalSmoother)는 메인 프로세스가 파일 순서대로 다시 돌린다. 그래서 chunk로 나눠도
+결과는 파일 전체를 한 번에 돌린 것과 같다 (bench/batch_equiv.py).
+
+출력 CSV: time,file,frame,event,detail
+  alert       detail = ok / no_helmet / no_vest / no_both (main.py와 같은 규칙, 바뀔 때만)
+  unsafe_on / unsafe_off   smoothing 후 알림 상태가 바뀐 프레임
+파일 시작 시각은 파일 이름의 YYYYmmdd_HHMMSS (clips 이름 형식), 없으면 수정 시각 - 길이.
+"""
+import argparse
+import csv
+import hashlib
+import heapq
+import json
+import logging
+import multiprocessing as mp
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+import yaml
+
+import resources
+
+log = logging.getLogger("batch")
+
+_STAMP = re.compile(r"(\d{8}_\d{6})")
+
+
+# ---------------------------------------
+#   작업 나누기
+# ---------------------------------------
+def probe(path):
+    """(fps, 프레임 수). 프레임 수를 모르는 컨테이너면 0."""
+    import cv2
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f"cannot open video: {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    n = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    cap.release()
+    return (fps if fps > 0 else 30.0), max(0, n)
+
+
+def file_start(path, duration_s):
+    m = _STAMP.search(os.path.basename(path))
+    if m:
+        try:
+            return datetime.strptime(m.group(1), "%Y%m%d_%H%M%S").timestamp()
+        except ValueError:
+            pass
+    return os.path.getmtime(path) - duration_s
+
+
+def plan(files, chunk_s):
+    """
+    [(key, path, fps, start, end)] (end=None 이면 파일 끝까지), {path: 시작 시각}, 전체 프레임 수,
+    열 수 없는 파일 {path: 에러} (로그만 남기고 나머지 파일은 그대로 분석).
+    """
+    jobs, starts, total, bad = [], {}, 0, {}
+    for path in files:
+        try:
+            fps, n = probe(path)
+        except ValueError as e:
+            log.error("[BATCH] skipping %s: %s", path, e)
+            bad[path] = str(e)
+            continue
+        starts[path] = file_start(path, n / fps)
+        total += n
+        step = int(chunk_s * fps) if chunk_s > 0 and n > 0 else 0
+        bounds = list(range(0, n, step)) if step else [0]
+        for i, s in enumerate(bounds):
+            e = bounds[i + 1] if i + 1 < len(bounds) else None
+            jobs.append((f"{path}|{s}|{e}", path, fps, s, e))
+        log.info("[BATCH] %s: %d frames @ %.1ffps -> %d chunk(s)", path, n, fps, len(bounds))
+    return jobs, starts, total, bad
+
+
+# ---------------------------------------
+#   워커: 프레임마다 독립인 부분만 (디코딩, detection, HelmetJudge.observe, alert 규칙)
+#
+#   프레임 사이에 이어지는 상태(vest 히스토리, TemporalSmoother)는 chunk 앞 warmup으로는
+#   다시 만들 수 없다 (vest latch는 한 번 정해지면 사람이 없는 구간을 지나도 파일 끝까지 간다).
+#   그래서 워커는 프레임마다 관측값 한 글자만 돌려주고, 상태는 replay()가 파일 순서대로 다시 돌린다.
+# ---------------------------------------
+_W = {}
+
+ALERTS = ("ok", "no_helmet", "no_vest", "no_both")
+_ALERT_CODE = {a: n for n, a in enumerate(ALERTS)}
+
+
+def _encode(helmet_safe, vest_cnt, no_vest_cnt, alert):
+    """프레임 하나의 관측값 → 한 글자 ('0' + 5비트)."""
+    return chr(48 + (helmet_safe | (vest_cnt > 0) << 1 | (no_vest_cnt > 0) << 2 | _ALERT_CODE[alert] << 3))
+
+
+def _init_worker(cfg, source, threads, counter):
+    logging.disable(logging.INFO)          # HJ / 모델 로그는 끄고 돌림
+    res = resources.ResourceManager({"enabled": True, "torch_threads": threads, "opencv_threads": threads})
+    if source:
+        from soak import build_source
+        _, det = build_source(source, cfg["camera"])
+    else:
+        from infer_yolo import build_detector
+        det = build_detector(cfg["inference"])
+    res.apply_libs()
+    _setup_worker(det, cfg, counter)
+
+
+def _setup_worker(det, cfg, counter):
+    det.depth = 1
+    _W.update(det=det, logic=cfg["logic"], counter=counter, stride=cfg["batch_stride"])
+
+
+def _run_chunk(job):
+    """chunk 하나 분석 → (key, 프레임 수, 관측값 문자열, 걸린 시간)."""
+    import cv2
+    from rules import HelmetJudge, alert_type, analyze_safety
+
+    key, path, fps, start, end = job
+    det, stride, counter = _W["det"], _W["stride"], _W["counter"]
+    names = det.names
+    judge = HelmetJudge(_W["logic"])
+    judge._ensure_ids(names)
+
+    cap = cv2.VideoCapture(path)
+    if start:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    obs = []
+    pending = 0
+    t0 = time.perf_counter()
+    i = start
+    while end is None or i < end:
+        if i % stride:                      # 건너뛰는 프레임은 디코딩 안 하고 grab만
+            if not cap.grab():
+                break
+            i += 1
+            continue
+        ok, frame = cap.read()
+        if not ok:
+            break
+        dets = det.infer(frame)
+        helmet_cnt, no_helmet_cnt, vest_cnt, no_vest_cnt, _ = judge.observe(frame, dets)
+        obs.append(_encode(helmet_cnt > 0 and no_helmet_cnt == 0, vest_cnt, no_vest_cnt,
+                           alert_type(*analyze_safety(dets, names))))
+        pending += 1
+        if pending >= 32:
+            with counter.get_lock():
+                counter.value += pending
+            pending = 0
+        i += 1
+    cap.release()
+    with counter.get_lock():
+        counter.value += pending
+    return key, len(obs), "".join(obs), time.perf_counter() - t0
+
+
+# ---------------------------------------
+#   이벤트: 파일마다 chunk 순서대로 관측값을 HelmetJudge.decide + TemporalSmoother로
+# ---------------------------------------
+def replay(path, base, chunks, logic, stride):
+    """
+    chunks: 파일 하나의 [(job, 기록 또는 None)] (시작 프레임 순). 이벤트 [[시각, path, frame, event, detail]].
+    기록이 없는 chunk(실패)는 건너뛰고 그 뒤는 앞 상태를 이어서 쓴다.
+    """
+    from rules import HelmetJudge
+    from temporal_lstm import TemporalSmoother
+
+    judge = HelmetJudge(logic)
+    smooth = TemporalSmoother(window=logic.get("temporal_window", 12))
+    threshold = logic.get("alert_threshold", 0.5)
+    events = []
+    prev_alert = prev_unsafe = None
+    for (key, _, fps, start, _), rec in chunks:
+        if rec is None:
+            log.warning("[BATCH] %s: no result for chunk %s, events right after it may differ", path, key)
+            continue
+        i = start + (-start % stride)
+        for c in rec["obs"]:
+            code = ord(c) - 48
+            unsafe_prob, _ = judge.decide(bool(code & 1), code & 2, code & 4)
+            smooth.push(unsafe_prob)
+            unsafe = smooth.decision() >= threshold
+            alert = ALERTS[code >> 3]
+            t = base + i / fps
+            if alert != prev_alert:
+                events.append([t, path, i, "alert", alert])
+            if unsafe != prev_unsafe and (prev_unsafe is not None or unsafe):
+                events.append([t, path, i, "unsafe_on" if unsafe else "unsafe_off", ""])
+            prev_alert, prev_unsafe = alert, unsafe
+            i += stride
+    return events
+
+
+def file_events(jobs, starts, done, logic, stride):
+    """파일마다 replay() → [파일별 이벤트 리스트] (각각 시간순)."""
+    by_file = {}
+    for job in jobs:
+        by_file.setdefault(job[1], []).append((job, done.get(job[0])))
+    return [replay(path, starts[path], chunks, logic, stride) for path, chunks in by_file.items()]
+
+
+# ---------------------------------------
+#   체크포인트: 첫 줄 설정, 이후 끝난 chunk마다 한 줄 (JSON)
+# ---------------------------------------
+CKPT_VERSION = 2        # 기록 형식이 바뀌면 올림 (예전 체크포인트는 --fresh 필요)
+
+
+def _fingerprint(cfg, args):
+    keys = {"logic": cfg["logic"], "inference": cfg["inference"], "source": args.source,
+            "chunk_s": args.chunk_s, "stride": args.stride, "files": sorted(args.files),
+            "version": CKPT_VERSION}
+    return hashlib.sha1(json.dumps(keys, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def load_checkpoint(path, fp):
+    """
+    끝난 chunk {key: 기록}. 설정이 다르면 ValueError.
+    잘린 줄, key 없는 줄(예전 버전이 다시 시작할 때마다 이어 쓴 설정 줄 등)은 무시.
+    """
+    done = {}
+    try:
+        f = open(path, "r", encoding="utf-8")
+    except FileNotFoundError:
+        return done
+    with f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(rec, dict):
+                continue
+            if "fingerprint" in rec:
+                if rec["fingerprint"] != fp:
+                    raise ValueError(f"{path} was made with different settings (use --fresh)")
+                continue
+            if "key" in rec:
+                done[rec["key"]] = rec
+    return done
+
+
+def open_checkpoint(path, fp):
+    """
+    이어 쓰기용으로 연다. 설정 줄은 새(빈) 파일에만 쓰고 (첫 chunk 전에 중단됐다가 다시 돌려도 한 번만),
+    마지막 줄이 잘려 있으면 줄을 바꾼 뒤 이어 쓴다 (안 그러면 다음 기록이 잘린 줄에 붙어서 같이 버려짐).
+    """
+    try:
+        with open(path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            tail = f.read(1)
+    except OSError:                         # 없거나 빈 파일
+        tail = b""
+    f = open(path, "a", encoding="utf-8")
+    if not tail:
+        _append(f, {"fingerprint": fp, "created": time.time()})
+    elif tail != b"\n":
+        f.write("\n")
+    return f
+
+
+def _append(f, rec):
+    f.write(json.dumps(rec, separators=(",", ":")) + "\n")
+    f.flush()
+    os.fsync(f.fileno())
+
+
+# ---------------------------------------
+#   실행
+# ---------------------------------------
+def run(pool, jobs, done, ck, progress=None, every_s=5.0):
+    """
+    done에 없는 jobs를 pool에서 돌려서 끝날 때마다 ck에 기록하고 done을 채운다.
+    에러 난 chunk는 로그만 남기고 넘어감 (체크포인트에 안 남으니 다시 실행하면 그것만 다시 돈다).
+    리턴: 실패한 chunk {key: 에러}.
+    """
+    futs = {pool.submit(_run_chunk, j): j for j in jobs if j[0] not in done}
+    pending = set(futs)
+    failed = {}
+    last = 0.0
+    while pending:
+        finished, pending = wait(pending, timeout=every_s, return_when=FIRST_COMPLETED)
+        for fut in finished:
+            job = futs[fut]
+            try:
+                key, n, obs, elapsed = fut.result()
+            except BrokenProcessPool:
+                raise
+            except Exception as e:
+                log.error("[BATCH] chunk %s failed: %r", job[0], e)
+                failed[job[0]] = repr(e)
+                continue
+            rec = {"key": key, "frames": n, "elapsed_s": round(elapsed, 3), "obs": obs}
+            _append(ck, rec)
+            done[key] = rec
+            log.info("[BATCH] chunk %s done: %d frames, %.1f fps", key, n, n / elapsed if elapsed > 0 else 0.0)
+        now = time.perf_counter()
+        if progress and (now - last >= every_s or not pending):
+            last = now
+            progress()
+    return failed
+
+
+def write_events(path, event_lists):
+    """파일마다 시간순인 이벤트를 heapq.merge로 한 번에 합쳐서 CSV로."""
+    merged = heapq.merge(*event_lists, key=lambda e: (e[0], e[1], e[2]))
+    n = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["time", "file", "frame", "event", "detail"])
+        for t, file, frame, event, detail in merged:
+            w.writerow([datetime.fromtimestamp(t).isoformat(timespec="milliseconds"),
+                        file, frame, event, detail])
+            n += 1
+    return n
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("files", nargs="+", help="영상 파일")
+    ap.add_argument("--config", default="config.yaml")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--threads", type=int, help="워커당 torch / OpenCV / BLAS 스레드 (기본: 코어 수 / workers)")
+    ap.add_argument("--chunk-s", type=float, default=300.0, help="파일을 이 길이(초)로 나눔. 0이면 파일 단위")
+    ap.add_argument("--stride", type=int, default=1, help="N프레임마다 하나만 분석")
+    ap.add_argument("--out", default="batch_events.csv")
+    ap.add_argument("--fresh", action="store_true", help="체크포인트 무시하고 처음부터")
+    ap.add_argument("--progress-s", type=float, default=5.0, help="진행 상황 출력 주기(초)")
+    ap.add_argument("--source", help="모델 대신 가짜 detection (synth / synth:<scene> / .ssdr)")
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    with open(args.config, "r", encoding="utf-8") as f:
+        cfg = yaml.safe_load(f)
+    cfg["batch_stride"] = max(1, args.stride)
+    args.stride = cfg["batch_stride"]
+
+    ckpt_path = args.out + ".ckpt"
+    fp = _fingerprint(cfg, args)
+    if args.fresh and os.path.exists(ckpt_path):
+        os.remove(ckpt_path)
+    try:
+        done = load_checkpoint(ckpt_path, fp)
+    except ValueError as e:
+        sys.exit(str(e))
+
+    jobs, starts, total, bad = plan(args.files, args.chunk_s)
+    total //= args.stride
+    prior = sum(c["frames"] for c in done.values())
+    if done:
+        log.info("[BATCH] resuming: %d/%d chunks already done (%d frames)", len(done), len(jobs), prior)
+
+    # 워커 수 x 스레드 수가 코어 수를 넘지 않게. BLAS는 워커가 import 하기 전에 환경 변수로
+    threads = args.threads or max(1, (os.cpu_count() or 1) // max(1, args.workers))
+    os.environ.update(resources.thread_env({"enabled": True, "blas_threads": threads}))
+    ctx = mp.get_context("spawn")
+    counter = ctx.Value("q", 0)
+
+    t_start = time.perf_counter()
+
+    def progress():
+        now = time.perf_counter()
+        run_frames = counter.value
+        fps = run_frames / (now - t_start) if now > t_start else 0.0
+        cur = prior + run_frames
+        eta = (total - cur) / fps if fps > 0 and total > cur else 0.0
+        log.info("[BATCH] %d/%d chunks, %d/%s frames (%.0f%%), %.1f fps, ETA %.0fs",
+                 len(done), len(jobs), cur, total or "?",
+                 100.0 * cur / total if total else 0.0, fps, eta)
+
+    with open_checkpoint(ckpt_path, fp) as ck:
+        pool = ProcessPoolExecutor(max_workers=max(1, args.workers), mp_context=ctx,
+                                   initializer=_init_worker,
+                                   initargs=(cfg, args.source, threads, counter))
+        try:
+            failed = run(pool, jobs, done, ck, progress, args.progress_s)
+        except KeyboardInterrupt:
+            pool.shutdown(wait=False, cancel_futures=True)
+            sys.exit(f"interrupted: {len(done)}/{len(jobs)} chunks saved in {ckpt_path}, run again to resume")
+        pool.shutdown()
+
+    elapsed = time.perf_counter() - t_start
+    n_events = write_events(args.out, file_events(jobs, starts, done, cfg["logic"], args.stride))
+    frames = sum(done[j[0]]["frames"] for j in jobs if j[0] in done)
+    run_frames = counter.value
+    print(f"{len(args.files)} file(s), {len(jobs)} chunk(s), {frames} frames analyzed "
+          f"({run_frames} this run in {elapsed:.1f}s = {run_frames / elapsed if elapsed > 0 else 0:.1f} fps, "
+          f"{max(1, args.workers)} workers x {threads} threads) -> {n_events} events in {args.out}")
+    if failed or bad:
+        for path, err in bad.items():
+            print(f"  skipped {path}: {err}")
+        for key, err in failed.items():
+            print(f"  failed chunk {key}: {err}")
+        msg = f"{len(bad)} file(s) skipped, {len(failed)} chunk(s) failed"
+        sys.exit(msg + ("; run again to retry the failed chunks" if failed else ""))
+
+
+if __name__ == "__main__":
+    main()
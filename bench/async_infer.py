@@ -0,0 +1,119 @@
+"""
+BaseDetector.submit / poll / result 파이프라인 측정.
+
+실제 Hailo 없이 가짜 hailo_rt(infer_async가 있는 런타임)를 HailoDetector에 끼워서
+host 작업(캡처 + 후처리)과 가속기 추론이 얼마나 겹치는지, depth별 FPS를 잰다.
+가짜 런타임은 완료 순서를 일부러 섞지만 result()는 항상 submit 순서대로 나와야 한다.
+--cpu 를 주면 infer_async가 없는 런타임 → BaseDetector worker 스레드 경로를 잰다.
+
+    python bench/async_infer.py --infer-ms 30 --host-ms 20 --frames 100
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np                          # noqa: E402
+
+from infer_yolo import HailoDetector        # noqa: E402
+
+
+class FakeNet:
+    def __init__(self, infer_ms, jitter_ms, async_api):
+        self.infer_ms = infer_ms
+        self.jitter_ms = jitter_ms
+        self._dev = threading.Semaphore(2)      # 가속기 안에서 2개까지 동시에 (완료 순서가 섞이게)
+        if not async_api:
+            self.infer_async = None
+
+    def get_labels(self):
+        return {i: f"id{i}" for i in range(4)}
+
+    def _run(self, inp):
+        with self._dev:
+            time.sleep((self.infer_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000.0)
+        # 프레임 번호는 픽셀 값에 넣어둔 것 (resize 해도 균일 색이라 그대로, 가장자리는 letterbox 패딩)
+        b, g, r = (int(v) for v in inp[inp.shape[0] // 2, inp.shape[1] // 2])
+        return [{"cls": b | (g << 8) | (r << 16), "conf": 1.0, "bbox": [100, 100, 200, 200]}]
+
+    def infer(self, inp):
+        return self._run(inp)
+
+    def infer_async(self, inp, callback):
+        def go():
+            try:
+                callback(self._run(inp))
+            except Exception as e:
+                callback(None, e)
+        threading.Thread(target=go, daemon=True).start()
+
+
+class FakeRT:
+    """hailo_rt 모듈 자리에 넣는 객체."""
+
+    def __init__(self, **kw):
+        self.kw = kw
+
+    def HailoRT(self):
+        return self
+
+    def load_hef(self, path):
+        return FakeNet(**self.kw)
+
+
+def frame_for(i):
+    f = np.empty((120, 160, 3), np.uint8)
+    f[:] = (i & 0xFF, (i >> 8) & 0xFF, (i >> 16) & 0xFF)
+    return f
+
+
+def run(det, frames, host_ms, depth):
+    det.depth = depth
+    got = []
+    t = time.perf_counter()
+    inflight = 0
+    for i in range(frames):
+        time.sleep(host_ms / 2000.0)             # 캡처
+        det.submit(frame_for(i))
+        inflight += 1
+        if inflight < depth:
+            continue
+        got.append(det.result()[0]["cls"])
+        inflight -= 1
+        time.sleep(host_ms / 2000.0)             # 후처리
+    while inflight:
+        got.append(det.result()[0]["cls"])
+        inflight -= 1
+    elapsed = time.perf_counter() - t
+    return frames / elapsed, got == list(range(frames))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--frames", type=int, default=100)
+    ap.add_argument("--infer-ms", type=float, default=30.0)
+    ap.add_argument("--jitter-ms", type=float, default=10.0)
+    ap.add_argument("--host-ms", type=float, default=20.0, help="프레임당 host 작업(캡처+후처리)")
+    ap.add_argument("--depths", default="1,2,3,4")
+    ap.add_argument("--cpu", action="store_true", help="infer_async 없는 런타임 (worker 스레드 경로)")
+    args = ap.parse_args()
+
+    rt = FakeRT(infer_ms=args.infer_ms, jitter_ms=args.jitter_ms, async_api=not args.cpu)
+    det = HailoDetector("fake.hef", 0.25, 0.45, rt=rt)
+    print(f"infer={args.infer_ms}ms host={args.host_ms}ms  "
+          f"serial={1000.0 / (args.infer_ms + args.host_ms):.1f} fps")
+    ok_all = True
+    for depth in (int(d) for d in args.depths.split(",")):
+        fps, ordered = run(det, args.frames, args.host_ms, depth)
+        ok_all &= ordered
+        print(f"depth={depth}  {fps:6.1f} fps  order={'ok' if ordered else 'BROKEN'}")
+    det.close()
+    sys.exit(0 if ok_all else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+batch.py chunk 분할 결과 == 파일 전체 결과 확인 (모델 없이).
+
+프레임 밝기로 장면 종류를 정해 둔 합성 영상(MJPG, 모든 프레임이 key frame이라 seek가 정확)을 만들고,
+밝기를 보고 그 장면의 detection을 돌려주는 가짜 detector로 batch.run()을 돌린다.
+영상은 일부러 한산하게: 긴 빈 구간 사이사이에 vest가 섞인 사람 / 헬멧 없는 사람 / 한두 프레임짜리
+vest 판정이 끼어 있어서, vest latch / smoother 상태가 chunk 경계를 넘어 결과를 바꾼다.
+
+    python bench/batch_equiv.py
+    python bench/batch_equiv.py --frames 20000 --workers 4
+
+확인하는 것:
+  - chunk 길이 / stride 조합마다 이벤트가 --chunk-s 0 (파일 단위) 결과와 똑같은지
+  - chunk마다 빈 상태에서 시작했다면 실제로 결과가 달라지는 영상인지 (확인이 의미 있는지)
+  - 중간에 끊긴 체크포인트 (설정 줄 중복, 잘린 마지막 줄 포함)에서 이어 돌려도 같은지
+  - 열 수 없는 파일 / 에러 나는 chunk가 있어도 나머지는 끝까지 돌고 그것만 실패로 남는지
+"""
+import argparse
+import logging
+import multiprocessing as mp
+import os
+import random
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import cv2                                              # noqa: E402
+import numpy as np                                      # noqa: E402
+import yaml                                             # noqa: E402
+
+import batch                                            # noqa: E402
+from infer_yolo import BaseDetector                     # noqa: E402
+from synth import NAMES                                 # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+W, H, FPS = 320, 240, 30.0
+FP = "batch_equiv"
+
+
+def _person(x, helmet=True, vest=True):
+    dets = [{"cls": 0, "conf": 0.9, "box": [x, 40, x + 60, 220]}]
+    dets.append({"cls": 1 if helmet else 2, "conf": 0.9, "box": [x + 12, 42, x + 48, 80]})
+    if vest:
+        dets.append({"cls": 3, "conf": 0.9, "box": [x + 2, 90, x + 58, 170]})
+    return dets
+
+
+# 장면 종류 (프레임 밝기 = 16 + 32 * 번호)
+SCENES = {
+    0: [],                                                  # 빈 화면
+    1: _person(20),                                         # 헬멧 + vest
+    2: _person(20, vest=False),                             # 헬멧, vest 없음
+    3: _person(20) + _person(200, vest=False),              # vest 섞임 → vest latch 값을 씀
+    4: _person(20, helmet=False),                           # 헬멧 없음
+}
+BOOM = 7                                                    # 이 밝기 프레임에서 detector가 에러
+
+
+class GrayDetector(BaseDetector):
+    names = NAMES
+
+    def infer(self, frame_bgr):
+        kind = (int(frame_bgr[::16, ::16].mean()) + 16) // 32
+        if kind == BOOM:
+            raise RuntimeError("detector failed on this frame")
+        return [dict(d, box=list(d["box"])) for d in SCENES.get(kind, [])]
+
+
+def _init(cfg, counter):
+    logging.disable(logging.INFO)
+    batch._setup_worker(GrayDetector(), cfg, counter)
+
+
+def script(seed, n):
+    """한산한 현장: (장면 번호, 길이) 구간을 이어 붙여 프레임 n개."""
+    rng = random.Random(seed)
+    out = []
+    while len(out) < n:
+        r = rng.random()
+        if r < 0.35:
+            out += [0] * rng.randint(60, 600)
+        elif r < 0.55:
+            out += [3] * rng.randint(3, 60)
+        elif r < 0.65:
+            out += [rng.choice((1, 2))] * rng.randint(1, 5)
+        elif r < 0.75:                                      # vest 있음 / 없음이 한 프레임씩 번갈아
+            k = rng.randint(2, 20)
+            out += [1 + (j + rng.randint(0, 1)) % 2 for j in range(k)]
+        elif r < 0.9:
+            out += [4] * rng.randint(5, 60)
+        else:
+            out += [rng.choice((0, 3))] * rng.randint(1, 8)
+    return out[:n]
+
+
+def write_video(path, kinds):
+    vw = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), FPS, (W, H))
+    if not vw.isOpened():
+        raise SystemExit("cv2.VideoWriter cannot write MJPG here")
+    frame = np.empty((H, W, 3), np.uint8)
+    for k in kinds:
+        frame[:] = 16 + 32 * k
+        vw.write(frame)
+    vw.release()
+
+
+def analyze(files, cfg, chunk_s, workers, ckpt, fresh=True):
+    """batch.main()과 같은 순서로 plan → 체크포인트 → run. 이벤트 (file, frame, event, detail) 목록."""
+    if fresh and os.path.exists(ckpt):
+        os.remove(ckpt)
+    done = batch.load_checkpoint(ckpt, FP)
+    jobs, starts, _, bad = batch.plan(files, chunk_s)
+    ctx = mp.get_context("spawn")
+    counter = ctx.Value("q", 0)
+    with batch.open_checkpoint(ckpt, FP) as ck:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                 initializer=_init, initargs=(cfg, counter)) as pool:
+            failed = batch.run(pool, jobs, done, ck, every_s=60.0)
+    events = batch.file_events(jobs, starts, done, cfg["logic"], cfg["batch_stride"])
+    return _rows(events), (jobs, starts, done), failed, bad
+
+
+def _rows(event_lists):
+    return sorted(tuple(e[1:]) for ev in event_lists for e in ev)
+
+
+def _per_chunk(run, cfg):
+    """chunk마다 빈 상태에서 시작했을 때의 이벤트 (예전 방식, 비교용)."""
+    jobs, starts, done = run
+    return _rows(batch.replay(j[1], starts[j[1]], [(j, done[j[0]])], cfg["logic"], cfg["batch_stride"])
+                 for j in jobs)
+
+
+def _expect(name, got, want):
+    ok = got == want
+    print(f"  {'ok  ' if ok else 'FAIL'} {name}" + ("" if ok else f": got {got!r}, want {want!r}"))
+    return ok
+
+
+def _diff(a, b):
+    sa, sb = set(a), set(b)
+    return f"{len(sa - sb)} only in chunked, {len(sb - sa)} only in whole-file"
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--frames", type=int, default=6000, help="영상 하나의 프레임 수")
+    ap.add_argument("--workers", type=int, default=2)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--keep", action="store_true", help="만든 영상 / 체크포인트를 지우지 않음")
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s [%(name)s] %(message)s")
+
+    with open(os.path.join(ROOT, "config.yaml"), "r", encoding="utf-8") as f:
+        cfg = yaml.safe_load(f)
+    tmp = tempfile.mkdtemp(prefix="batch_equiv_")
+    ok = True
+    try:
+        files = []
+        for k in range(2):
+            path = os.path.join(tmp, f"cam{k}_20250101_0{k}0000.avi")
+            write_video(path, script(args.seed + k, args.frames))
+            files.append(path)
+        ckpt = os.path.join(tmp, "run.ckpt")
+
+        for stride in (1, 3):
+            cfg["batch_stride"] = stride
+            whole, _, _, _ = analyze(files, cfg, 0, args.workers, ckpt)
+            for chunk_s in (7.0, 23.0):
+                print(f"[stride {stride}, chunk {chunk_s:g}s vs whole file: {len(whole)} events]")
+                got, run, failed, _ = analyze(files, cfg, chunk_s, args.workers, ckpt)
+                print(f"  ({len(run[0])} chunks)")
+                ok &= _expect("no failed chunks", failed, {})
+                ok &= _expect("events identical", got == whole, True)
+                if got != whole:
+                    print("   ", _diff(got, whole))
+                ok &= _expect("fresh state per chunk would differ", _per_chunk(run, cfg) != whole, True)
+
+        cfg["batch_stride"] = 1
+        whole, _, _, _ = analyze(files, cfg, 0, args.workers, ckpt)
+        print("[resume from an interrupted checkpoint]")
+        analyze(files, cfg, 7.0, args.workers, ckpt)
+        with open(ckpt, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        # 첫 chunk 전에 끊겼다가 다시 돌린 예전 형식(설정 줄 두 번) + 절반만 끝난 상태 + 잘린 마지막 줄
+        kept = lines[:1] + lines[:1] + lines[1:len(lines) // 2] + [lines[len(lines) // 2][:40]]
+        with open(ckpt, "w", encoding="utf-8") as f:
+            f.writelines(kept)
+        got, run, failed, _ = analyze(files, cfg, 7.0, args.workers, ckpt, fresh=False)
+        ok &= _expect("resumed run: events identical", got == whole, True)
+        ok &= _expect("every chunk readable from the checkpoint afterwards",
+                      len(batch.load_checkpoint(ckpt, FP)), len(run[0]))
+
+        print("[unreadable file / failing chunk]")
+        broken = os.path.join(tmp, "broken.avi")
+        with open(broken, "wb") as f:
+            f.write(b"not a video" * 100)
+        boom = os.path.join(tmp, "boom.avi")
+        write_video(boom, [0] * 600 + [BOOM] + [0] * 600)
+        got, jobs, failed, bad = analyze(files + [broken, boom], cfg, 7.0, args.workers, ckpt)
+        ok &= _expect("unreadable file skipped", list(bad), [broken])
+        ok &= _expect("one chunk failed", [k.split("|")[0] for k in failed], [boom])
+        ok &= _expect("other files: events identical", [e for e in got if e[0] != boom], whole)
+    finally:
+        if args.keep:
+            print(f"files kept in {tmp}")
+        else:
+            shutil.rmtree(tmp, ignore_errors=True)
+    print("OK" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+/ingest 다중 장치 부하 발생기.
+
+장치 D대가 각각 초당 E개의 이벤트를 만들어 batch_s마다 묶어서 POST 한다.
+끝나면 /fleet의 장치별 이벤트 수와 보낸 수를 대조하고,
+목표 처리량(D*E events/s)을 유지했는지 PASS/FAIL로 알려준다.
+
+    python server.py &
+    python bench/fleet_load.py --devices 50 --rate 30 --duration 30
+    python bench/fleet_load.py --batch-s 0      # 이벤트마다 요청 (배치 없을 때 비교용)
+"""
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+TYPES = ("ok", "no_helmet", "no_vest", "no_both")
+
+
+def percentile(xs, p):
+    if not xs:
+        return float("nan")
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100.0 * (len(xs) - 1))))]
+
+
+def device_loop(host, port, dev, rate, batch_s, duration, stats, start_evt):
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    period = 1.0 / rate
+    start_evt.wait()
+    t0 = time.time()
+    next_ev = t0
+    next_post = t0 + batch_s
+    pending = []
+    sent = acc = 0
+    lat = []
+    errors = 0
+    i = 0
+
+    while True:
+        now = time.time()
+        if now - t0 >= duration and not pending:
+            break
+        # 이벤트 생성 (밀린 만큼 한꺼번에)
+        while next_ev <= now and now - t0 < duration:
+            pending.append({"type": TYPES[i % len(TYPES)], "time": next_ev})
+            i += 1
+            next_ev += period
+
+        if pending and (now >= next_post or batch_s == 0 or now - t0 >= duration):
+            batches = [pending] if batch_s else [[e] for e in pending]
+            pending = []
+            for b in batches:
+                body = json.dumps({"device": dev, "events": b})
+                t = time.perf_counter()
+                try:
+                    conn.request("POST", "/ingest", body, {"Content-Type": "application/json"})
+                    r = conn.getresponse()
+                    data = r.read()
+                    if r.status == 200:
+                        acc += json.loads(data)["accepted"]
+                    else:
+                        errors += 1
+                except (OSError, http.client.HTTPException):
+                    errors += 1
+                    conn.close()
+                    conn = http.client.HTTPConnection(host, port, timeout=10)
+                lat.append(time.perf_counter() - t)
+                sent += len(b)
+            next_post = now + batch_s
+        else:
+            time.sleep(max(0.0, min(next_ev, next_post) - time.time()))
+
+    conn.close()
+    with stats["lock"]:
+        stats["sent"] += sent
+        stats["accepted"] += acc
+        stats["errors"] += errors
+        stats["lat"].extend(lat)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--url", default="http://localhost:5000")
+    ap.add_argument("--devices", type=int, default=50)
+    ap.add_argument("--rate", type=float, default=30.0, help="장치당 초당 이벤트 수")
+    ap.add_argument("--batch-s", type=float, default=1.0, help="배치 전송 주기(초), 0이면 이벤트마다 전송")
+    ap.add_argument("--duration", type=float, default=30.0)
+    ap.add_argument("--prefix", default="load")
+    args = ap.parse_args()
+
+    u = urlsplit(args.url)
+    host, port = u.hostname, u.port or 80
+    stats = {"lock": threading.Lock(), "sent": 0, "accepted": 0, "errors": 0, "lat": []}
+    start_evt = threading.Event()
+    devs = [f"{args.prefix}-{i:03d}" for i in range(args.devices)]
+    threads = [threading.Thread(target=device_loop,
+                                args=(host, port, d, args.rate, args.batch_s, args.duration, stats, start_evt))
+               for d in devs]
+    for t in threads:
+        t.start()
+    t0 = time.time()
+    start_evt.set()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - t0
+
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    conn.request("GET", "/fleet")
+    fleet = json.loads(conn.getresponse().read())
+    seen = {d["device"]: d["events"] for d in fleet["devices"]}
+    recorded = sum(seen.get(d, 0) for d in devs)
+
+    target = args.devices * args.rate
+    achieved = stats["accepted"] / elapsed
+    print(f"devices={args.devices} rate={args.rate}/s batch_s={args.batch_s} duration={elapsed:.1f}s")
+    print(f"requests={len(stats['lat'])} errors={stats['errors']}")
+    print(f"events sent={stats['sent']} accepted={stats['accepted']} recorded(/fleet)={recorded}")
+    print(f"request latency p50={percentile(stats['lat'], 50) * 1000:.1f}ms "
+          f"p99={percentile(stats['lat'], 99) * 1000:.1f}ms")
+    ok = achieved >= 0.95 * target and stats["errors"] == 0
+    print(f"throughput {achieved:.0f} events/s (target {target:.0f}) -> {'PASS' if ok else 'FAIL'}")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+HailoDetector 전/후처리 검증 + 속도 측정 (가속기 없이).
+
+녹화된 출력 텐서(.npz)를 그대로 돌려주는 가짜 hailo_rt를 HailoDetector에 끼워서
+letterbox → 디코딩 → 클래스별 NMS → 원본 프레임 좌표 복원 까지 확인한다.
+
+    python bench/hailo_decode.py                         # 합성 녹화로 검증 (YOLOv8 raw + on-chip NMS 둘 다)
+    python bench/hailo_decode.py --save rec.npz          # 합성 녹화를 파일로 저장
+    python bench/hailo_decode.py --tensors rec.npz       # 저장된 / 실제 장비에서 녹화한 텐서로 검증
+    python bench/hailo_decode.py --record rec.npz --hef model.hef --image frame.jpg   # (Pi) 실제 출력 녹화
+
+합성 검증은 HailoDetector(rt=...)로 끼우는 경우 말고도, sys.modules에 가짜 hailo_rt 모듈을 넣고
+build_local_detector()가 실제 설치된 것처럼 import 해서 쓰는 경로도 한 번 돌린다.
+
+npz 키: frame (원본 BGR), out (raw 출력, 또는 out_0..out_k = 클래스별 NMS 출력),
+        gt_boxes / gt_cls (있으면 정답과 비교: 같은 클래스 IoU >= 0.9 로 하나씩 매칭, 중복 없이)
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np                                      # noqa: E402
+
+import infer_yolo                                       # noqa: E402
+from infer_yolo import HailoDetector                    # noqa: E402
+from utils import iou                                   # noqa: E402
+
+IN = 640
+NC = 4
+ANCHORS = 8400
+
+
+class MockNet:
+    def __init__(self, outs):
+        self.outs = outs
+        self.inputs = []
+
+    def get_labels(self):
+        return {0: "person", 1: "head_helmet", 2: "head_nohelmet", 3: "vest"}
+
+    def get_input_shape(self):
+        return (IN, IN, 3)
+
+    def infer(self, inp):
+        self.inputs.append(inp.copy())
+        return self.outs
+
+
+class MockRT:
+    def __init__(self, outs):
+        self.outs = outs
+
+    def HailoRT(self):
+        return self
+
+    def load_hef(self, path):
+        return MockNet(self.outs)
+
+
+def _to_letterbox(boxes, w, h):
+    r = min(IN / w, IN / h)
+    left, top = (IN - round(w * r)) // 2, (IN - round(h * r)) // 2
+    return boxes * r + np.array([left, top, left, top], np.float32)
+
+
+def synth_recording(seed=0, n=12, w=1280, h=720, fmt="yolov8", nc=NC):
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(0, 255, (h, w, 3), np.uint8)
+    if nc == 1:
+        # 클래스가 하나면 겹친 GT끼리 NMS로 지워지므로 격자 칸마다 하나씩 (n <= 12)
+        cw, ch = w / 4, h / 3
+        cells = rng.permutation(12)[:n]
+        x1 = (cells % 4) * cw + rng.uniform(0, cw * 0.3, n)
+        y1 = (cells // 4) * ch + rng.uniform(0, ch * 0.3, n)
+        bw, bh = rng.uniform(0.3, 0.65, n) * cw, rng.uniform(0.3, 0.65, n) * ch
+    else:
+        x1 = rng.uniform(0, w - 200, n)
+        y1 = rng.uniform(0, h - 200, n)
+        bw, bh = rng.uniform(30, 200, n), rng.uniform(30, 200, n)
+    gt = np.stack([x1, y1, x1 + bw, y1 + bh], 1).astype(np.float32)
+    cls = rng.integers(0, nc, n)
+    lb = _to_letterbox(gt, w, h)
+
+    if fmt == "yolov8":
+        raw = np.zeros((4 + nc, ANCHORS), np.float32)
+        raw[:4] = rng.uniform(0, IN, (4, ANCHORS))
+        raw[4:] = rng.uniform(0, 0.05, (nc, ANCHORS))          # 배경 anchor는 낮은 점수
+        idx = rng.choice(ANCHORS, n * 4, replace=False)
+        for k in range(n):
+            for j in range(4):                                  # GT마다 흔들린 중복 박스 4개
+                a = idx[k * 4 + j]
+                b = lb[k] + (rng.normal(0, 1.0, 4) if j else 0)
+                raw[0, a], raw[1, a] = (b[0] + b[2]) / 2, (b[1] + b[3]) / 2
+                raw[2, a], raw[3, a] = b[2] - b[0], b[3] - b[1]
+                raw[4 + cls[k], a] = 0.9 - 0.1 * j
+        outs = {"out": raw[None]}
+    else:
+        per = [[] for _ in range(nc)]
+        for k in range(n):
+            for j in range(2):
+                b = (lb[k] + (rng.normal(0, 1.0, 4) if j else 0)) / IN
+                per[cls[k]].append([b[1], b[0], b[3], b[2], 0.9 - 0.2 * j])
+        outs = {f"out_{c}": np.array(p, np.float32).reshape(-1, 5) for c, p in enumerate(per)}
+    return dict(frame=frame, gt_boxes=gt, gt_cls=cls, **outs)
+
+
+def _outs(rec):
+    if "out" in rec:
+        return [rec["out"]]
+    k = sorted((key for key in rec if key.startswith("out_")), key=lambda s: int(s[4:]))
+    return [rec[key] for key in k]
+
+
+def _module_detector(outs, conf, iou_thr, fmt):
+    """가짜 hailo_rt 모듈을 설치된 것처럼 두고 build_local_detector()로 만든다."""
+    mod = types.ModuleType("hailo_rt")
+    mod.HailoRT = MockRT(outs).HailoRT
+    saved = sys.modules.get("hailo_rt")
+    sys.modules["hailo_rt"] = mod
+    fd, hef = tempfile.mkstemp(suffix=".hef")
+    os.close(fd)
+    try:
+        det = infer_yolo.build_local_detector({"hailo_hef_path": hef, "conf_thres": conf, "iou_thres": iou_thr,
+                                               "hailo_output": fmt})
+    finally:
+        os.unlink(hef)
+        if saved is None:
+            sys.modules.pop("hailo_rt", None)
+        else:
+            sys.modules["hailo_rt"] = saved
+    if not isinstance(det, HailoDetector):
+        raise SystemExit(f"build_local_detector did not pick the mock hailo_rt (got {type(det).__name__})")
+    return det
+
+
+def check(rec, conf, iou_thr, repeat, via_module=False, fmt="auto"):
+    if via_module:
+        det = _module_detector(_outs(rec), conf, iou_thr, fmt)
+    else:
+        det = HailoDetector("mock.hef", conf, iou_thr, rt=MockRT(_outs(rec)), output_format=fmt)
+    frame = rec["frame"]
+    dets = det.infer(frame)
+
+    # 시간: 전처리 / 후처리 각각
+    ent = det._letterbox()
+    t = time.perf_counter()
+    for _ in range(repeat):
+        inp, meta = det.preprocess(frame, ent)
+    pre = (time.perf_counter() - t) / repeat
+    t = time.perf_counter()
+    for _ in range(repeat):
+        det.postprocess(_outs(rec), meta)
+    post = (time.perf_counter() - t) / repeat
+    det._release(ent)
+
+    h, w = frame.shape[:2]
+    print(f"frame {w}x{h} -> {det.in_w}x{det.in_h}: {len(dets)} dets, "
+          f"preprocess {pre * 1000:.2f}ms, decode+nms+rescale {post * 1000:.2f}ms")
+    ok = True
+    lb = det.net.inputs[0]
+    r, left, top = meta[:3]
+    nw, nh = round(w * r), round(h * r)
+    pads = [lb[:top], lb[top + nh:], lb[:, :left], lb[:, left + nw:]]
+    pad_ok = all((p == 114).all() for p in pads) and any(p.size for p in pads)
+    print(f"  letterbox padding {'ok' if pad_ok else 'WRONG'}")
+    ok &= bool(pad_ok)
+
+    if "gt_boxes" in rec:
+        used = set()
+        for b, c in zip(rec["gt_boxes"].tolist(), rec["gt_cls"].tolist()):
+            best, bi = 0.0, None
+            for i, d in enumerate(dets):
+                if i in used or d["cls"] != c:
+                    continue
+                v = iou(b, d["box"])
+                if v > best:
+                    best, bi = v, i
+            if bi is None or best < 0.9:
+                print(f"  MISSED gt cls={c} box={[round(v) for v in b]} (best iou {best:.2f})")
+                ok = False
+            else:
+                used.add(bi)
+        extra = len(dets) - len(used)
+        if extra:
+            print(f"  {extra} unmatched detection(s) (duplicates not suppressed?)")
+            ok = False
+        print(f"  {len(used)}/{len(rec['gt_cls'])} ground-truth boxes matched, {extra} extra")
+    return ok
+
+
+def record(path, hef, image, conf, iou_thr):
+    import cv2
+    import hailo_rt
+    det = HailoDetector(hef, conf, iou_thr, rt=hailo_rt)
+    frame = cv2.imread(image)
+    ent = det._letterbox()
+    inp, _ = det.preprocess(frame, ent)
+    outs = det.net.infer(inp)
+    if isinstance(outs, dict):
+        outs = list(outs.values())
+    if isinstance(outs, np.ndarray) or len(outs) == 1:
+        np.savez_compressed(path, frame=frame, out=np.asarray(outs[0] if len(outs) == 1 else outs))
+    else:
+        np.savez_compressed(path, frame=frame, **{f"out_{i}": np.asarray(o) for i, o in enumerate(outs)})
+    print(f"recorded -> {path}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--tensors", help="녹화된 .npz")
+    ap.add_argument("--save", help="합성 녹화를 저장할 경로")
+    ap.add_argument("--record", help="실제 hailo_rt 출력을 녹화할 경로 (--hef, --image 필요)")
+    ap.add_argument("--hef")
+    ap.add_argument("--image")
+    ap.add_argument("--conf", type=float, default=0.25)
+    ap.add_argument("--iou", type=float, default=0.45)
+    ap.add_argument("--repeat", type=int, default=50)
+    ap.add_argument("--format", default="auto", choices=HailoDetector.OUTPUT_FORMATS,
+                    help="HailoDetector output_format (inference.hailo_output), --tensors 검증에 사용")
+    args = ap.parse_args()
+
+    if args.record:
+        record(args.record, args.hef, args.image, args.conf, args.iou)
+        return
+
+    if args.tensors:
+        with np.load(args.tensors) as z:
+            recs = [("file", dict(z), args.format)]
+    else:
+        # 합성 녹화는 형식을 알고 있으니 auto 판단과 직접 지정 둘 다 확인
+        recs = [("yolov8 raw", synth_recording(fmt="yolov8"), "yolov8"),
+                ("on-chip nms", synth_recording(seed=1, fmt="nms"), "nms"),
+                ("portrait 480x640", synth_recording(seed=2, w=480, h=640), "yolov8"),
+                # 출력 텐서가 하나뿐인 두 경우: raw head로 오인하면 안 됨 / NMS로 오인하면 안 됨
+                ("on-chip nms, 1 class", synth_recording(seed=3, fmt="nms", nc=1), "nms"),
+                ("yolov8 raw, 1 class", synth_recording(seed=4, fmt="yolov8", nc=1), "yolov8")]
+        if args.save:
+            np.savez_compressed(args.save, **recs[0][1])
+            print(f"saved -> {args.save}")
+
+    ok = True
+    for name, rec, fmt in recs:
+        for f in dict.fromkeys((args.format, fmt)):
+            print(f"[{name}, output_format={f}]")
+            ok &= check(rec, args.conf, args.iou, args.repeat, fmt=f)
+    if not args.tensors:
+        print("[yolov8 raw via hailo_rt module]")
+        ok &= check(recs[0][1], args.conf, args.iou, args.repeat, via_module=True)
+    print("OK" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+server.py 동시 polling 부하 테스트.
+
+--pollers개 스레드가 대시보드처럼 /get_alert 와 /dashboard_data 를 번갈아 요청하고,
+별도 스레드들이 /alert 를 --post-rate 만큼 POST 한다.
+끝나면 엔드포인트별 요청 수 / 처리량 / p50 / p99 / 에러 수를 출력한다.
+
+    python server.py --prod --threads 16 &
+    python bench/http_load.py --pollers 50 --duration 20
+"""
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+ENDPOINTS = ("/alert", "/get_alert", "/dashboard_data")
+
+
+def percentile(xs, p):
+    if not xs:
+        return float("nan")
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100.0 * (len(xs) - 1))))]
+
+
+class Client:
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.conn = http.client.HTTPConnection(host, port, timeout=10)
+
+    def request(self, method, path, body=None):
+        headers = {"Content-Type": "application/json"} if body else {}
+        try:
+            self.conn.request(method, path, body, headers)
+            r = self.conn.getresponse()
+            r.read()
+            return r.status
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=10)
+            return None
+
+
+def poller(host, port, interval, deadline, record):
+    c = Client(host, port)
+    while time.time() < deadline:
+        for path in ("/get_alert", "/dashboard_data"):
+            t = time.perf_counter()
+            status = c.request("GET", path)
+            record(path, time.perf_counter() - t, status)
+        if interval:
+            time.sleep(interval)
+
+
+def poster(host, port, rate, deadline, record):
+    c = Client(host, port)
+    period = 1.0 / rate
+    nxt = time.time()
+    i = 0
+    while time.time() < deadline:
+        body = json.dumps({"type": ("ok", "no_helmet", "no_vest")[i % 3], "device": "load"})
+        t = time.perf_counter()
+        status = c.request("POST", "/alert", body)
+        record("/alert", time.perf_counter() - t, status)
+        i += 1
+        nxt += period
+        time.sleep(max(0.0, nxt - time.time()))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--url", default="http://localhost:5000")
+    ap.add_argument("--pollers", type=int, default=50, help="동시 polling 클라이언트 수")
+    ap.add_argument("--interval", type=float, default=0.0,
+                    help="poller 한 바퀴 후 대기(초). 0이면 쉬지 않고 요청 (최대 부하)")
+    ap.add_argument("--posters", type=int, default=2)
+    ap.add_argument("--post-rate", type=float, default=10.0, help="poster당 초당 /alert 수")
+    ap.add_argument("--duration", type=float, default=20.0)
+    args = ap.parse_args()
+
+    u = urlsplit(args.url)
+    host, port = u.hostname, u.port or 80
+    lat = {p: [] for p in ENDPOINTS}
+    errors = {p: 0 for p in ENDPOINTS}
+    lock = threading.Lock()
+
+    def record(path, dt, status):
+        with lock:
+            lat[path].append(dt)
+            if status != 200:
+                errors[path] += 1
+
+    deadline = time.time() + args.duration
+    threads = [threading.Thread(target=poller, args=(host, port, args.interval, deadline, record))
+               for _ in range(args.pollers)]
+    threads += [threading.Thread(target=poster, args=(host, port, args.post_rate, deadline, record))
+                for _ in range(args.posters)]
+    t0 = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - t0
+
+    print(f"pollers={args.pollers} posters={args.posters}x{args.post_rate}/s duration={elapsed:.1f}s")
+    print(f"{'endpoint':<16} {'requests':>9} {'req/s':>8} {'p50_ms':>8} {'p99_ms':>8} {'errors':>7}")
+    for p in ENDPOINTS:
+        xs = lat[p]
+        print(f"{p:<16} {len(xs):>9} {len(xs) / elapsed:>8.1f} "
+              f"{percentile(xs, 50) * 1000:>8.1f} {percentile(xs, 99) * 1000:>8.1f} {errors[p]:>7}")
+
+
+if __name__ == "__main__":
+    main()
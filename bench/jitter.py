@@ -0,0 +1,171 @@
+"""
+resources(코어 / 스레드 예산) 켜고 끈 프레임 latency jitter 비교.
+
+main loop 흉내(리사이즈 + blur(OpenCV 풀) + 행렬곱(BLAS 풀) + HelmetJudge.evaluate)를
+목표 fps로 돌리면서 옆에서 io 스레드들이 JPEG 인코딩 / zlib 압축으로 CPU를 쓰게 하고,
+프레임 처리 시간의 p50 / p99 / max / 표준편차를 잰다.
+BLAS 스레드 수는 import 전에 정해야 해서 모드마다 새 프로세스로 돌린다.
+
+    python bench/jitter.py                          # config.yaml resources 설정 vs 라이브러리 기본값
+    python bench/jitter.py --seconds 30 --io-threads 4 --fps 15
+    python bench/jitter.py --json jitter.json
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import zlib
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+import yaml                                             # noqa: E402
+
+import resources                                        # noqa: E402
+
+
+def _res_cfg(path):
+    with open(path, "r", encoding="utf-8") as f:
+        cfg = yaml.safe_load(f) or {}
+    res = dict(cfg.get("resources") or {})
+    res["enabled"] = True
+    return res
+
+
+# ---------------------------------------
+#   자식 프로세스: 실제 측정
+# ---------------------------------------
+def _io_load(stop, sleep_s, seed):
+    import cv2
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    img = rng.integers(0, 255, (720, 1280, 3), np.uint8)
+    blob = rng.integers(0, 255, 1 << 19, np.uint8).tobytes()
+    while not stop.is_set():
+        cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 80])
+        zlib.compress(blob, 6)
+        time.sleep(sleep_s)
+
+
+def child(mode, args):
+    import cv2
+    import numpy as np
+
+    import synth
+    from rules import HelmetJudge
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        cfg = yaml.safe_load(f)
+    judge = HelmetJudge(cfg["logic"])
+    judge._ensure_ids(synth.NAMES)
+    srng = random.Random(0)
+    scenes = [synth.scene(srng, 5, 0.7, 0.7, 3) for _ in range(64)]
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 255, (synth.FRAME_H, synth.FRAME_W, 3), np.uint8)
+    a = rng.random((args.matrix, args.matrix), dtype=np.float32)
+
+    res = None
+    if mode == "on":
+        res = resources.ResourceManager(_res_cfg(args.config))
+        res.apply_libs()
+
+    stop = threading.Event()
+    io = [threading.Thread(target=_io_load, args=(stop, args.io_sleep_ms / 1000.0, i),
+                           name=f"io-load-{i}", daemon=True) for i in range(args.io_threads)]
+    for t in io:
+        t.start()
+    if res is not None:
+        res.assign(inline_infer=True)
+
+    period = 1.0 / args.fps
+    lat = []
+    end = time.perf_counter() + args.seconds
+    nxt = time.perf_counter()
+    i = 0
+    while time.perf_counter() < end:
+        t0 = time.perf_counter()
+        img = frame.copy()
+        small = cv2.resize(img, (640, 640), interpolation=cv2.INTER_LINEAR)
+        cv2.GaussianBlur(small, (9, 9), 0)
+        a @ a
+        judge.evaluate(img, scenes[i % len(scenes)])
+        lat.append(time.perf_counter() - t0)
+        i += 1
+        nxt += period
+        left = nxt - time.perf_counter()
+        if left > 0:
+            time.sleep(left)
+        else:
+            nxt = time.perf_counter()          # 밀렸으면 몰아서 돌지 않음
+    stop.set()
+    for t in io:
+        t.join()
+
+    lat = np.array(lat[int(args.fps):] or lat) * 1000.0     # 처음 1초는 워밍업
+    out = {
+        "mode": mode, "frames": int(lat.size),
+        "p50_ms": float(np.percentile(lat, 50)), "p95_ms": float(np.percentile(lat, 95)),
+        "p99_ms": float(np.percentile(lat, 99)), "max_ms": float(lat.max()),
+        "std_ms": float(lat.std()),
+        "opencv_threads": cv2.getNumThreads(),
+        "blas_env": os.environ.get("OPENBLAS_NUM_THREADS", "default"),
+    }
+    sys.stdout.write(json.dumps(out) + "\n")
+
+
+# ---------------------------------------
+#   부모: 모드별 자식 실행 + 비교
+# ---------------------------------------
+def run_mode(mode, args):
+    env = dict(os.environ)
+    for k in resources.thread_env({"enabled": True, "blas_threads": 1}):
+        env.pop(k, None)                       # 밖에서 지정한 값이 off 모드에 섞이지 않게
+    if mode == "on":
+        env.update(resources.thread_env(_res_cfg(args.config)))
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", mode] + args.passthrough
+    out = subprocess.run(cmd, env=env, cwd=ROOT, capture_output=True, text=True)
+    if out.returncode != 0:
+        sys.stderr.write(out.stderr)
+        raise SystemExit(f"{mode} run failed")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--config", default=os.path.join(ROOT, "config.yaml"))
+    ap.add_argument("--seconds", type=float, default=15.0)
+    ap.add_argument("--fps", type=float, default=15.0)
+    ap.add_argument("--io-threads", type=int, default=3)
+    ap.add_argument("--io-sleep-ms", type=float, default=2.0, help="io 스레드 작업 사이 쉬는 시간")
+    ap.add_argument("--matrix", type=int, default=384, help="BLAS 행렬곱 크기 (추론 대신)")
+    ap.add_argument("--json", help="결과 저장 경로")
+    ap.add_argument("--child", choices=("on", "off"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        child(args.child, args)
+        return
+
+    args.passthrough = ["--config", os.path.abspath(args.config), "--seconds", str(args.seconds),
+                        "--fps", str(args.fps), "--io-threads", str(args.io_threads),
+                        "--io-sleep-ms", str(args.io_sleep_ms), "--matrix", str(args.matrix)]
+    print(f"{os.cpu_count()} cpus, {args.fps:g} fps target, {args.io_threads} io threads, {args.seconds:g}s per mode")
+    results = [run_mode(m, args) for m in ("off", "on")]
+    print(f"{'mode':5s} {'frames':>6s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'max':>8s} {'std':>8s}  threads")
+    for r in results:
+        print(f"{r['mode']:5s} {r['frames']:6d} {r['p50_ms']:7.2f}ms {r['p95_ms']:7.2f}ms "
+              f"{r['p99_ms']:7.2f}ms {r['max_ms']:7.2f}ms {r['std_ms']:7.2f}ms  "
+              f"opencv={r['opencv_threads']} blas={r['blas_env']}")
+    off, on = results
+    print(f"p99-p50 jitter: {off['p99_ms'] - off['p50_ms']:.2f}ms -> {on['p99_ms'] - on['p50_ms']:.2f}ms")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
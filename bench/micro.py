@@ -0,0 +1,203 @@
+"""
+hot path 마이크로벤치마크.
+
+utils.iou / HelmetJudge.evaluate / TemporalSmoother.push / rules.analyze_safety 를
+seed 고정된 가짜 detection(synth.py)으로 돌려서 op당 시간을 잰다.
+카메라, GPIO, 모델 가중치 없이 일반 리눅스 PC에서 돌아간다.
+
+    python bench/micro.py                                   # 결과 출력
+    python bench/micro.py --save bench/baselines/my-pc.json # baseline 저장
+    python bench/micro.py --compare bench/baselines/my-pc.json --threshold 0.25
+        → baseline보다 threshold 이상 느려진 항목이 있으면 REGRESSION, exit 1
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np                      # noqa: E402
+
+import synth                            # noqa: E402
+from rules import HelmetJudge, analyze_safety  # noqa: E402
+from temporal_lstm import TemporalSmoother  # noqa: E402
+from utils import iou                   # noqa: E402
+
+LOGIC = {
+    "min_person_size_px": 10, "head_ratio": 0.30, "helmet_head_iou": 0.10,
+    "helmet_min_conf": 0.35, "vest_torso_top_ratio": 0.18, "vest_torso_bottom_ratio": 0.98,
+    "vest_torso_iou": 0.02, "vest_min_frames": 2, "min_ppe_conf": 0.05,
+}
+SAMPLES = 64     # 시나리오마다 미리 만들어두는 프레임 수 (돌아가면서 사용)
+
+
+def _cases(seed):
+    rng = random.Random(seed)
+    frame = np.zeros((synth.FRAME_H, synth.FRAME_W, 3), np.uint8)
+    cases = {}
+
+    # utils.iou: 임의 박스 쌍
+    pairs = []
+    for _ in range(1024):
+        a = [rng.randint(0, 600), rng.randint(0, 300)]
+        b = [rng.randint(0, 600), rng.randint(0, 300)]
+        a += [a[0] + rng.randint(1, 300), a[1] + rng.randint(1, 300)]
+        b += [b[0] + rng.randint(1, 300), b[1] + rng.randint(1, 300)]
+        pairs.append((a, b))
+
+    def run_iou(n):
+        k = len(pairs)
+        for i in range(n):
+            a, b = pairs[i % k]
+            iou(a, b)
+    cases["iou"] = run_iou
+
+    # TemporalSmoother.push + decision
+    probs = [1.0 if rng.random() < 0.3 else 0.0 for _ in range(1024)]
+    sm = TemporalSmoother(window=12)
+
+    def run_smooth(n):
+        k = len(probs)
+        for i in range(n):
+            sm.push(probs[i % k])
+            sm.decision()
+    cases["smoother.push"] = run_smooth
+
+    # 시나리오별 evaluate / analyze_safety
+    for name, persons in synth.SCENES.items():
+        srng = random.Random(f"{seed}-{name}")
+        samples = [synth.scene(srng, persons) for _ in range(SAMPLES)]
+        judge = HelmetJudge(LOGIC)
+        judge._ensure_ids(synth.NAMES)
+
+        def run_eval(n, samples=samples, judge=judge):
+            for i in range(n):
+                judge.evaluate(frame, samples[i % SAMPLES], draw=False)
+
+        def run_analyze(n, samples=samples):
+            for i in range(n):
+                analyze_safety(samples[i % SAMPLES], synth.NAMES)
+
+        boxes = sum(len(s) for s in samples) // SAMPLES
+        cases[f"evaluate[{name}:{boxes}]"] = run_eval
+        cases[f"analyze_safety[{name}:{boxes}]"] = run_analyze
+    return cases
+
+
+def measure(fn, repeat=5, min_time=0.05):
+    """op 수를 min_time 이상 걸리도록 늘린 뒤 repeat번 재서 ns/op 의 median / min.
+    timeit처럼 측정 중에는 GC를 끈다."""
+    gc.collect()
+    gc.disable()
+    try:
+        return _measure(fn, repeat, min_time)
+    finally:
+        gc.enable()
+
+
+def _measure(fn, repeat, min_time):
+    n = 1
+    while True:
+        t = time.perf_counter()
+        fn(n)
+        dt = time.perf_counter() - t
+        if dt >= min_time:
+            break
+        n = max(n * 2, int(n * min_time / max(dt, 1e-9) * 1.2))
+    runs = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn(n)
+        runs.append((time.perf_counter() - t) / n * 1e9)
+    return {"ns_per_op": statistics.median(runs), "min_ns": min(runs), "ops": n}
+
+
+def compare(results, baseline, threshold, key="min_ns"):
+    """key 기준으로 비교. 기본은 min_ns (노이즈가 위쪽으로만 튀어서 median보다 안정적)."""
+    bad = []
+    print(f"{'case':<34} {'baseline_ns':>12} {'now_ns':>12} {'change':>8}")
+    for name, r in results.items():
+        b = baseline.get("results", {}).get(name)
+        if b is None:
+            print(f"{name:<34} {'-':>12} {r[key]:>12.0f} {'new':>8}")
+            continue
+        ch = r[key] / b[key] - 1.0
+        flag = ""
+        if ch > threshold:
+            flag = "  REGRESSION"
+            bad.append(name)
+        elif ch < -threshold:
+            flag = "  faster"
+        print(f"{name:<34} {b[key]:>12.0f} {r[key]:>12.0f} {ch:>+7.1%}{flag}")
+    return bad
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--seed", type=int, default=1234)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--min-time", type=float, default=0.05, help="측정 1회 최소 시간(초)")
+    ap.add_argument("--filter", default="", help="이 문자열이 들어간 case만")
+    ap.add_argument("--save", help="결과를 baseline JSON으로 저장")
+    ap.add_argument("--compare", help="비교할 baseline JSON")
+    ap.add_argument("--retries", type=int, default=2, help="regression 후보를 다시 재는 횟수")
+    ap.add_argument("--threshold", type=float, default=0.25, help="이 비율 이상 느려지면 regression")
+    ap.add_argument("--key", choices=("min_ns", "ns_per_op"), default="min_ns", help="비교 기준값")
+    args = ap.parse_args()
+
+    logging.disable(logging.CRITICAL)     # HJ 디버그 로그 비용은 빼고 잰다
+    cases = _cases(args.seed)
+    results = {}
+    for name, fn in cases.items():
+        if args.filter and args.filter not in name:
+            continue
+        results[name] = measure(fn, args.repeat, args.min_time)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        base = baseline.get("results", {})
+        # 한 번 튄 값일 수 있으니 느려 보이는 case는 다시 재서 더 빠른 쪽을 쓴다
+        for _ in range(args.retries):
+            slow = [n for n, r in results.items()
+                    if n in base and r[args.key] > base[n][args.key] * (1.0 + args.threshold)]
+            for name in slow:
+                r2 = measure(cases[name], args.repeat, args.min_time)
+                if r2[args.key] < results[name][args.key]:
+                    results[name] = r2
+        bad = compare(results, baseline, args.threshold, args.key)
+        if bad:
+            print(f"\n{len(bad)} regression(s) over {args.threshold:.0%}: {', '.join(bad)}")
+            sys.exit(1)
+        print("\nno regressions")
+    else:
+        print(f"{'case':<34} {'ns/op':>12} {'min_ns':>12} {'ops/s':>12}")
+        for name, r in results.items():
+            print(f"{name:<34} {r['ns_per_op']:>12.0f} {r['min_ns']:>12.0f} {1e9 / r['ns_per_op']:>12.0f}")
+
+    if args.save:
+        out = {
+            "meta": {
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "platform": platform.platform(),
+                "seed": args.seed,
+                "date": time.strftime("%Y-%m-%d"),
+            },
+            "results": results,
+        }
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(out, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"saved -> {args.save}")
+
+
+if __name__ == "__main__":
+    main()
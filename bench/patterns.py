@@ -0,0 +1,145 @@
+"""
+alerts.PatternPlayer 동작 확인 (GPIO 없이).
+
+GPIOBoard 대신 호출 기록만 남기는 가짜 보드 + 직접 돌리는 가짜 시계로
+tick() 단계 진행 / 밀린 단계 건너뛰기 / 바뀔 때만 GPIO 호출 / 레벨 · 패턴 교체,
+그리고 start() 스레드로 실제 시간 재생까지 확인한다.
+
+    python bench/patterns.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from alerts import Notifier, PatternPlayer, default_patterns   # noqa: E402
+
+
+class FakeBoard:
+    def __init__(self, clock=None):
+        self.calls = []
+        self.clock = clock
+
+        self.led = self.buzz = None
+
+    def _log(self, name):
+        self.calls.append((self.clock() if self.clock else None, name))
+        part, state = name.split("_")
+        setattr(self, part, state == "on")
+
+    def led_on(self): self._log("led_on")
+    def led_off(self): self._log("led_off")
+    def buzz_on(self): self._log("buzz_on")
+    def buzz_off(self): self._log("buzz_off")
+
+    def take(self):
+        out = [c[1] for c in self.calls]
+        self.calls.clear()
+        return out
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+CFG = {"buzzer_on_ms": 500, "buzzer_off_ms": 500}
+
+
+def _expect(name, got, want):
+    ok = got == want
+    print(f"  {'ok  ' if ok else 'FAIL'} {name}" + ("" if ok else f": got {got!r}, want {want!r}"))
+    return ok
+
+
+def check_tick():
+    clock = FakeClock()
+    board = FakeBoard()
+    p = PatternPlayer(board, default_patterns(CFG), clock=clock)
+    ok = True
+
+    ok &= _expect("safe: 전부 OFF, 다음 변화 없음", (p.tick(), board.take()), (None, ["led_off", "buzz_off"]))
+    ok &= _expect("safe 반복 tick: GPIO 호출 없음", (p.tick(), board.take()), (None, []))
+
+    p.set_level("warning")
+    ok &= _expect("warning 0ms: LED + 부저 ON", (p.tick(), board.take()), (0.5, ["led_on", "buzz_on"]))
+    clock.t = 0.2
+    ok &= _expect("warning 200ms: 그대로, 300ms 남음", (round(p.tick(), 6), board.take()), (0.3, []))
+    clock.t = 0.6
+    ok &= _expect("warning 600ms: 부저만 OFF", (round(p.tick(), 6), board.take()), (0.4, ["buzz_off"]))
+    clock.t = 2.1
+    # 2단계 x 500ms 주기: 2.1s는 5번째 단계(부저 ON) 100ms 지점
+    ok &= _expect("warning 2100ms: 밀린 단계 건너뛰고 박자 유지",
+                  (round(p.tick(), 6), board.take()), (0.4, ["buzz_on"]))
+
+    p.set_level("danger")
+    ok &= _expect("danger 전환: 단계 처음부터", (round(p.tick(), 6), board.take()), (0.25, []))
+    clock.t = 2.35
+    ok &= _expect("danger 250ms: LED + 부저 OFF", (round(p.tick(), 6), board.take()),
+                  (0.25, ["led_off", "buzz_off"]))
+
+    p.set_patterns({**default_patterns(CFG), "danger": [{"led": True, "buzz": False, "ms": 100}]})
+    ok &= _expect("set_patterns: 새 패턴 즉시 적용", (round(p.tick(), 6), board.take()), (0.1, ["led_on"]))
+
+    p.set_level("safe")
+    ok &= _expect("safe 복귀: 전부 OFF", (p.tick(), board.take()), (None, ["led_off"]))
+
+    for bad in ({"warning": [{"led": True, "ms": 0}]}, {"warning": "abc"}, {"warning": [[200, 200]]},
+                {"warning": [{"led": True, "ms": "x"}]}, {"warning": [{"led": "yes", "ms": 100}]}):
+        try:
+            p.set_patterns({**default_patterns(CFG), **bad})
+            got = "accepted"
+        except ValueError:
+            got = "ValueError"
+        ok &= _expect(f"잘못된 패턴 {bad['warning']!r} 거부", got, "ValueError")
+    try:
+        p.set_level("nope")
+        got = "accepted"
+    except ValueError:
+        got = "ValueError"
+    ok &= _expect("모르는 레벨 거부", got, "ValueError")
+    return ok
+
+
+def check_thread():
+    """Notifier 스레드로 실제 시간 재생: 20ms / 30ms 패턴을 0.5초 돌려서 토글 횟수 / 간격 확인."""
+    board = FakeBoard(clock=time.monotonic)
+    cfg = {"patterns": {"warning": [{"led": True, "buzz": True, "ms": 20},
+                                    {"led": True, "buzz": False, "ms": 30}]}}
+    n = Notifier(board, cfg)
+    n.set_level("warning")
+    time.sleep(0.5)
+    n.set_level("safe")
+    time.sleep(0.05)
+    calls = list(board.calls)
+    end_state = (board.led, board.buzz)
+    n.close()
+
+    ons = [t for t, c in calls if c == "buzz_on"]
+    gaps = [b - a for a, b in zip(ons, ons[1:])]
+    mean = sum(gaps) / len(gaps) if gaps else 0.0
+    ok = True
+    # 50ms 주기 → 0.5초에 10번 (스케줄러 지연 감안해서 여유 있게)
+    ok &= _expect("buzz_on 횟수 8~11", 8 <= len(ons) <= 11, True)
+    ok &= _expect("buzz_on 평균 간격 45~60ms", 0.045 <= mean <= 0.060, True)
+    ok &= _expect("safe 후 LED / 부저 OFF", end_state, (False, False))
+    print(f"  ({len(ons)} buzz_on, mean period {mean * 1000:.1f}ms)")
+    return ok
+
+
+def main():
+    ok = True
+    print("[tick / fake clock]")
+    ok &= check_tick()
+    print("[thread / real clock]")
+    ok &= check_thread()
+    print("OK" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
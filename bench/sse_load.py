@@ -0,0 +1,136 @@
+"""
+/stream 동시 접속 부하 테스트.
+
+N개의 SSE 연결을 열어두고 /alert를 여러 번 POST 한 뒤
+각 연결이 알림을 받기까지 걸린 시간(서버 time 기준)을 집계한다.
+서버와 같은 머신(같은 시계)에서 돌리는 걸 전제로 한다.
+
+    python server.py &
+    python bench/sse_load.py --clients 50,100,200,400 --alerts 20
+"""
+import argparse
+import asyncio
+import json
+import time
+import urllib.request
+from urllib.parse import urlsplit
+
+
+def percentile(xs, p):
+    if not xs:
+        return float("nan")
+    xs = sorted(xs)
+    k = min(len(xs) - 1, max(0, int(round(p / 100.0 * (len(xs) - 1)))))
+    return xs[k]
+
+
+async def viewer(host, port, path, ready, latencies, stop, since):
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        return "refused"
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept: text/event-stream\r\n\r\n".encode())
+    await writer.drain()
+
+    status = await reader.readline()
+    if b" 200 " not in status:
+        writer.close()
+        return "refused"
+    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+        pass
+    ready.release()
+
+    event = None
+    try:
+        while not stop.is_set():
+            try:
+                line = await asyncio.wait_for(reader.readline(), timeout=0.5)
+            except asyncio.TimeoutError:
+                continue
+            if not line:
+                return "closed"
+            line = line.strip()
+            if line.startswith(b"event:"):
+                event = line[6:].strip()
+            elif line.startswith(b"data:") and event == b"alert":
+                data = json.loads(line[5:])
+                # 접속 직후 스냅샷으로 오는 이전 단계 알림은 제외
+                if data.get("type") == "bench" and data["time"] >= since:
+                    latencies.append(time.time() - data["time"])
+        return "ok"
+    finally:
+        writer.close()
+
+
+def post_alert(base):
+    body = json.dumps({"type": "bench"}).encode()
+    req = urllib.request.Request(base + "/alert", data=body,
+                                 headers={"Content-Type": "application/json"})
+    urllib.request.urlopen(req, timeout=5).read()
+
+
+async def run_level(base, n, alerts, interval):
+    u = urlsplit(base)
+    host, port = u.hostname, u.port or 80
+    ready = asyncio.Semaphore(0)
+    stop = asyncio.Event()
+    latencies = []
+    since = time.time()
+
+    tasks = [asyncio.create_task(viewer(host, port, "/stream?topics=alert", ready, latencies, stop, since))
+             for _ in range(n)]
+
+    # 연결 수립 대기 (최대 10초)
+    connected = 0
+    deadline = time.time() + 10
+    while connected < n and time.time() < deadline:
+        try:
+            await asyncio.wait_for(ready.acquire(), timeout=0.2)
+            connected += 1
+        except asyncio.TimeoutError:
+            if all(t.done() for t in tasks):
+                break
+
+    loop = asyncio.get_running_loop()
+    for _ in range(alerts):
+        await loop.run_in_executor(None, post_alert, base)
+        await asyncio.sleep(interval)
+    await asyncio.sleep(1.0)
+
+    stop.set()
+    results = await asyncio.gather(*tasks)
+    expected = connected * alerts
+    return {
+        "clients": n,
+        "connected": connected,
+        "refused": results.count("refused"),
+        "delivered": f"{len(latencies)}/{expected}",
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies) * 1000 if latencies else float("nan"),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--url", default="http://localhost:5000")
+    ap.add_argument("--clients", default="50,100,200",
+                    help="동시 접속 수 단계 (콤마 구분)")
+    ap.add_argument("--alerts", type=int, default=20)
+    ap.add_argument("--interval", type=float, default=0.1)
+    ap.add_argument("--pause", type=float, default=6.0,
+                    help="단계 사이 대기(초). 끊긴 연결은 서버 heartbeat 때 정리되므로 그보다 길게")
+    args = ap.parse_args()
+
+    print(f"{'clients':>8} {'conn':>6} {'refused':>8} {'delivered':>12} "
+          f"{'p50_ms':>8} {'p99_ms':>8} {'max_ms':>8}")
+    for i, n in enumerate(int(x) for x in args.clients.split(",")):
+        if i:
+            time.sleep(args.pause)
+        r = asyncio.run(run_level(args.url.rstrip("/"), n, args.alerts, args.interval))
+        print(f"{r['clients']:>8} {r['connected']:>6} {r['refused']:>8} {r['delivered']:>12} "
+              f"{r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['max_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
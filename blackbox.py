@@ -0,0 +1,504 @@
+"""
+블랙박스: 프레임별 detection / 사람별 판정 / smoothing 상태 / 단계 시간을
+고정 크기 mmap 링 파일(.ssbb)에 계속 덮어쓴다. 사고 전후 상황을 CSV의 ON/OFF보다 자세히 복원하는 용도.
+
+    python blackbox.py blackbox.ssbb                          # 기간 / 레코드 수 요약
+    python blackbox.py blackbox.ssbb --last 30                # 마지막 30초
+    python blackbox.py blackbox.ssbb --from 09:12 --to 09:13:30 --dets
+    python blackbox.py blackbox.ssbb --from "2026-10-19 09:12:00" --json
+
+조회는 시간으로 이진 탐색해서 필요한 슬롯만 읽는다 (파일 전체를 읽지 않음).
+시계가 뒤로 간 지점(RTC 없는 Pi가 NTP 전에 과거 시각으로 부팅 등)은 헤더에 seq로 남겨서
+그 사이 구간마다 따로 탐색한다. 그래서 시계가 돌아가도 이전 레코드를 시간으로 찾을 수 있다.
+
+파일 형식 (little endian)
+  header (4096 bytes) : b"SSBB" | u16 version | u16 n_stages | u32 slot_size | u32 slots
+                        | u16 max_dets | u16 max_persons | u32 len | u64 head | f64 created | meta JSON
+                        ... offset 3584: u64 n_marks | 63 x u64 mark seq (n_marks % 63 번째 칸에 이어 씀)
+                        mark seq = 이 레코드의 시각이 바로 앞 레코드보다 이름 (시계가 뒤로 감)
+  slot (slot_size)    : u64 seq | u32 crc | u8 ndet | u8 npers | u8 alert | u8 flags
+                        | f64 time | f32 raw | f32 smooth | n_stages x u32 µs
+                        | ndet x (u16 cls, u16 conf, u16 x1, y1, x2, y2)
+                        | npers x (u16 x1, y1, x2, y2, u8 helmet, u8 vest)
+  레코드 seq는 1부터, slot = seq % slots. head는 마지막으로 쓴 seq (힌트).
+"""
+import argparse
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime
+
+log = logging.getLogger("blackbox")
+
+MAGIC = b"SSBB"
+VERSION = 1
+HEADER_SIZE = 4096
+ALERTS = ("ok", "no_helmet", "no_vest", "no_both")
+FLAG_BITS = ("helmet_on", "helmet_off", "vest_on", "vest_off")
+
+_HDR = struct.Struct("<4sHHIIHHI")
+_HEAD_AT = _HDR.size                 # u64 head
+_HEAD = struct.Struct("<Q")
+_CREATED = struct.Struct("<d")
+_META_AT = _HEAD_AT + 16
+
+# 시계가 뒤로 간 seq 목록 (헤더 끝쪽, 최근 MAX_MARKS개만)
+MAX_MARKS = 63
+_MARKS_AT = HEADER_SIZE - 8 * (MAX_MARKS + 1)
+_U64 = struct.Struct("<Q")
+
+_SEQ = struct.Struct("<Q")
+_CRC = struct.Struct("<I")
+_REC = struct.Struct("<BBBBdff")     # offset 12 부터
+_REC_AT = 12
+_FIXED = _REC_AT + _REC.size         # 32
+_DET = struct.Struct("<HH4H")
+_PERSON = struct.Struct("<4HBB")
+_HELMET = {None: 0, True: 1, False: 2}
+_HELMET_R = {0: None, 1: True, 2: False}
+
+
+def _u16(v):
+    v = int(v)
+    return 0 if v < 0 else 0xFFFF if v > 0xFFFF else v
+
+
+def _layout(slots, n_stages, max_dets, max_persons):
+    need = _FIXED + 4 * n_stages + _DET.size * max_dets + _PERSON.size * max_persons
+    slot_size = (need + 63) // 64 * 64          # cache line 단위로 맞춤
+    return slot_size, HEADER_SIZE + slot_size * slots
+
+
+# ---------------------------------------
+#   슬롯 읽기 (writer 복구 / reader 공용)
+# ---------------------------------------
+class _Ring:
+    def __init__(self, mm, slots, slot_size, n_stages):
+        self.mm = mm
+        self.slots = slots
+        self.slot_size = slot_size
+        self.n_stages = n_stages
+
+    def _off(self, seq):
+        return HEADER_SIZE + (seq % self.slots) * self.slot_size
+
+    def valid(self, seq):
+        """seq 레코드가 slot에 온전히 남아 있으면 True (seq 일치 + CRC)."""
+        if seq <= 0:
+            return False
+        off = self._off(seq)
+        mm = self.mm
+        if _SEQ.unpack_from(mm, off)[0] != seq:
+            return False
+        nd, npers = mm[off + _REC_AT], mm[off + _REC_AT + 1]
+        used = _FIXED + 4 * self.n_stages + _DET.size * nd + _PERSON.size * npers
+        if used > self.slot_size:
+            return False
+        crc = zlib.crc32(mm[off + _REC_AT:off + used], zlib.crc32(mm[off:off + 8]))
+        return crc == _CRC.unpack_from(mm, off + 8)[0]
+
+    def time_at(self, seq):
+        return _REC.unpack_from(self.mm, self._off(seq) + _REC_AT)[4]
+
+    def newest(self, hint):
+        """head 힌트에서 시작해서 실제 마지막 온전한 seq 찾기. 없으면 0."""
+        s = max(0, hint)
+        while self.valid(s + 1):             # 헤더보다 레코드가 먼저 디스크에 남은 경우
+            s += 1
+        lo = max(0, s - self.slots)
+        while s > lo and not self.valid(s):  # 마지막 레코드가 쓰다 만 경우
+            s -= 1
+        return s if self.valid(s) else 0
+
+
+# ---------------------------------------
+#   쓰기
+#
+#   레코드는 미리 잡아둔 bytearray에 pack_into로 만들고 mmap에 slice 대입 두 번 (memcpy).
+#   본문 + CRC를 먼저 쓰고 seq를 마지막에 쓴다. 쓰다가 죽으면 slot에는 이전 seq + 새 본문이 남아서
+#   CRC가 안 맞으므로 reader가 버린다. 디스크 반영은 flusher 스레드가 flush_s마다 fsync
+#   (main loop는 SD카드 I/O를 기다리지 않음). 파일은 처음에 전부 할당해둬서
+#   디스크가 차도 mmap 쓰기가 SIGBUS로 죽지 않는다.
+# ---------------------------------------
+class BlackBox:
+    def __init__(self, path, names, stages, slots=54000, max_dets=32, max_persons=16, flush_s=1.0):
+        self.path = path
+        self.stages = list(stages)
+        self.max_dets = int(max_dets)
+        self.max_persons = int(max_persons)
+        if isinstance(names, (list, tuple)):
+            names = dict(enumerate(names))
+        meta = json.dumps({"names": {str(k): v for k, v in (names or {}).items()},
+                           "stages": self.stages, "alerts": list(ALERTS)}).encode("utf-8")
+        if _META_AT + len(meta) > _MARKS_AT:
+            raise ValueError("blackbox header too large (too many class names / stages)")
+        self.slot_size, size = _layout(slots, len(self.stages), self.max_dets, self.max_persons)
+        hdr = _HDR.pack(MAGIC, VERSION, len(self.stages), self.slot_size, slots,
+                        self.max_dets, self.max_persons, len(meta))
+
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        fresh = not self._reusable(path, size, hdr + b"\0" * 16 + meta)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fresh:
+            os.ftruncate(self._fd, size)
+            if hasattr(os, "posix_fallocate"):
+                os.posix_fallocate(self._fd, 0, size)
+        self.mm = mmap.mmap(self._fd, size)
+        self._ring = _Ring(self.mm, slots, self.slot_size, len(self.stages))
+        if fresh:
+            self.mm[:HEADER_SIZE] = bytes(HEADER_SIZE)
+            self.mm[:_HDR.size] = hdr
+            _CREATED.pack_into(self.mm, _HEAD_AT + 8, time.time())
+            self.mm[_META_AT:_META_AT + len(meta)] = meta
+            self.seq = 0
+        else:
+            # 이전 실행(정상 종료 / 크래시 / 전원 차단) 이어서 쓰기
+            self.seq = self._ring.newest(_HEAD.unpack_from(self.mm, _HEAD_AT)[0])
+        # 이어 쓸 때 이전 마지막 시각과 비교해야 재부팅 후 시계가 뒤에 있는 것도 잡힌다
+        self._last_t = self._ring.time_at(self.seq) if self.seq else float("-inf")
+
+        self._buf = bytearray(self.slot_size)
+        self._stage_fmt = struct.Struct(f"<{len(self.stages)}I")
+        self._fmts = {}                  # (ndet, npers) -> Struct
+        self.records = 0
+        self._stop = threading.Event()
+        self._flusher = None
+        if flush_s and flush_s > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, args=(flush_s,),
+                                             name="blackbox-flush", daemon=True)
+            self._flusher.start()
+        log.info("[BB] %s: %d slots x %d B (%.1f MB), %s at seq %d",
+                 path, slots, self.slot_size, size / 2**20, "new" if fresh else "resuming", self.seq)
+
+    @staticmethod
+    def _reusable(path, size, header):
+        """같은 구성으로 만든 파일이면 이어 쓰고, 아니면 .old로 옮겨두고 새로 만든다."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        try:
+            with open(path, "rb") as f:
+                old = bytearray(f.read(len(header)))
+            old[_HEAD_AT:_META_AT] = bytes(16)          # head / created 는 비교에서 제외
+            if st.st_size == size and bytes(old) == header:
+                return True
+        except OSError:
+            pass
+        os.replace(path, path + ".old")
+        log.warning("[BB] %s has a different layout, moved to %s.old", path, path)
+        return False
+
+    def write(self, t, dets, persons=(), alert=None, flags=(), raw=0.0, smooth=0.0, frame_s=0.0, timers=()):
+        """
+        프레임 하나 기록.
+          persons: HelmetJudge.last_persons  [(box, helmet, vest), ...]
+          flags:   (helmet_on, helmet_off, vest_on, vest_off)
+          frame_s: 프레임 전체 시간 (stages[0])
+          timers:  stages[1:] 순서의 StageTimer. last를 읽고 0으로 돌려놓는다 (이번 프레임에 안 돈 stage는 0)
+        """
+        buf = self._buf
+        nd = min(len(dets), self.max_dets)
+        npers = min(len(persons), self.max_persons)
+        bits = 0
+        for i, v in enumerate(flags):
+            if v:
+                bits |= 1 << i
+        code = ALERTS.index(alert) if alert in ALERTS else 255
+        _REC.pack_into(buf, _REC_AT, nd, npers, code, bits, t, raw, smooth)
+
+        us = [int(frame_s * 1e6)]
+        for tm in timers:
+            us.append(int(tm.last * 1e6))
+            tm.last = 0.0
+        us += [0] * (len(self.stages) - len(us))
+        pos = _FIXED
+        try:
+            self._stage_fmt.pack_into(buf, pos, *us)
+        except struct.error:                       # u32 µs(71분) 넘는 값
+            self._stage_fmt.pack_into(buf, pos, *(min(max(v, 0), 0xFFFFFFFF) for v in us))
+        pos += self._stage_fmt.size
+
+        vals = []
+        for d in dets[:nd]:
+            x1, y1, x2, y2 = d.get("box") or (0, 0, 0, 0)
+            vals += (int(d.get("cls", 0)) & 0xFFFF, int(float(d.get("conf", 0.0)) * 65535),
+                     int(x1), int(y1), int(x2), int(y2))
+        for box, helmet, vest in persons[:npers]:
+            x1, y1, x2, y2 = box
+            vals += (int(x1), int(y1), int(x2), int(y2), _HELMET.get(helmet, 0), 1 if vest else 0)
+        fmt = self._body_fmt(nd, npers)
+        try:
+            fmt.pack_into(buf, pos, *vals)
+        except struct.error:                       # 화면 밖 / 음수 좌표는 u16 범위로 잘라서
+            fmt.pack_into(buf, pos, *map(_u16, vals))
+        pos += fmt.size
+
+        seq = self.seq + 1
+        if t < self._last_t:
+            self._mark(seq, self._last_t - t)
+        self._last_t = t
+        _SEQ.pack_into(buf, 0, seq)
+        crc = zlib.crc32(memoryview(buf)[_REC_AT:pos], zlib.crc32(memoryview(buf)[:8]))
+        _CRC.pack_into(buf, 8, crc)
+
+        off = HEADER_SIZE + (seq % self._ring.slots) * self.slot_size
+        mm = self.mm
+        mm[off + 8:off + pos] = memoryview(buf)[8:pos]      # 본문 + CRC 먼저
+        mm[off:off + 8] = memoryview(buf)[:8]               # seq = commit 표시
+        _HEAD.pack_into(mm, _HEAD_AT, seq)
+        self.seq = seq
+        self.records += 1
+
+    def _mark(self, seq, back_s):
+        """시계가 뒤로 간 seq를 헤더에 기록 (레코드보다 먼저. 레코드를 못 쓰고 죽어도 구간만 하나 더 나뉠 뿐)."""
+        n = _U64.unpack_from(self.mm, _MARKS_AT)[0]
+        _U64.pack_into(self.mm, _MARKS_AT + 8 + 8 * (n % MAX_MARKS), seq)
+        _U64.pack_into(self.mm, _MARKS_AT, n + 1)
+        log.warning("[BB] clock went back %.1fs at seq %d, starting a new time run", back_s, seq)
+
+    def _body_fmt(self, nd, npers):
+        key = (nd, npers)
+        fmt = self._fmts.get(key)
+        if fmt is None:
+            fmt = self._fmts[key] = struct.Struct("<" + "HH4H" * nd + "4HBB" * npers)
+        return fmt
+
+    def _flush_loop(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                os.fsync(self._fd)        # mmap dirty page도 같이 내려감 (Linux), GIL 안 잡음
+            except OSError as e:
+                log.warning("[BB] flush failed: %s", e)
+
+    def close(self):
+        if self.mm.closed:
+            return
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=2.0)
+        self.mm.flush()
+        self.mm.close()
+        os.close(self._fd)
+
+
+# ---------------------------------------
+#   읽기
+# ---------------------------------------
+class BlackBoxReader:
+    """읽기 전용 mmap. 조회할 때 필요한 slot만 페이지 단위로 읽힌다."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, ver, n_stages, slot_size, slots, self.max_dets, self.max_persons, n = \
+            _HDR.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"not a blackbox file: {path}")
+        if ver != VERSION:
+            raise ValueError(f"unsupported blackbox version {ver}")
+        meta = json.loads(self.mm[_META_AT:_META_AT + n].decode("utf-8"))
+        self.names = {int(k): v for k, v in meta["names"].items()}
+        self.stages = meta["stages"]
+        self.alerts = meta.get("alerts", list(ALERTS))
+        self.created = _CREATED.unpack_from(self.mm, _HEAD_AT + 8)[0]
+        self._stage_fmt = struct.Struct(f"<{n_stages}I")
+        self._ring = _Ring(self.mm, slots, slot_size, n_stages)
+        self.newest = self._ring.newest(_HEAD.unpack_from(self.mm, _HEAD_AT)[0])
+        self.oldest = max(1, self.newest - slots + 1) if self.newest else 0
+        self._runs = self._find_runs()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.mm.close()
+
+    def _first_valid(self, seq, hi):
+        while seq <= hi and not self._ring.valid(seq):
+            seq += 1
+        return seq
+
+    def _last_valid(self, seq, lo):
+        while seq >= lo and not self._ring.valid(seq):
+            seq -= 1
+        return seq
+
+    def _find_runs(self):
+        """
+        시각이 줄지 않는 seq 구간 [(lo, hi), ...] (seq 순). 헤더의 mark로 나눈다.
+        mark가 MAX_MARKS개 넘게 쌓여서 링 안의 것을 다 모르면 레코드 시각을 처음부터 훑어서 나눈다.
+        """
+        if not self.newest:
+            return []
+        lo, hi = self.oldest, self.newest
+        n = _U64.unpack_from(self.mm, _MARKS_AT)[0]
+        kept = [_U64.unpack_from(self.mm, _MARKS_AT + 8 + 8 * i)[0] for i in range(min(n, MAX_MARKS))]
+        if n > MAX_MARKS and min(kept) > lo:
+            cuts, prev = [], None
+            for seq in range(lo, hi + 1):
+                if self._ring.valid(seq):
+                    t = self._ring.time_at(seq)
+                    if prev is not None and t < prev:
+                        cuts.append(seq)
+                    prev = t
+        else:
+            cuts = sorted(m for m in kept if lo < m <= hi)
+        bounds = [lo] + cuts + [hi + 1]
+        return [(a, b - 1) for a, b in zip(bounds, bounds[1:]) if a < b]
+
+    def seek(self, t, lo=None, hi=None):
+        """
+        lo..hi (시각이 줄지 않는 한 구간, 기본: 전체) 안에서 시간 t 이상인 첫 레코드의 seq.
+        이진 탐색, 깨진 slot은 다음 온전한 레코드 시각으로. 없으면 hi + 1.
+        """
+        lo = self.oldest if lo is None else lo
+        last = self.newest if hi is None else hi
+        hi = last + 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            s = self._first_valid(mid, last)
+            if s > last or self._ring.time_at(s) >= t:
+                hi = mid
+            else:
+                lo = s + 1
+        return lo
+
+    def span(self):
+        """(가장 이른 시각, 가장 늦은 시각, 온전한 레코드 수 추정치) 또는 None. 시계가 뒤로 간 구간도 포함."""
+        ends = []
+        for lo, hi in self._runs:
+            a, b = self._first_valid(lo, hi), self._last_valid(hi, lo)
+            if a <= b:
+                ends.append((self._ring.time_at(a), self._ring.time_at(b)))
+        if not ends:
+            return None
+        first = self._first_valid(self.oldest, self.newest)
+        return min(a for a, _ in ends), max(b for _, b in ends), self.newest - first + 1
+
+    def record(self, seq):
+        off = self._ring._off(seq)
+        mm = self.mm
+        nd, npers, code, bits, t, raw, smooth = _REC.unpack_from(mm, off + _REC_AT)
+        pos = off + _FIXED
+        us = self._stage_fmt.unpack_from(mm, pos)
+        pos += self._stage_fmt.size
+        dets = []
+        for _ in range(nd):
+            cls, conf, x1, y1, x2, y2 = _DET.unpack_from(mm, pos)
+            dets.append({"cls": cls, "conf": round(conf / 65535, 4), "box": [x1, y1, x2, y2]})
+            pos += _DET.size
+        persons = []
+        for _ in range(npers):
+            x1, y1, x2, y2, helmet, vest = _PERSON.unpack_from(mm, pos)
+            persons.append({"box": [x1, y1, x2, y2], "helmet": _HELMET_R.get(helmet), "vest": bool(vest)})
+            pos += _PERSON.size
+        return {
+            "seq": seq, "t": t,
+            "alert": self.alerts[code] if code < len(self.alerts) else None,
+            "flags": {name: bool(bits >> i & 1) for i, name in enumerate(FLAG_BITS)},
+            "raw": raw, "smooth": smooth,
+            "stages_ms": {name: v / 1000.0 for name, v in zip(self.stages, us)},
+            "dets": dets, "persons": persons,
+        }
+
+    def query(self, t0=None, t1=None):
+        """
+        t0 <= t <= t1 레코드 generator (기록 순서, 시계가 안 돌아갔으면 시간순).
+        시계가 뒤로 간 구간마다 따로 찾는다. 깨진 slot은 건너뜀.
+        """
+        for lo, hi in self._runs:
+            seq = self.seek(t0, lo, hi) if t0 is not None else lo
+            while seq <= hi:
+                if self._ring.valid(seq):
+                    if t1 is not None and self._ring.time_at(seq) > t1:
+                        break
+                    yield self.record(seq)
+                seq += 1
+
+
+# ---------------------------------------
+#   CLI
+# ---------------------------------------
+def _parse_time(s, ref):
+    """epoch 초, HH:MM[:SS] (ref 날짜 기준), 또는 YYYY-MM-DD HH:MM:SS."""
+    try:
+        return float(s)
+    except ValueError:
+        pass
+    for fmt in ("%H:%M:%S", "%H:%M:%S.%f", "%H:%M"):
+        try:
+            hms = datetime.strptime(s, fmt)
+        except ValueError:
+            continue
+        day = datetime.fromtimestamp(ref)
+        return day.replace(hour=hms.hour, minute=hms.minute, second=hms.second,
+                           microsecond=hms.microsecond).timestamp()
+    return datetime.fromisoformat(s).timestamp()
+
+
+def _fmt_t(t):
+    return datetime.fromtimestamp(t).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+def _print_record(r, names, show_dets):
+    yn = {True: "Y", False: "N", None: "?"}
+    people = " ".join(f"[{yn[p['helmet']]}{yn[p['vest']]}]" for p in r["persons"])
+    slow = sorted(r["stages_ms"].items(), key=lambda kv: -kv[1])[:3]
+    print(f"{_fmt_t(r['t'])}  #{r['seq']:<8d} {str(r['alert']):9s} raw={r['raw']:.2f} "
+          f"smooth={r['smooth']:.2f}  persons(helmet,vest)={people or '-'}  "
+          + " ".join(f"{k}={v:.1f}ms" for k, v in slow if v > 0))
+    if show_dets:
+        for d in r["dets"]:
+            print(f"      {names.get(d['cls'], d['cls'])} {d['conf']:.2f} {d['box']}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("path")
+    ap.add_argument("--from", dest="t_from", help="시작 (epoch / HH:MM[:SS] / YYYY-MM-DD HH:MM:SS)")
+    ap.add_argument("--to", dest="t_to", help="끝 (형식 --from 과 같음)")
+    ap.add_argument("--last", type=float, help="마지막 N초")
+    ap.add_argument("--dets", action="store_true", help="detection 박스까지 출력")
+    ap.add_argument("--json", action="store_true", help="레코드마다 JSON 한 줄")
+    args = ap.parse_args()
+
+    with BlackBoxReader(args.path) as r:
+        span = r.span()
+        if span is None:
+            print("(empty)")
+            return
+        first, last, n = span
+        if args.t_from is None and args.t_to is None and args.last is None:
+            print(f"{args.path}: {n} records, {_fmt_t(first)} ~ {_fmt_t(last)} "
+                  f"({last - first:.0f}s), stages: {', '.join(r.stages)}")
+            return
+        t0 = _parse_time(args.t_from, last) if args.t_from else None
+        t1 = _parse_time(args.t_to, last) if args.t_to else None
+        if args.last is not None:
+            t0 = last - args.last
+        count = 0
+        for rec in r.query(t0, t1):
+            if args.json:
+                sys.stdout.write(json.dumps(rec, separators=(",", ":")) + "\n")
+            else:
+                _print_record(rec, r.names, args.dets)
+            count += 1
+        if not args.json:
+            print(f"-- {count} records")
+
+
+if __name__ == "__main__":
+    main()
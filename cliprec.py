@@ -0,0 +1,147 @@
+import logging
+import math
+import multiprocessing as mp
+import os
+import queue
+import sys
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from slog import DEFAULT_FORMAT
+
+log = logging.getLogger("cliprec")
+
+
+# ---------------------------------------
+#   위반 전/후 영상 클립 녹화
+#
+#   shared memory 링 버퍼: [slot seq i64 x cap][slot time f64 x cap][frame x cap]
+#   - main은 축소한 프레임을 slot (i % cap)에 쓰고 seq[slot] = i (쓰는 동안은 -1)
+#   - 이벤트가 끝나면(post_s 지남) (경로, 시작 i, 끝 i)만 큐로 넘기고
+#     인코더 프로세스가 링에서 직접 읽어서 인코딩. 프레임 복사가 프로세스 사이를 오가지 않는다.
+#   - 인코딩이 밀려 링이 한 바퀴 돌아버린 프레임은 seq가 달라서 건너뜀
+#   메모리는 cap 장 고정, main은 큐가 차도 put_nowait 실패로 버리고 절대 기다리지 않는다.
+# ---------------------------------------
+class ClipRecorder:
+    def __init__(self, out_dir="clips", fps=8, pre_s=5.0, post_s=5.0, width=426, height=240,
+                 headroom_s=5.0, codec="mp4v", ext=".mp4", max_pending=4, name=None):
+        self.out_dir = out_dir
+        self.fps = float(fps)
+        self.w, self.h = int(width), int(height)
+        self.pre_n = int(math.ceil(pre_s * self.fps))
+        self.post_s = float(post_s)
+        # 인코더가 이전 클립을 읽는 동안 덮어쓰지 않도록 headroom 만큼 여유
+        self.cap = self.pre_n + int(math.ceil((post_s + headroom_s) * self.fps)) + 1
+        self.ext = ext
+
+        frame_bytes = self.w * self.h * 3
+        size = self.cap * 16 + self.cap * frame_bytes
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.seq = np.ndarray((self.cap,), np.int64, self.shm.buf, 0)
+        self.ts = np.ndarray((self.cap,), np.float64, self.shm.buf, self.cap * 8)
+        self.frames = np.ndarray((self.cap, self.h, self.w, 3), np.uint8, self.shm.buf, self.cap * 16)
+        self.seq[:] = -1
+
+        self.head = 0                 # 다음에 쓸 프레임 번호
+        self._next_t = 0.0
+        self._event = None            # (경로, 시작 번호, 끝나는 시각)
+        self.dropped = 0              # 큐가 차서 버린 클립 수
+
+        os.makedirs(out_dir, exist_ok=True)
+        ctx = mp.get_context("spawn")     # main은 스레드가 많아서 fork 대신 spawn
+        self._q = ctx.Queue(max_pending)
+        self._proc = ctx.Process(
+            target=_encoder_main, name="clip-encoder", daemon=True,
+            args=(self.shm.name, self.cap, self.h, self.w, self.fps, codec, self._q,
+                  logging.getLogger().getEffectiveLevel()),
+        )
+        self._proc.start()
+        log.info("[CLIP] ring %d frames %dx%d (%.1f MB) -> %s",
+                 self.cap, self.w, self.h, size / 2**20, out_dir)
+
+    def push(self, frame, t):
+        """fps 주기가 됐으면 축소해서 링에 쓰기. 진행 중인 이벤트가 끝났으면 인코더로 넘김."""
+        if t >= self._next_t:
+            self._next_t = max(self._next_t + 1.0 / self.fps, t)   # 밀렸으면 몰아서 쓰지 않음
+            slot = self.head % self.cap
+            self.seq[slot] = -1
+            # INTER_AREA는 배율이 정수가 아니면 10배 가까이 느려서 LINEAR
+            cv2.resize(frame, (self.w, self.h), dst=self.frames[slot], interpolation=cv2.INTER_LINEAR)
+            self.ts[slot] = t
+            self.seq[slot] = self.head
+            self.head += 1
+
+        if self._event is not None and t >= self._event[2]:
+            self._flush()
+
+    def trigger(self, label, t):
+        """위반 발생. 이미 클립을 모으는 중이면 무시 (그 클립에 포함됨)."""
+        if self._event is not None:
+            return False
+        name = time.strftime("%Y%m%d_%H%M%S", time.localtime(t)) + f"_{label}{self.ext}"
+        self._event = (os.path.join(self.out_dir, name), max(0, self.head - self.pre_n), t + self.post_s)
+        return True
+
+    def _flush(self):
+        path, start, _ = self._event
+        self._event = None
+        try:
+            self._q.put_nowait((path, start, self.head))
+        except queue.Full:
+            self.dropped += 1
+            log.warning("[CLIP] encoder busy, dropped %s", path)
+
+    def close(self, timeout=10.0):
+        if self._event is not None:
+            self._flush()
+        try:
+            self._q.put(None, timeout=1.0)
+        except queue.Full:
+            pass
+        self._proc.join(timeout)
+        if self._proc.is_alive():
+            self._proc.terminate()
+        # numpy view가 shm 버퍼를 잡고 있으면 close가 실패하므로 먼저 놓는다
+        del self.seq, self.ts, self.frames
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _encoder_main(shm_name, cap, h, w, fps, codec, q, log_level=logging.INFO):
+    # spawn 자식은 부모 logging 설정(QueueListener)을 못 물려받으므로 같은 형식으로 stderr에 직접
+    logging.basicConfig(level=log_level, format=DEFAULT_FORMAT, stream=sys.stderr)
+    # spawn된 자식은 부모와 같은 resource_tracker를 쓰므로 등록 해제(framebus._attach)는 하지 않는다
+    shm = shared_memory.SharedMemory(name=shm_name)
+    seq = np.ndarray((cap,), np.int64, shm.buf, 0)
+    frames = np.ndarray((cap, h, w, 3), np.uint8, shm.buf, cap * 16)
+    fourcc = cv2.VideoWriter_fourcc(*codec)
+    buf = np.empty((h, w, 3), np.uint8)
+    try:
+        while True:
+            job = q.get()
+            if job is None:
+                break
+            path, start, end = job
+            vw = cv2.VideoWriter(path, fourcc, fps, (w, h))
+            written = lost = 0
+            for i in range(start, end):
+                slot = i % cap
+                if seq[slot] != i:
+                    lost += 1
+                    continue
+                np.copyto(buf, frames[slot])
+                if seq[slot] != i:            # 복사하는 사이 덮어써짐
+                    lost += 1
+                    continue
+                vw.write(buf)
+                written += 1
+            vw.release()
+            log.info("[CLIP] saved %s (%d frames, %d lost)", path, written, lost)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        del seq, frames
+        shm.close()
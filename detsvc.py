@@ -0,0 +1,322 @@
+"""
+공유 detector 서비스.
+
+카메라마다 main.py를 하나씩 띄우면 YOLO 가중치 + torch가 프로세스마다 올라가서
+라즈베리파이 RAM이 부족해진다. 이 서비스가 모델을 한 번만 올리고,
+각 main.py는 config.yaml inference.service_socket 을 설정하면
+build_detector()가 DetectorClient를 돌려준다.
+
+    python detsvc.py                        # config.yaml inference 설정으로 모델 로드
+    python detsvc.py --source synth         # 모델 없이 (부하 테스트용 가짜 detection)
+
+프레임은 클라이언트가 만든 shared memory 링에 쓰고, AF_UNIX 소켓으로는
+한 줄짜리 JSON 요청/응답만 주고받는다.
+  → {"op": "ring", "shm": 이름, "slots": n, "slot_bytes": b}
+  → {"id": 7, "slot": 3, "h": 720, "w": 1280, "c": 3}
+  ← {"id": 7, "dets": [...]}            (접속 직후 서비스가 {"names": {...}} 먼저 보냄)
+서비스는 window_ms 안에 들어온 요청을 모아서 infer_batch() 한 번으로 처리한다.
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import yaml
+
+from framebus import _attach
+from infer_yolo import BaseDetector
+
+log = logging.getLogger("detsvc")
+
+DEFAULT_SOCKET = "/tmp/smart_safety_det.sock"
+
+
+def _send(sock, lock, obj):
+    data = (json.dumps(obj, separators=(",", ":")) + "\n").encode("utf-8")
+    with lock:
+        sock.sendall(data)
+
+
+# ---------------------------------------
+#   서비스
+# ---------------------------------------
+class _Conn:
+    def __init__(self, sock):
+        self.sock = sock
+        self.wlock = threading.Lock()
+        self.shm = None
+        self.slot_bytes = 0
+        self.alive = True
+
+    def set_ring(self, name, slot_bytes):
+        # 이전 링은 닫지 않고 참조만 놓는다. 아직 큐에 있는 요청이 잡고 있다가 다 쓰면 GC가 닫음
+        self.shm = _attach(name)
+        self.slot_bytes = slot_bytes
+
+
+def _frame(ring, req):
+    shm, slot_bytes = ring
+    h, w, c, slot = req["h"], req["w"], req.get("c", 3), req["slot"]
+    if not all(isinstance(v, int) and not isinstance(v, bool) for v in (h, w, c, slot)):
+        raise ValueError("bad frame request")
+    n = h * w * c
+    off = slot * slot_bytes
+    # 시작뿐 아니라 프레임 끝까지 링 안에 있어야 함 (아니면 남의 메모리 / 범위 밖을 읽음)
+    if shm is None or min(h, w, c) <= 0 or n > slot_bytes or slot < 0 or off + n > shm.size:
+        raise ValueError("bad frame request")
+    return np.ndarray((h, w, c), np.uint8, shm.buf, off)
+
+
+class DetectorService:
+    def __init__(self, detector, path=DEFAULT_SOCKET, window_ms=5.0, max_batch=8):
+        self.det = detector
+        self.path = path
+        self.window_s = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._q = queue.Queue()
+        self._stop = threading.Event()
+        self.batches = 0
+        self.frames = 0
+        self.clients = 0
+        self._clients_lock = threading.Lock()    # 클라이언트마다 reader 스레드가 따로 증감
+
+        if os.path.exists(path):
+            os.unlink(path)          # 이전 실행이 남긴 소켓 파일
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(path)
+        self.server.listen(16)
+        names = detector.names or {}
+        if isinstance(names, (list, tuple)):
+            names = dict(enumerate(names))
+        self._hello = {"names": {str(k): v for k, v in names.items()}}
+
+    def serve_forever(self):
+        threading.Thread(target=self._batch_loop, name="detsvc-batch", daemon=True).start()
+        log.info("[DETSVC] listening on %s (window %.1fms, max batch %d)",
+                 self.path, self.window_s * 1000, self.max_batch)
+        try:
+            while not self._stop.is_set():
+                try:
+                    sock, _ = self.server.accept()
+                except OSError:
+                    break
+                threading.Thread(target=self._reader, args=(_Conn(sock),), daemon=True).start()
+        finally:
+            self.close()
+
+    def close(self):
+        self._stop.set()
+        self._q.put(None)
+        self.server.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def _reader(self, conn):
+        """클라이언트 하나의 요청을 읽어서 배치 큐에 넣는다."""
+        with self._clients_lock:
+            self.clients += 1
+        try:
+            _send(conn.sock, conn.wlock, self._hello)
+            for line in conn.sock.makefile("rb"):
+                req = json.loads(line)
+                if req.get("op") == "ring":
+                    conn.set_ring(req["shm"], req["slot_bytes"])
+                    continue
+                # 요청을 받은 시점의 링을 같이 넘김 (중간에 링이 바뀌어도 안전)
+                self._q.put((conn, (conn.shm, conn.slot_bytes), req))
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            log.debug("[DETSVC] client error: %r", e)
+        finally:
+            with self._clients_lock:
+                self.clients -= 1
+            conn.alive = False
+            conn.shm = None
+            conn.sock.close()
+
+    def _batch_loop(self):
+        while True:
+            first = self._q.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.window_s
+            # 접속한 클라이언트가 전부 요청을 넣었으면 window를 다 기다릴 필요 없음
+            while len(batch) < min(self.max_batch, max(1, self.clients)):
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    break
+                try:
+                    item = self._q.get(timeout=left)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._q.put(None)
+                    break
+                batch.append(item)
+            self._run(batch)
+
+    def _run(self, batch):
+        jobs, frames = [], []
+        for conn, ring, req in batch:
+            if not conn.alive:
+                continue
+            try:
+                frames.append(_frame(ring, req))
+                jobs.append((conn, req["id"]))
+            except (ValueError, KeyError, TypeError) as e:
+                self._reply(conn, {"id": req.get("id"), "error": str(e)})
+        if not frames:
+            return
+
+        try:
+            results = self.det.infer_batch(frames)
+        except Exception as e:
+            log.error("[DETSVC] inference failed: %s", e)
+            results = None
+        del frames, batch
+        self.batches += 1
+        self.frames += len(jobs)
+
+        for i, (conn, rid) in enumerate(jobs):
+            if results is None:
+                self._reply(conn, {"id": rid, "error": "inference failed"})
+            else:
+                self._reply(conn, {"id": rid, "dets": results[i]})
+
+    def _reply(self, conn, obj):
+        try:
+            _send(conn.sock, conn.wlock, obj)
+        except OSError:
+            conn.alive = False
+
+
+# ---------------------------------------
+#   클라이언트 (main.py 쪽)
+# ---------------------------------------
+class DetectorClient(BaseDetector):
+    """
+    detsvc 서비스에 붙는 detector. infer()는 기존과 똑같이 blocking.
+    프레임은 자기 shared memory 링(slots칸)에 쓰고 번호만 보낸다.
+    """
+
+    def __init__(self, path=DEFAULT_SOCKET, slots=4, timeout=10.0):
+        self.path = path
+        self.slots = slots
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(path)
+        self._rfile = self.sock.makefile("rb")
+        self._wlock = threading.Lock()
+        try:
+            hello = json.loads(self._rfile.readline())
+            self.names = {int(k): v for k, v in hello["names"].items()}
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            # 서비스가 아닌 다른 게 소켓에 있거나 버전이 다름 → build_detector가 직접 로드로 폴백
+            self._rfile.close()
+            self.sock.close()
+            raise ValueError(f"bad hello from detector service at {path}: {e!r}") from None
+        self.shm = None
+        self.slot_bytes = 0
+        self._next_id = 0
+        self._next_slot = 0
+
+    def _ensure_ring(self, nbytes):
+        if self.shm is not None and nbytes <= self.slot_bytes:
+            return
+        old = self.shm
+        self.shm = shared_memory.SharedMemory(create=True, size=nbytes * self.slots)
+        self.slot_bytes = nbytes
+        _send(self.sock, self._wlock,
+              {"op": "ring", "shm": self.shm.name, "slots": self.slots, "slot_bytes": nbytes})
+        if old is not None:
+            old.close()
+            old.unlink()
+
+    def _put(self, frame):
+        """프레임을 링에 쓰고 요청을 보낸다. 요청 id 리턴."""
+        frame = np.ascontiguousarray(frame)
+        h, w = frame.shape[:2]
+        c = frame.shape[2] if frame.ndim == 3 else 1
+        self._ensure_ring(frame.nbytes)
+        slot = self._next_slot
+        self._next_slot = (slot + 1) % self.slots
+        dst = np.ndarray(frame.shape, np.uint8, self.shm.buf, slot * self.slot_bytes)
+        np.copyto(dst, frame)
+        del dst
+        rid = self._next_id
+        self._next_id += 1
+        _send(self.sock, self._wlock, {"id": rid, "slot": slot, "h": h, "w": w, "c": c})
+        return rid
+
+    def _get(self):
+        line = self._rfile.readline()
+        if not line:
+            raise ConnectionError("detector service closed the connection")
+        resp = json.loads(line)
+        if "error" in resp:
+            raise RuntimeError(f"detector service: {resp['error']}")
+        return resp["id"], resp["dets"]
+
+    def infer(self, frame_bgr):
+        rid = self._put(frame_bgr)
+        got, dets = self._get()
+        if got != rid:
+            raise RuntimeError(f"detector service reply out of order ({got} != {rid})")
+        return dets
+
+    def close(self):
+        # inflight_depth > 1 이면 BaseDetector worker 스레드부터 정리 (모델 재로드마다 새 클라이언트)
+        super().close()
+        try:
+            self._rfile.close()      # makefile이 fd를 잡고 있으면 sock.close()만으로는 서비스가 EOF를 못 봄
+            self.sock.close()
+        finally:
+            if self.shm is not None:
+                self.shm.close()
+                self.shm.unlink()
+                self.shm = None
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--config", default="config.yaml")
+    ap.add_argument("--socket", help="기본: inference.service_socket 또는 " + DEFAULT_SOCKET)
+    ap.add_argument("--window-ms", type=float, help="요청을 모으는 시간 (기본: inference.service_window_ms)")
+    ap.add_argument("--max-batch", type=int, help="배치 최대 크기 (기본: inference.service_max_batch)")
+    ap.add_argument("--source", help="모델 대신 가짜 detection (synth / synth:<scene> / .ssdr)")
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    with open(args.config, "r", encoding="utf-8") as f:
+        cfg = yaml.safe_load(f)
+    inf = cfg["inference"]
+
+    if args.source:
+        from soak import build_source
+        _, det = build_source(args.source, cfg["camera"])
+    else:
+        from infer_yolo import build_local_detector
+        det = build_local_detector(inf)
+
+    svc = DetectorService(
+        det,
+        path=args.socket or inf.get("service_socket") or DEFAULT_SOCKET,
+        window_ms=args.window_ms if args.window_ms is not None else inf.get("service_window_ms", 5.0),
+        max_batch=args.max_batch or inf.get("service_max_batch", 8),
+    )
+    try:
+        svc.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        log.info("[DETSVC] %d frames in %d batches", svc.frames, svc.batches)
+
+
+if __name__ == "__main__":
+    main()
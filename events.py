@@ -0,0 +1,94 @@
+import json
+import queue
+import threading
+import time
+
+
+class EventHub:
+    """
+    Server-Sent Events 브로드캐스터.
+    - publish()는 메시지를 한 번만 직렬화해서 모든 구독자 큐에 넣는다.
+    - 구독자 큐가 가득 차면(느린 클라이언트) 그 구독자는 끊어버린다.
+      브라우저 EventSource가 알아서 재접속하고, 접속 시 스냅샷을 다시 받으므로 상태는 복구됨.
+    - 보낼 게 없으면 heartbeat_s마다 주석 줄(": ping")을 보내서 프록시/브라우저 연결을 유지.
+    """
+
+    def __init__(self, max_queue=64, max_clients=256, heartbeat_s=15.0):
+        self.max_queue = max_queue
+        self.max_clients = max_clients
+        self.heartbeat_s = heartbeat_s
+        self._subs = {}     # queue -> 구독 topic set (None이면 전부)
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.dropped = 0    # 느려서 끊긴 구독자 수 (누적)
+
+    @staticmethod
+    def format(event, data, event_id=None):
+        msg = f"event: {event}\n"
+        if event_id is not None:
+            msg += f"id: {event_id}\n"
+        msg += f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+        return msg.encode("utf-8")
+
+    def clients(self):
+        with self._lock:
+            return len(self._subs)
+
+    def subscribe(self, topics=None):
+        """새 구독자 큐. 최대 접속 수를 넘으면 None."""
+        q = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            if len(self._subs) >= self.max_clients:
+                return None
+            self._subs[q] = set(topics) if topics else None
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subs.pop(q, None)
+
+    def publish(self, event, data):
+        with self._lock:
+            self._next_id += 1
+            msg = self.format(event, data, self._next_id)
+            subs = [q for q, topics in self._subs.items()
+                    if topics is None or event in topics]
+
+        for q in subs:
+            try:
+                q.put_nowait(msg)
+            except queue.Full:
+                # 못 따라오는 클라이언트: 큐를 비우고 종료 신호(None)만 남김
+                self.unsubscribe(q)
+                self.dropped += 1
+                with q.mutex:
+                    q.queue.clear()
+                q.put_nowait(None)
+
+    def close(self):
+        """서버 종료 시 모든 스트림에 종료 신호를 보내서 generator가 정상 종료되게 함."""
+        with self._lock:
+            subs = list(self._subs)
+            self._subs.clear()
+        for q in subs:
+            with q.mutex:
+                q.queue.clear()
+            q.put_nowait(None)
+
+    def stream(self, q, initial=()):
+        """Flask Response에 넘길 generator. initial은 접속 직후 보낼 메시지들."""
+        try:
+            yield b"retry: 2000\n\n"
+            for msg in initial:
+                yield msg
+            while True:
+                try:
+                    msg = q.get(timeout=self.heartbeat_s)
+                except queue.Empty:
+                    yield f": ping {int(time.time())}\n\n".encode()
+                    continue
+                if msg is None:
+                    return
+                yield msg
+        finally:
+            self.unsubscribe(q)
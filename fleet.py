@@ -0,0 +1,213 @@
+import json
+import sqlite3
+import threading
+import time
+
+
+def _new_device(device_id, now):
+    return {
+        "device": device_id,
+        "latest": None,
+        "last_seen": now,
+        "events": 0,
+        "counts": {},
+        "rate": 0.0,
+    }
+
+
+def _apply(dev, events, now):
+    """장치 하나에 이벤트 묶음을 반영하고 최신 알림을 리턴 (두 레지스트리 공용)."""
+    # 초당 이벤트 수 (지수이동평균)
+    dt = max(1e-3, now - dev["last_seen"])
+    if dev["events"]:
+        a = min(1.0, dt / 10.0)
+        dev["rate"] += a * (len(events) / dt - dev["rate"])
+    dev["last_seen"] = now
+
+    counts = dev["counts"]
+    for ev in events:
+        t = ev.get("type", "unknown")
+        counts[t] = counts.get(t, 0) + 1
+    if events:
+        ev = events[-1]
+        dev["latest"] = {
+            "device": dev["device"],
+            "type": ev.get("type", "unknown"),
+            "time": float(ev.get("time", now)),
+        }
+        dev["events"] += len(events)
+    return dev["latest"]
+
+
+def _overview(devices, now, stale_s, version):
+    out = []
+    for d in devices:
+        out.append({
+            "device": d["device"],
+            "latest": d["latest"],
+            "last_seen": d["last_seen"],
+            "online": now - d["last_seen"] < stale_s,
+            "events": d["events"],
+            "counts": dict(d["counts"]),
+            "rate": round(d["rate"], 2),
+        })
+    return {"devices": out, "total": len(out),
+            "online": sum(1 for d in out if d["online"]), "version": version}
+
+
+class FleetRegistry:
+    """
+    여러 엣지 장치(라즈베리파이)의 최신 상태를 장치별로 들고 있는 in-memory 레지스트리.
+    - ingest()로 장치 하나의 이벤트 묶음을 한 번에 반영 (lock 한 번)
+    - 장치 수는 max_devices로 제한 (가장 오래 조용한 장치부터 밀어냄)
+    - version은 뭔가 바뀔 때마다(heartbeat 포함), alert_version은 새 이벤트가 들어올 때만 1씩 증가
+    한 프로세스(여러 스레드) 안에서만 공유된다. 워커 프로세스가 여럿이면 SqliteFleetRegistry.
+    """
+
+    shared = False
+
+    def __init__(self, max_devices=1000, stale_s=10.0):
+        self.max_devices = max_devices
+        self.stale_s = stale_s
+        self.devices = {}
+        self.epoch = format(int(time.time() * 1000), "x")   # 재시작 구분용 (ETag에 사용)
+        self._version = 0
+        self._alert_version = 0
+        self._latest = None          # 전체 장치 중 가장 최근 알림
+        self._lock = threading.Lock()
+
+    def ingest(self, device_id, events, now=None):
+        """events: [{"type": str, "time": float(선택)}, ...]. 빈 리스트면 heartbeat."""
+        now = time.time() if now is None else now
+        with self._lock:
+            dev = self.devices.get(device_id)
+            if dev is None:
+                if len(self.devices) >= self.max_devices:
+                    oldest = min(self.devices.values(), key=lambda d: d["last_seen"])
+                    del self.devices[oldest["device"]]
+                dev = self.devices[device_id] = _new_device(device_id, now)
+
+            latest = _apply(dev, events, now)
+            if events:
+                self._latest = latest
+                self._alert_version += 1
+            self._version += 1
+            return latest
+
+    def version(self):
+        return self._version
+
+    def alert_version(self):
+        return self._alert_version
+
+    def latest(self, device_id=None):
+        with self._lock:
+            if device_id is None:
+                return self._latest
+            dev = self.devices.get(device_id)
+            return dev["latest"] if dev else None
+
+    def overview(self, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            return _overview(list(self.devices.values()), now, self.stale_s, self._version)
+
+
+class SqliteFleetRegistry:
+    """
+    FleetRegistry와 같은 인터페이스를 SQLite(WAL) 파일 위에 구현.
+    gunicorn 등으로 워커 프로세스를 여러 개 띄울 때 모든 워커가 같은 상태를 본다.
+    연결은 스레드마다 하나씩.
+    """
+
+    shared = True
+
+    def __init__(self, path="fleet_state.db", max_devices=1000, stale_s=10.0):
+        self.path = path
+        self.max_devices = max_devices
+        self.stale_s = stale_s
+        self._local = threading.local()
+        with self._conn(write=True) as c:
+            c.execute("CREATE TABLE IF NOT EXISTS devices ("
+                      "device TEXT PRIMARY KEY, last_seen REAL, data TEXT)")
+            c.execute("CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT)")
+            c.execute("INSERT OR IGNORE INTO meta VALUES ('version', '0')")
+            c.execute("INSERT OR IGNORE INTO meta VALUES ('alert_version', '0')")
+            c.execute("INSERT OR IGNORE INTO meta VALUES ('epoch', ?)",
+                      (format(int(time.time() * 1000), "x"),))
+            self.epoch = c.execute("SELECT v FROM meta WHERE k='epoch'").fetchone()[0]
+        # 만든 스레드(보통 fork 전 master)의 연결은 닫아둔다. 연결은 fork 후에 새로 연다.
+        self._local.conn.close()
+        del self._local.conn
+
+    def _conn(self, write=False):
+        c = getattr(self._local, "conn", None)
+        if c is None:
+            c = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            c.execute("PRAGMA journal_mode=WAL")
+            c.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = c
+        return _Tx(c, write)
+
+    def ingest(self, device_id, events, now=None):
+        now = time.time() if now is None else now
+        with self._conn(write=True) as c:
+            row = c.execute("SELECT data FROM devices WHERE device=?", (device_id,)).fetchone()
+            if row is None:
+                n = c.execute("SELECT COUNT(*) FROM devices").fetchone()[0]
+                if n >= self.max_devices:
+                    c.execute("DELETE FROM devices WHERE device = "
+                              "(SELECT device FROM devices ORDER BY last_seen LIMIT 1)")
+                dev = _new_device(device_id, now)
+            else:
+                dev = json.loads(row[0])
+
+            latest = _apply(dev, events, now)
+            c.execute("INSERT OR REPLACE INTO devices VALUES (?, ?, ?)",
+                      (device_id, now, json.dumps(dev)))
+            if events:
+                c.execute("INSERT OR REPLACE INTO meta VALUES ('latest', ?)", (json.dumps(latest),))
+                c.execute("UPDATE meta SET v = CAST(v AS INTEGER) + 1 WHERE k = 'alert_version'")
+            c.execute("UPDATE meta SET v = CAST(v AS INTEGER) + 1 WHERE k = 'version'")
+            return latest
+
+    def version(self):
+        with self._conn() as c:
+            return int(c.execute("SELECT v FROM meta WHERE k='version'").fetchone()[0])
+
+    def alert_version(self):
+        with self._conn() as c:
+            return int(c.execute("SELECT v FROM meta WHERE k='alert_version'").fetchone()[0])
+
+    def latest(self, device_id=None):
+        with self._conn() as c:
+            if device_id is None:
+                row = c.execute("SELECT v FROM meta WHERE k='latest'").fetchone()
+                return json.loads(row[0]) if row else None
+            row = c.execute("SELECT data FROM devices WHERE device=?", (device_id,)).fetchone()
+            return json.loads(row[0])["latest"] if row else None
+
+    def overview(self, now=None):
+        now = time.time() if now is None else now
+        with self._conn() as c:
+            rows = c.execute("SELECT data FROM devices").fetchall()
+            version = int(c.execute("SELECT v FROM meta WHERE k='version'").fetchone()[0])
+        return _overview([json.loads(r[0]) for r in rows], now, self.stale_s, version)
+
+
+class _Tx:
+    """
+    BEGIN ... COMMIT/ROLLBACK 컨텍스트.
+    쓰기는 BEGIN IMMEDIATE로 처음부터 write lock을 잡아서 다른 워커와의 충돌(SQLITE_BUSY)을 피함.
+    """
+
+    def __init__(self, conn, write):
+        self.conn = conn
+        self.write = write
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE" if self.write else "BEGIN")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
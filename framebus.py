@@ -0,0 +1,199 @@
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+# ---------------------------------------
+#   main.py → server.py 최신 프레임 전달용 shared memory 슬롯
+#
+#   [seq u64][w u32][h u32][c u32][pad u32][reader_ts f64] + 프레임 데이터
+#   - seq가 홀수면 쓰는 중 (seqlock). 읽는 쪽은 읽기 전/후 seq가 같고 짝수일 때만 채택.
+#   - reader_ts는 server가 마지막으로 읽으러 온 시각. 아무도 안 보면 main은 복사도 생략.
+# ---------------------------------------
+HEADER = struct.Struct("<QIIIId")
+SEQ = struct.Struct("<Q")
+READER_TS = struct.Struct("<d")
+READER_TS_OFF = 24
+DEFAULT_NAME = "smart_safety_frame"
+
+
+def _attach(name):
+    shm = shared_memory.SharedMemory(name=name)
+    # 3.13 미만은 attach만 해도 resource_tracker가 종료 시 unlink 해버리므로 등록 해제
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    return shm
+
+
+class FrameSlot:
+    """쓰는 쪽(main.py). 최신 프레임 한 장을 같은 자리에 덮어쓴다."""
+
+    def __init__(self, name=DEFAULT_NAME, max_width=960, max_height=540, idle_s=2.0):
+        self.max_w, self.max_h = int(max_width), int(max_height)
+        self.idle_s = idle_s
+        size = HEADER.size + self.max_w * self.max_h * 3
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # 이전 실행이 비정상 종료하면서 남긴 슬롯 → 지우고 다시 만든다
+            old = _attach(name)
+            old.close()
+            old.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        HEADER.pack_into(self.shm.buf, 0, 0, 0, 0, 0, 0, 0.0)
+        self.seq = 0
+
+    def watched(self):
+        """최근 idle_s 안에 누가 읽으러 왔으면 True."""
+        ts = READER_TS.unpack_from(self.shm.buf, READER_TS_OFF)[0]
+        return time.time() - ts < self.idle_s
+
+    def publish(self, frame):
+        import cv2
+        h, w = frame.shape[:2]
+        if w > self.max_w or h > self.max_h:
+            s = min(self.max_w / w, self.max_h / h)
+            frame = cv2.resize(frame, (max(1, int(w * s)), max(1, int(h * s))),
+                               interpolation=cv2.INTER_AREA)
+            h, w = frame.shape[:2]
+        c = frame.shape[2] if frame.ndim == 3 else 1
+
+        buf = self.shm.buf
+        SEQ.pack_into(buf, 0, self.seq + 1)           # 홀수: 쓰는 중
+        dst = np.ndarray((h, w, c), dtype=np.uint8, buffer=buf, offset=HEADER.size)
+        np.copyto(dst, frame.reshape(h, w, c))
+        struct.pack_into("<III", buf, 8, w, h, c)
+        self.seq += 2
+        SEQ.pack_into(buf, 0, self.seq)               # 짝수: 완료
+
+    def close(self):
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class FrameReader:
+    """읽는 쪽(server.py). 슬롯이 아직 없거나 main이 재시작해도 알아서 다시 붙는다."""
+
+    STALE_S = 5.0
+
+    def __init__(self, name=DEFAULT_NAME):
+        self.name = name
+        self.shm = None
+        self._last_new = 0.0
+
+    def _ensure(self):
+        if self.shm is None:
+            try:
+                self.shm = _attach(self.name)
+            except FileNotFoundError:
+                return False
+            self._last_new = time.time()
+        return True
+
+    def touch(self):
+        if self._ensure():
+            READER_TS.pack_into(self.shm.buf, READER_TS_OFF, time.time())
+
+    def read(self, last_seq=0):
+        """(seq, frame) 새 프레임이 없거나 쓰는 중이면 None."""
+        if not self._ensure():
+            return None
+        buf = self.shm.buf
+        seq, w, h, c, _, _ = HEADER.unpack_from(buf, 0)
+        if seq == last_seq or seq & 1 or not w:
+            # 한동안 안 바뀌면 main이 슬롯을 새로 만들었을 수 있으니 다시 붙기
+            if time.time() - self._last_new > self.STALE_S:
+                self.shm.close()
+                self.shm = None
+            return None
+        frame = np.ndarray((h, w, c), dtype=np.uint8, buffer=buf, offset=HEADER.size).copy()
+        if SEQ.unpack_from(buf, 0)[0] != seq:
+            return None                                 # 읽는 도중 덮어써짐
+        self._last_new = time.time()
+        return seq, frame
+
+
+class MjpegStreamer:
+    """
+    FrameReader에서 새 프레임이 올 때만 JPEG으로 한 번 인코딩하고
+    모든 시청자에게 같은 바이트를 나눠준다. 시청자가 없으면 인코딩 스레드도 멈춘다.
+    """
+
+    KEEPALIVE_S = 5.0    # 새 프레임 없이 이만큼 지나면 마지막 JPEG 재전송
+    IDLE_MAX = 6         # 보낼 JPEG도 없이 KEEPALIVE_S x 이 횟수면 스트림 종료
+
+    def __init__(self, reader, fps=10, quality=70):
+        self.reader = reader
+        self.period = 1.0 / max(1, fps)
+        self.quality = int(quality)
+        self.viewers = 0
+        self.jpeg = None
+        self.jpeg_seq = 0
+        self._cond = threading.Condition()
+        self._running = False
+        self._closed = False
+
+    def _encode_loop(self):
+        import cv2
+        last = 0
+        while True:
+            with self._cond:
+                if self.viewers == 0 or self._closed:
+                    self._running = False
+                    return
+            self.reader.touch()
+            got = self.reader.read(last)
+            if got is not None:
+                last, frame = got
+                ok, enc = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+                if ok:
+                    with self._cond:
+                        self.jpeg = enc.tobytes()
+                        self.jpeg_seq += 1
+                        self._cond.notify_all()
+            time.sleep(self.period)
+
+    def close(self):
+        """서버 종료 시 시청 중인 스트림을 모두 끝낸다."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def stream(self):
+        with self._cond:
+            self.viewers += 1
+            if not self._running:
+                self._running = True
+                threading.Thread(target=self._encode_loop, daemon=True).start()
+        seen = idle = 0
+        try:
+            while True:
+                with self._cond:
+                    if not self._cond.wait_for(lambda: self.jpeg_seq != seen or self._closed,
+                                               timeout=self.KEEPALIVE_S):
+                        # 새 프레임이 없어도 마지막 JPEG을 다시 보내야 끊긴 시청자를 알아챈다
+                        # (안 보내면 viewers가 0이 안 돼서 인코딩 스레드 / 서버 worker가 계속 붙잡힘)
+                        idle += 1
+                        if self.jpeg is None:
+                            if idle >= self.IDLE_MAX:
+                                return          # 프레임이 한 번도 안 옴: 연결 정리
+                            continue
+                    else:
+                        idle = 0
+                    if self._closed:
+                        return
+                    seen, jpeg = self.jpeg_seq, self.jpeg
+                yield (b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: "
+                       + str(len(jpeg)).encode() + b"\r\n\r\n" + jpeg + b"\r\n")
+        finally:
+            with self._cond:
+                self.viewers -= 1
@@ -0,0 +1,212 @@
+import copy
+import logging
+import os
+import threading
+
+import yaml
+
+from alerts import LEVELS, _check_patterns
+
+log = logging.getLogger("hotreload")
+
+
+# ---------------------------------------
+#   config.yaml 실행 중 반영
+#   - 감시 스레드가 mtime/size를 폴링하다가 바뀌면 읽고 검증까지 끝낸 dict를 넘겨둔다
+#   - main은 프레임 사이에 poll()로 받아서 한 번에 적용 (프레임 도중에 값이 섞이지 않음)
+#   - 검증 실패하면 로그만 남기고 이전 설정을 계속 사용
+# ---------------------------------------
+
+# 실행 중 반영 가능한 섹션 / 키. None이면 섹션 전체, 튜플이면 그 키만 반영되고
+# 나머지 키(핀 번호, clips.enabled / pre_s ...)는 바뀌면 재시작 필요 안내만 한다.
+LIVE_KEYS = {
+    "logic": None,
+    "inference": None,
+    "gpio": ("patterns", "buzzer_on_ms", "buzzer_off_ms"),
+    "clips": ("triggers",),
+}
+LIVE_SECTIONS = tuple(LIVE_KEYS)
+
+# logic 값 범위: 키 -> (최소, 최대)
+_LOGIC_RANGES = {
+    "temporal_window": (1, 1000),
+    "min_person_size_px": (0, 10 ** 7),
+    "head_ratio": (0.0, 1.0),
+    "helmet_head_iou": (0.0, 1.0),
+    "helmet_min_conf": (0.0, 1.0),
+    "vest_torso_top_ratio": (0.0, 1.0),
+    "vest_torso_bottom_ratio": (0.0, 1.0),
+    "vest_torso_iou": (0.0, 1.0),
+    "vest_draw_top_ratio": (0.0, 1.0),
+    "vest_draw_bottom_ratio": (0.0, 1.0),
+    "vest_min_frames": (1, 1000),
+    "alert_threshold": (0.0, 1.0),
+    "min_ppe_conf": (0.0, 1.0),
+}
+
+
+def validate(cfg):
+    """잘못된 값이 있으면 ValueError. 통과하면 그대로 적용해도 되는 설정."""
+    if not isinstance(cfg, dict):
+        raise ValueError("config root must be a mapping")
+    for sec in ("camera", "gpio", "inference", "logic"):
+        if not isinstance(cfg.get(sec), dict):
+            raise ValueError(f"missing section: {sec}")
+
+    logic = cfg["logic"]
+    for key, (lo, hi) in _LOGIC_RANGES.items():
+        if key not in logic:
+            continue
+        v = logic[key]
+        if isinstance(v, bool) or not isinstance(v, (int, float)):
+            raise ValueError(f"logic.{key}: expected a number, got {v!r}")
+        if not lo <= v <= hi:
+            raise ValueError(f"logic.{key}={v} out of range [{lo}, {hi}]")
+    if logic.get("vest_torso_top_ratio", 0.18) >= logic.get("vest_torso_bottom_ratio", 0.98):
+        raise ValueError("logic.vest_torso_top_ratio must be below vest_torso_bottom_ratio")
+
+    patterns = cfg["gpio"].get("patterns") or {}
+    if not isinstance(patterns, dict):
+        raise ValueError("gpio.patterns must be a mapping")
+    unknown = set(patterns) - set(LEVELS)
+    if unknown:
+        raise ValueError(f"gpio.patterns: unknown level(s) {sorted(unknown)}")
+    _check_patterns(patterns)
+
+    inf = cfg["inference"]
+    for key in ("conf_thres", "iou_thres"):
+        if key in inf and not 0.0 <= float(inf[key]) <= 1.0:
+            raise ValueError(f"inference.{key}={inf[key]} out of range [0, 1]")
+    return cfg
+
+
+def changed_sections(old, new):
+    """
+    바뀐 섹션 이름. 키 단위로 일부만 반영되는 섹션(LIVE_KEYS 튜플)은 "gpio.led_pin" 처럼 키까지.
+    """
+    out = []
+    for k in sorted(set(old) | set(new)):
+        a, b = old.get(k), new.get(k)
+        if a == b:
+            continue
+        if isinstance(LIVE_KEYS.get(k), tuple) and isinstance(a, dict) and isinstance(b, dict):
+            out.extend(f"{k}.{sub}" for sub in sorted(set(a) | set(b)) if a.get(sub) != b.get(sub))
+        else:
+            out.append(k)
+    return out
+
+
+def is_live(change):
+    """changed_sections() 항목 하나가 재시작 없이 반영되는지."""
+    sec, _, sub = change.partition(".")
+    if sec not in LIVE_KEYS:
+        return False
+    keys = LIVE_KEYS[sec]
+    return keys is None or sub in keys
+
+
+class ConfigWatcher:
+    def __init__(self, path="config.yaml", interval_s=1.0, current=None):
+        self.path = path
+        self.interval_s = interval_s
+        self.current = copy.deepcopy(current) if current is not None else None
+        self._stamp = self._stat()
+        self._pending = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="config-watch", daemon=True)
+        self._thread.start()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size, st.st_ino)
+        except OSError:
+            return None
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            stamp = self._stat()
+            if stamp is None or stamp == self._stamp:
+                continue
+            self._stamp = stamp
+            self.check()
+
+    def check(self):
+        """파일을 읽고 검증. 통과하면 poll()로 넘겨줄 대기 설정으로 둔다."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                cfg = validate(yaml.safe_load(f))
+        except (OSError, yaml.YAMLError, ValueError, TypeError) as e:
+            # 에디터가 저장하는 도중일 수도 있으니 다음 변경 때 다시 시도
+            log.warning("[CFG] %s rejected, keeping previous settings: %s", self.path, e)
+            return False
+        except Exception:
+            # 검증이 못 잡은 모양이라도 감시 스레드가 죽으면 이후 변경이 전부 무시되므로 계속 돈다
+            log.exception("[CFG] %s rejected, keeping previous settings", self.path)
+            return False
+        with self._lock:
+            self._pending = cfg
+        return True
+
+    def poll(self):
+        """
+        새 설정이 있으면 (cfg, 바뀐 섹션 리스트), 없으면 None.
+        main loop에서 프레임 사이에 호출.
+        """
+        with self._lock:
+            cfg, self._pending = self._pending, None
+        if cfg is None:
+            return None
+        changed = changed_sections(self.current or {}, cfg)
+        self.current = copy.deepcopy(cfg)
+        if not changed:
+            return None
+        return cfg, changed
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=2.0)
+
+
+class DetectorSwap:
+    """
+    inference 설정이 바뀌었을 때 새 detector를 백그라운드에서 만들고
+    main이 ready()로 받아가서 프레임 사이에 교체한다. 만드는 동안은 기존 모델로 계속 추론.
+    """
+
+    def __init__(self, build_fn):
+        self.build_fn = build_fn
+        self._result = None
+        self._next = None             # 만드는 도중 또 바뀌면 끝난 뒤 최신 설정으로 한 번 더
+        self._running = False
+        self._lock = threading.Lock()
+
+    def start(self, inf_cfg):
+        with self._lock:
+            self._next = dict(inf_cfg)
+            if self._running:
+                return
+            self._running = True
+        threading.Thread(target=self._build, name="detector-build", daemon=True).start()
+
+    def _build(self):
+        while True:
+            with self._lock:
+                inf_cfg, self._next = self._next, None
+                if inf_cfg is None:
+                    self._running = False
+                    return
+            try:
+                det = self.build_fn(inf_cfg)
+            except Exception as e:
+                log.error("[CFG] detector rebuild failed, keeping current model: %s", e)
+                continue
+            with self._lock:
+                self._result = det
+
+    def ready(self):
+        """새 detector가 준비됐으면 리턴 (한 번만), 아니면 None."""
+        with self._lock:
+            det, self._result = self._result, None
+        return det
@@ -1,85 +1,409 @@
-import os, cv2
-from typing import List, Dict
-
-def _hailo_available():
-    try:
-        import hailo_rt
-        return True
-    except Exception:
-        return False
-
-
-class BaseDetector:
-    names = None
-    def infer(self, frame_bgr) -> List[Dict]:
-        raise NotImplementedError
-
-
-class HailoDetector(BaseDetector):
-    def __init__(self, hef_path, conf, iou):
-        import hailo_rt  # 실제 환경에 맞게 수정 필요
-        self.conf, self.iou = conf, iou
-        self.rt = hailo_rt.HailoRT()
-        self.net = self.rt.load_hef(hef_path)
-        self.names = getattr(self.net, "get_labels", lambda: None)()
-
-    def infer(self, frame_bgr):
-        inp = cv2.resize(frame_bgr, (640, 640))
-        outs = self.net.infer(inp)      # 실제 SDK에 맞게 파싱 필요
-        dets = []
-        for d in (outs or []):
-            dets.append({
-                "cls": int(d.get("cls", -1)),
-                "conf": float(d.get("conf", 0.0)),
-                "box":  d.get("bbox", [0, 0, 0, 0])
-            })
-        return dets
-
-
-class CpuYOLODetector(BaseDetector):
-    def __init__(self, weight, conf, iou):
-        from ultralytics import YOLO
-        self.model = YOLO(weight)
-        self.conf, self.iou = conf, iou
-        self.names = self.model.names
-
-    def infer(self, frame_bgr):
-        r = self.model.predict(
-            source=frame_bgr,
-            imgsz=768,
-            conf=self.conf,
-            iou=self.iou,
-            verbose=False
-        )[0]
-
-        # 필요 없으면 아래 good_frame/bad_frame 저장 부분은 지워도 됨
-        if r.boxes and len(r.boxes) > 0:
-            cv2.imwrite("good_frame.jpg", frame_bgr)
-        else:
-            cv2.imwrite("bad_frame.jpg", frame_bgr)
-
-        dets: List[Dict] = []
-
-        if r.boxes:
-            for b in r.boxes:
-                x1, y1, x2, y2 = map(int, b.xyxy[0].tolist())
-                dets.append({
-                    "cls": int(b.cls[0].item()),
-                    "conf": float(b.conf[0].item()),
-                    "box": [x1, y1, x2, y2]
-                })
-        return dets
-
-
-def build_detector(cfg):
-    hef = cfg.get("hailo_hef_path", "")
-    conf = cfg.get("conf_thres", 0.6)
-    iou  = cfg.get("iou_thres", 0.5)
-
-    if hef and os.path.isfile(hef) and _hailo_available():
-        try:
-            return HailoDetector(hef, conf, iou)
-        except Exception as e:
-            print(f"[WARN] Hailo 실패 → CPU 폴백: {e}")
-
-    return CpuYOLODetector(cfg.get("cpu_model_weight", "yolov8n.pt"), conf, iou)
+import os, cv2, threading, queue, logging
+import numpy as np
+from collections import deque
+from typing import List, Dict
+
+log = logging.getLogger("infer")
+
+def _hailo_available():
+    try:
+        import hailo_rt
+        return True
+    except Exception:
+        return False
+
+
+class _Job:
+    __slots__ = ("handle", "frame", "done", "dets", "error")
+
+    def __init__(self, handle, frame):
+        self.handle, self.frame = handle, frame
+        self.done = False
+        self.dets = None
+        self.error = None
+
+
+class BaseDetector:
+    names = None
+    depth = 1       # submit()으로 동시에 돌릴 수 있는 프레임 수 (inference.inflight_depth)
+
+    def infer(self, frame_bgr) -> List[Dict]:
+        raise NotImplementedError
+
+    def infer_batch(self, frames) -> List[List[Dict]]:
+        # 배치를 지원하는 detector는 오버라이드 (detsvc 서비스에서 사용)
+        return [self.infer(f) for f in frames]
+
+    # ------------------------------------------------------------------
+    #  비동기 API: frame N을 추론하는 동안 main이 N+1을 준비할 수 있게
+    #   h = det.submit(frame)   # 진행 중인 추론이 depth개면 하나 끝날 때까지 대기
+    #   det.poll()              # 가장 오래된 결과가 준비됐으면 True
+    #   dets = det.result()     # 가장 오래된 결과 (submit 순서대로만 나온다)
+    #  기본 구현은 전용 worker 스레드에서 infer()를 순서대로 호출.
+    #  가속기 SDK에 비동기 API가 있으면 _start_job()만 오버라이드해서 _finish()를 부르면 된다.
+    # ------------------------------------------------------------------
+    def _async_state(self):
+        st = self.__dict__.get("_async")
+        if st is None:
+            st = self._async = {"cv": threading.Condition(), "jobs": deque(), "next": 0,
+                                "running": 0, "q": None, "worker": None}
+        return st
+
+    def submit(self, frame_bgr):
+        st = self._async_state()
+        with st["cv"]:
+            while st["running"] >= max(1, self.depth):
+                st["cv"].wait()
+            job = _Job(st["next"], frame_bgr)
+            st["next"] += 1
+            st["running"] += 1
+            st["jobs"].append(job)
+        self._start_job(job)
+        return job.handle
+
+    def poll(self):
+        st = self._async_state()
+        with st["cv"]:
+            return bool(st["jobs"]) and st["jobs"][0].done
+
+    def pending(self):
+        """submit 했지만 result()로 아직 안 가져간 프레임 수."""
+        return len(self._async_state()["jobs"])
+
+    def result(self, timeout=None):
+        st = self._async_state()
+        with st["cv"]:
+            if not st["jobs"]:
+                raise RuntimeError("result() without a pending submit()")
+            job = st["jobs"][0]
+            if not st["cv"].wait_for(lambda: job.done, timeout):
+                raise TimeoutError(f"inference {job.handle} not finished in {timeout}s")
+            st["jobs"].popleft()
+        if job.error is not None:
+            raise job.error
+        return job.dets
+
+    def _finish(self, job, dets=None, error=None):
+        st = self._async_state()
+        with st["cv"]:
+            job.dets, job.error = dets, error
+            job.frame = None
+            job.done = True
+            st["running"] -= 1
+            st["cv"].notify_all()
+
+    def _start_job(self, job):
+        st = self._async_state()
+        if st["worker"] is None:
+            st["q"] = queue.Queue()
+            st["worker"] = threading.Thread(target=self._worker, args=(st["q"],),
+                                            name="detector-worker", daemon=True)
+            st["worker"].start()
+        st["q"].put(job)
+
+    def _worker(self, q):
+        while True:
+            job = q.get()
+            if job is None:
+                return
+            try:
+                self._finish(job, self.infer(job.frame))
+            except Exception as e:
+                self._finish(job, error=e)
+
+    def close(self):
+        st = self.__dict__.get("_async")
+        if st is not None and st["worker"] is not None:
+            st["q"].put(None)
+            st["worker"].join(timeout=5.0)
+            st["worker"] = None
+
+
+# ---------------------------------------
+#   Hailo 출력 후처리 (numpy)
+# ---------------------------------------
+LETTERBOX_PAD = 114
+
+
+def nms(boxes, scores, classes, iou_thr, max_det=300):
+    """
+    클래스별 NMS. 클래스마다 좌표를 멀리 떨어뜨려서(offset) 한 번의 greedy NMS로 처리.
+    boxes: (N, 4) xyxy, 리턴: 남길 index 배열 (score 내림차순)
+    """
+    if len(boxes) == 0:
+        return np.zeros((0,), np.int64)
+    off = classes.astype(np.float32)[:, None] * (float(boxes.max()) + 1.0)
+    b = boxes + off
+    x1, y1, x2, y2 = b[:, 0], b[:, 1], b[:, 2], b[:, 3]
+    area = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    order = np.argsort(-scores, kind="stable")
+    keep = []
+    while order.size and len(keep) < max_det:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = w * h
+        iou = inter / np.maximum(area[i] + area[rest] - inter, 1e-9)
+        order = rest[iou <= iou_thr]
+    return np.asarray(keep, np.int64)
+
+
+def decode_yolov8(raw, conf):
+    """
+    YOLOv8 head 출력 (4+nc, N) 또는 (N, 4+nc), 박스는 입력 해상도 픽셀 cx,cy,w,h.
+    리턴: boxes(xyxy), scores, classes
+    """
+    a = np.asarray(raw, np.float32)
+    a = a.reshape(a.shape[-2], a.shape[-1])
+    if a.shape[0] < a.shape[1]:
+        a = a.T
+    cls_scores = a[:, 4:]
+    classes = cls_scores.argmax(axis=1)
+    scores = cls_scores[np.arange(len(a)), classes]
+    m = scores >= conf
+    a, scores, classes = a[m], scores[m], classes[m]
+    cx, cy, w, h = a[:, 0], a[:, 1], a[:, 2] / 2, a[:, 3] / 2
+    boxes = np.stack([cx - w, cy - h, cx + w, cy + h], axis=1)
+    return boxes, scores, classes
+
+
+def _looks_like_nms(a):
+    """
+    (k, 5) [y1, x1, y2, x2, score] 정규화 좌표면 on-chip NMS 출력 (클래스 하나짜리 모델).
+    클래스 하나짜리 YOLOv8 raw도 (N, 5)일 수 있지만 좌표가 입력 픽셀이라 1을 훨씬 넘는다.
+    """
+    if a.ndim != 2 or a.shape[1] != 5 or a.dtype == object:
+        return False
+    if not a.size:
+        return True
+    xy = a[:, :4]
+    return float(xy.min()) >= -0.01 and float(xy.max()) <= 1.01
+
+
+def decode_hailo_nms(per_class, conf, in_w, in_h):
+    """
+    Hailo on-chip NMS 출력: 클래스별 (k, 5) 배열 [y1, x1, y2, x2, score] (0~1 정규화).
+    """
+    boxes, scores, classes = [], [], []
+    for c, arr in enumerate(per_class):
+        arr = np.asarray(arr, np.float32).reshape(-1, 5)
+        arr = arr[arr[:, 4] >= conf]
+        if not len(arr):
+            continue
+        boxes.append(arr[:, [1, 0, 3, 2]] * np.array([in_w, in_h, in_w, in_h], np.float32))
+        scores.append(arr[:, 4])
+        classes.append(np.full(len(arr), c, np.int64))
+    if not boxes:
+        return np.zeros((0, 4), np.float32), np.zeros((0,), np.float32), np.zeros((0,), np.int64)
+    return np.concatenate(boxes), np.concatenate(scores), np.concatenate(classes)
+
+
+class HailoDetector(BaseDetector):
+    OUTPUT_FORMATS = ("auto", "yolov8", "nms")
+
+    def __init__(self, hef_path, conf, iou, rt=None, max_det=300, output_format="auto"):
+        # rt: hailo_rt 모듈 대신 넣을 객체 (가짜 런타임으로 테스트할 때)
+        # output_format: HEF 출력 형식. auto면 텐서 모양 / 값 범위로 판단 (inference.hailo_output)
+        if output_format not in self.OUTPUT_FORMATS:
+            raise ValueError(f"hailo output format must be one of {self.OUTPUT_FORMATS}, got {output_format!r}")
+        if rt is None:
+            import hailo_rt as rt  # 실제 환경에 맞게 수정 필요
+        self.conf, self.iou = conf, iou
+        self.max_det = max_det
+        self.output_format = output_format
+        self.rt = rt.HailoRT()
+        self.net = self.rt.load_hef(hef_path)
+        self.names = getattr(self.net, "get_labels", lambda: None)()
+        shape = getattr(self.net, "get_input_shape", lambda: (640, 640, 3))()
+        self.in_h, self.in_w = int(shape[0]), int(shape[1])
+        # letterbox 입력 버퍼. 비동기로 여러 프레임이 동시에 가속기에 있을 수 있어서 풀로 돌려씀
+        self._bufs = queue.SimpleQueue()
+
+    # ------------------------------------------------------------------
+    def _letterbox(self):
+        """(buffer, meta) 비율 유지 축소 + 회색 패딩. 버퍼는 _release()로 돌려줘야 함."""
+        try:
+            ent = self._bufs.get_nowait()
+        except queue.Empty:
+            ent = [np.full((self.in_h, self.in_w, 3), LETTERBOX_PAD, np.uint8), None]
+        return ent
+
+    def _release(self, ent):
+        self._bufs.put(ent)
+
+    def preprocess(self, frame_bgr, ent):
+        h, w = frame_bgr.shape[:2]
+        r = min(self.in_w / w, self.in_h / h)
+        nw, nh = int(round(w * r)), int(round(h * r))
+        left, top = (self.in_w - nw) // 2, (self.in_h - nh) // 2
+        buf = ent[0]
+        key = (nw, nh, left, top)
+        if ent[1] != key:             # 프레임 크기가 바뀌었을 때만 패딩 다시 칠하기
+            buf[:] = LETTERBOX_PAD
+            ent[1] = key
+        cv2.resize(frame_bgr, (nw, nh), dst=buf[top:top + nh, left:left + nw],
+                   interpolation=cv2.INTER_LINEAR)
+        return buf, (r, left, top, w, h)
+
+    def postprocess(self, outs, meta):
+        r, left, top, w, h = meta
+        boxes, scores, classes = self._decode(outs)
+        keep = nms(boxes, scores, classes, self.iou, self.max_det)
+        if not len(keep):
+            return []
+        boxes, scores, classes = boxes[keep], scores[keep], classes[keep]
+        # letterbox 좌표 → 원본 프레임 좌표
+        boxes = (boxes - np.array([left, top, left, top], np.float32)) / r
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, w - 1)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, h - 1)
+        boxes = boxes.round().astype(np.int32).tolist()
+        return [{"cls": int(c), "conf": float(s), "box": b}
+                for b, s, c in zip(boxes, scores.tolist(), classes.tolist())]
+
+    def _decode(self, outs):
+        if isinstance(outs, dict):                  # 이름 붙은 출력 {name: tensor}
+            outs = list(outs.values())
+        if isinstance(outs, (list, tuple)) and outs and isinstance(outs[0], dict):
+            # 이미 파싱된 [{"cls", "conf", "bbox"(입력 픽셀 xyxy)}] 형식
+            boxes = np.array([d.get("bbox", [0, 0, 0, 0]) for d in outs], np.float32).reshape(-1, 4)
+            scores = np.array([d.get("conf", 0.0) for d in outs], np.float32)
+            classes = np.array([d.get("cls", -1) for d in outs], np.int64)
+            m = scores >= self.conf
+            return boxes[m], scores[m], classes[m]
+        if isinstance(outs, np.ndarray) and outs.dtype != object:
+            outs = [outs]
+        if not len(outs):
+            return np.zeros((0, 4), np.float32), np.zeros((0,), np.float32), np.zeros((0,), np.int64)
+        fmt = self.output_format
+        if fmt == "auto":
+            # 출력이 여러 개면 클래스별 NMS 리스트. 하나면 raw head일 수도, 클래스 하나짜리 NMS일 수도 있다
+            if len(outs) > 1:
+                fmt = "nms"
+            else:
+                a = np.asarray(outs[0])
+                fmt = "nms" if _looks_like_nms(a.reshape(-1, a.shape[-1]) if a.ndim > 2 else a) else "yolov8"
+        if fmt == "yolov8":
+            if len(outs) != 1:
+                raise ValueError(f"yolov8 output expects one tensor, got {len(outs)}")
+            return decode_yolov8(outs[0], self.conf)
+        return decode_hailo_nms(outs, self.conf, self.in_w, self.in_h)
+
+    # ------------------------------------------------------------------
+    def infer(self, frame_bgr):
+        ent = self._letterbox()
+        try:
+            inp, meta = self.preprocess(frame_bgr, ent)
+            outs = self.net.infer(inp)
+        finally:
+            self._release(ent)
+        return self.postprocess(outs, meta)
+
+    def _start_job(self, job):
+        # 런타임에 비동기 추론이 있으면 worker 스레드 없이 가속기에 바로 넘김
+        # infer_async(input, callback) → 완료되면 런타임 스레드에서 callback(outs, error)
+        infer_async = getattr(self.net, "infer_async", None)
+        if infer_async is None:
+            return super()._start_job(job)
+        ent = self._letterbox()
+        inp, meta = self.preprocess(job.frame, ent)
+
+        def done(outs, error=None):
+            self._release(ent)
+            if error is not None:
+                self._finish(job, error=error if isinstance(error, Exception) else RuntimeError(error))
+                return
+            try:
+                self._finish(job, self.postprocess(outs, meta))
+            except Exception as e:
+                self._finish(job, error=e)
+
+        try:
+            infer_async(inp, done)
+        except Exception as e:
+            self._release(ent)
+            self._finish(job, error=e)
+
+
+class CpuYOLODetector(BaseDetector):
+    def __init__(self, weight, conf, iou):
+        from ultralytics import YOLO
+        self.model = YOLO(weight)
+        self.conf, self.iou = conf, iou
+        self.names = self.model.names
+
+    def infer(self, frame_bgr):
+        r = self.model.predict(
+            source=frame_bgr,
+            imgsz=768,
+            conf=self.conf,
+            iou=self.iou,
+            verbose=False
+        )[0]
+
+        # 필요 없으면 아래 good_frame/bad_frame 저장 부분은 지워도 됨
+        if r.boxes and len(r.boxes) > 0:
+            cv2.imwrite("good_frame.jpg", frame_bgr)
+        else:
+            cv2.imwrite("bad_frame.jpg", frame_bgr)
+
+        return self._to_dets(r)
+
+    def infer_batch(self, frames):
+        # 여러 카메라 프레임을 한 번의 forward로 (detsvc 서비스 micro-batch)
+        rs = self.model.predict(
+            source=list(frames),
+            imgsz=768,
+            conf=self.conf,
+            iou=self.iou,
+            verbose=False
+        )
+        return [self._to_dets(r) for r in rs]
+
+    @staticmethod
+    def _to_dets(r):
+        dets: List[Dict] = []
+
+        if r.boxes:
+            for b in r.boxes:
+                x1, y1, x2, y2 = map(int, b.xyxy[0].tolist())
+                dets.append({
+                    "cls": int(b.cls[0].item()),
+                    "conf": float(b.conf[0].item()),
+                    "box": [x1, y1, x2, y2]
+                })
+        return dets
+
+
+def build_detector(cfg):
+    # detector 서비스(detsvc.py)가 설정돼 있으면 모델을 직접 올리지 않고 클라이언트로 붙는다
+    sock = cfg.get("service_socket", "")
+    if sock:
+        try:
+            from detsvc import DetectorClient
+            det = DetectorClient(sock)
+            det.depth = int(cfg.get("inflight_depth", 1))
+            return det
+        except (OSError, ValueError) as e:
+            log.warning("[INFER] detector 서비스 연결 실패 → 직접 로드: %s", e)
+
+    return build_local_detector(cfg)
+
+
+def build_local_detector(cfg):
+    hef = cfg.get("hailo_hef_path", "")
+    conf = cfg.get("conf_thres", 0.6)
+    iou  = cfg.get("iou_thres", 0.5)
+
+    det = None
+    if hef and os.path.isfile(hef) and _hailo_available():
+        try:
+            det = HailoDetector(hef, conf, iou, output_format=cfg.get("hailo_output", "auto"))
+        except Exception as e:
+            log.warning("[INFER] Hailo 실패 → CPU 폴백: %s", e)
+
+    if det is None:
+        det = CpuYOLODetector(cfg.get("cpu_model_weight", "yolov8n.pt"), conf, iou)
+    det.depth = int(cfg.get("inflight_depth", 1))
+    return det
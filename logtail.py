@@ -0,0 +1,164 @@
+import csv
+import os
+import threading
+from collections import deque
+
+
+FINALS = ("SAFE", "WARNING", "DANGER")
+
+
+class LogTail:
+    """
+    safety_log.csv를 처음부터 매번 파싱하지 않고
+    마지막으로 읽은 byte offset부터 새로 붙은 줄만 읽어오는 tail reader.
+    - 최근 keep개 row는 링 버퍼에, 상태별 개수는 누적 카운트로 들고 있는다.
+    - row마다 증가하는 seq 번호가 클라이언트 cursor 역할을 한다.
+      (파일이 잘리거나 교체돼도 seq는 줄어들지 않음)
+    - listeners(add_row / reset 메서드를 가진 객체)에게 새 row를 그대로 넘겨준다.
+    """
+
+    CHUNK = 1 << 20
+
+    def __init__(self, path="safety_log.csv", keep=100):
+        self.path = path
+        self.rows = deque(maxlen=keep)   # (seq, row dict)
+        self.seq = 0
+        self.listeners = []
+        self._lock = threading.Lock()
+        self._reset_file_state()
+
+    def _reset_file_state(self):
+        self.offset = 0
+        self.inode = None
+        self.fields = None
+        self.count = {k: 0 for k in FINALS}
+        self.latest = None
+        self.rows.clear()
+        self._reset_seq = self.seq      # 이 seq 이하 cursor는 지워진 파일 기준 → reset 필요
+        self._partial = b""
+        for l in self.listeners:
+            l.reset()
+
+    def add_listener(self, listener):
+        with self._lock:
+            self.listeners.append(listener)
+
+    # ------------------------------------------------------------------
+    def poll(self):
+        """파일에 새로 붙은 줄을 읽어서 반영. 새 row 개수를 리턴."""
+        with self._lock:
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                if self.offset:
+                    self._reset_file_state()
+                return 0
+
+            # 파일이 교체되었거나(inode 변경) 잘렸으면 처음부터 다시
+            if st.st_ino != self.inode or st.st_size < self.offset:
+                self._reset_file_state()
+                self.inode = st.st_ino
+
+            if st.st_size == self.offset:
+                return 0
+
+            added = 0
+            with open(self.path, "rb") as f:
+                f.seek(self.offset)
+                while True:
+                    chunk = f.read(self.CHUNK)
+                    if not chunk:
+                        break
+                    self.offset += len(chunk)
+                    added += self._feed(chunk)
+            return added
+
+    def _feed(self, chunk):
+        data = self._partial + chunk
+        cut = data.rfind(b"\n") + 1
+        # 아직 줄바꿈이 안 온 마지막 줄은 다음 poll 때 이어서 처리
+        self._partial = data[cut:]
+        if not cut:
+            return 0
+
+        lines = data[:cut].decode("utf-8", errors="replace").splitlines()
+        added = 0
+        for r in csv.reader(lines):
+            if not r:
+                continue
+            if self.fields is None:
+                self.fields = r
+                continue
+            row = dict(zip(self.fields, r))
+            self.seq += 1
+            self.rows.append((self.seq, row))
+            self.latest = row
+            final = row.get("final")
+            if final in self.count:
+                self.count[final] += 1
+            for l in self.listeners:
+                l.add_row(row)
+            added += 1
+        return added
+
+    # ------------------------------------------------------------------
+    def version(self):
+        """
+        파일 내용이 바뀌었는지 비교용 값 (inode-offset).
+        row 번호와 달리 파일에서 바로 나오므로 워커 프로세스끼리도 같은 값이 된다.
+        """
+        with self._lock:
+            return f"{self.inode}-{self.offset}"
+
+    def view(self, cursor=None):
+        """
+        (latest, count, cursor, rows, reset)를 한 번의 lock 안에서 리턴.
+        cursor 이후 row만 주고, cursor가 링 버퍼 범위를 벗어나면
+        (너무 오래됐거나 서버 재시작), 또는 파일이 잘리거나 교체되기 전의 cursor면
+        버퍼 전체를 reset=True로 준다.
+        """
+        with self._lock:
+            first = self.rows[0][0] if self.rows else self.seq + 1
+            if (cursor is None or cursor > self.seq or cursor <= self._reset_seq
+                    or cursor < first - 1):
+                rows, reset = [r for _, r in self.rows], True
+            else:
+                rows, reset = [r for s, r in self.rows if s > cursor], False
+            return self.latest, dict(self.count), self.seq, rows, reset
+
+
+def seek_time(f, t, size=None):
+    """
+    시간 순으로 쌓인 CSV 바이너리 파일 f에서
+    time 컬럼(첫 칸)이 t 이상인 첫 줄의 byte offset을 이분 탐색으로 찾는다.
+    파일 전체를 읽지 않고 O(log 파일크기)번만 읽는다.
+    """
+    if size is None:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+    key = t.encode("utf-8")
+
+    f.seek(0)
+    f.readline()            # 헤더
+    # lo: 이전 줄들은 전부 t 미만인 줄 시작 위치, hi: 답은 hi 이하
+    lo, hi = f.tell(), size
+    while lo < hi:
+        mid = (lo + hi) // 2
+        f.seek(mid)
+        f.readline()        # mid 다음 줄 시작으로
+        pos = f.tell()
+        if pos >= hi:
+            break           # (mid, hi) 안에 줄 시작이 없음 → 남은 구간은 순차 탐색
+        line = f.readline()
+        if line.split(b",", 1)[0] < key:
+            lo = pos + len(line)
+        else:
+            hi = pos
+
+    f.seek(lo)
+    while lo < hi:
+        line = f.readline()
+        if not line or line.split(b",", 1)[0] >= key:
+            break
+        lo += len(line)
+    return lo
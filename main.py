@@ -1,201 +1,418 @@
-import time
-import yaml
-import cv2
-import requests
-import csv
-from datetime import datetime
-
-from sensors import Camera, GPIOBoard
-from infer_yolo import build_detector
-from temporal_lstm import TemporalSmoother
-from rules import HelmetJudge
-from alerts import Notifier
-from admit_bt import AdminNotifier
-
-
-# ---------------------------------------
-#   Flask 서버 주소
-# ---------------------------------------
-SERVER_IP = "localhost"
-ALERT_URL = f"http://{SERVER_IP}:5000/alert"
-
-
-def send_alert(alert_type):
-    """Flask 서버로 상태 전송"""
-    try:
-        r = requests.post(ALERT_URL, json={"type": alert_type}, timeout=1)
-        print("[ALERT] Sent:", alert_type, "Status:", r.status_code)
-    except Exception as e:
-        print("[ALERT] Failed:", e)
-
-
-def get_class_name(names, cls_id):
-    """YOLO 클래스 이름 얻기"""
-    if isinstance(names, dict):
-        return names.get(cls_id, "")
-    return names[cls_id]
-
-
-# ---------------------------------------
-#   YOLO 기반 안전 판단
-# ---------------------------------------
-def analyze_safety(dets, names):
-
-    helmet_on = False
-    helmet_off = False
-    vest_on = False
-
-    for d in dets:
-        name = get_class_name(names, d["cls"])
-
-        if name == "head_helmet":
-            helmet_on = True
-
-        if name == "head_nohelmet":
-            helmet_off = True
-
-        if name == "vest":
-            vest_on = True
-
-    vest_off = not vest_on
-    return helmet_on, helmet_off, vest_on, vest_off
-
-
-# ---------------------------------------
-#   CSV 파일 초기 생성
-# ---------------------------------------
-def init_csv():
-    filename = "safety_log.csv"
-    try:
-        with open(filename, "x", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow(["time", "helmet", "vest", "final"])
-    except FileExistsError:
-        pass  # 이미 있으면 생성 안 함
-
-
-# ---------------------------------------
-#   CSV에 로그 기록
-# ---------------------------------------
-def write_csv(helmet_on, vest_on, alert_type):
-    filename = "safety_log.csv"
-
-    helmet_text = "ON" if helmet_on else "OFF"
-    vest_text = "ON" if vest_on else "OFF"
-
-    # alert 타입을 웹 대시보드용으로 재정의
-    if alert_type == "ok":
-        final_text = "SAFE"
-    elif alert_type in ["no_helmet", "no_vest"]:
-        final_text = "WARNING"
-    else:
-        final_text = "DANGER"
-
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    with open(filename, "a", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow([now, helmet_text, vest_text, final_text])
-
-    print(f"[CSV] Saved: {now} | Helmet={helmet_text} | Vest={vest_text} | Final={final_text}")
-
-
-# ---------------------------------------
-#   메인 실행
-# ---------------------------------------
-def main():
-    # 설정 파일 불러오기
-    with open("config.yaml", "r", encoding="utf-8") as f:
-        cfg = yaml.safe_load(f)
-
-    cam = Camera(cfg["camera"])
-    gpio = GPIOBoard(cfg["gpio"])
-    det = build_detector(cfg["inference"])
-    names = det.names
-
-    smooth = TemporalSmoother(window=cfg["logic"]["temporal_window"])
-    judge = HelmetJudge(cfg["logic"])
-    judge._ensure_ids(names)
-
-    notifier = Notifier(gpio, cfg["gpio"])
-    admin_notifier = AdminNotifier()
-
-    draw = cfg["logic"]["draw_visual"]
-    show = cfg["logic"]["show_window"]
-
-    # CSV 초기화
-    init_csv()
-
-    last_alert = None
-    last_time = 0
-    SEND_INTERVAL = 2
-
-    try:
-        prev = time.time()
-
-        while True:
-            frame = cam.read()
-
-            # FPS 계산
-            now = time.time()
-            fps = 1 / (now - prev)
-            prev = now
-            print("FPS=", fps)
-
-            dets = det.infer(frame)
-
-            unsafe_prob, overlay = judge.evaluate(frame, dets, draw=draw)
-            smooth.push(unsafe_prob)
-            smooth_val = smooth.decision()
-
-            # YOLO 분석
-            helmet_on, helmet_off, vest_on, vest_off = analyze_safety(dets, names)
-
-            print(f"[STATE] helmet_on={helmet_on}, helmet_off={helmet_off}, vest_on={vest_on}, vest_off={vest_off}")
-
-            # ---------------------------------------
-            #   App Inventor와 동일 alert 규칙
-            # ---------------------------------------
-            if helmet_on and vest_on:
-                alert = "ok"
-            elif helmet_off and vest_off:
-                alert = "no_both"
-            elif helmet_off:
-                alert = "no_helmet"
-            else:
-                alert = "no_vest"
-
-            # Flask에 전송
-            if alert != last_alert or now - last_time > SEND_INTERVAL:
-                send_alert(alert)
-                last_alert = alert
-                last_time = now
-
-            # GPIO & 블루투스 알림
-            notifier.alert(alert != "ok")
-            admin_notifier.send_state(alert != "ok")
-
-            # CSV 저장
-            write_csv(helmet_on, vest_on, alert)
-
-            # 디버그 HUD 표시
-            if draw:
-                hud = overlay if overlay is not None else frame
-                cv2.putText(hud, f"Alert:{alert} Helmet:{helmet_on} Vest:{vest_on}",
-                            (8, 24), cv2.FONT_HERSHEY_SIMPLEX, 0.7,
-                            (0, 255, 0) if alert == "ok" else (0, 165, 255), 2)
-
-            # 카메라 출력
-            if show:
-                cv2.imshow("smart_safety", overlay if overlay is not None else frame)
-                if cv2.waitKey(1) & 0xFF == 27:
-                    break
-
-    finally:
-        notifier.alert(False)
-        cam.close()
-        cv2.destroyAllWindows()
-
-
-if __name__ == "__main__":
+import argparse
+import os
+import tempfile
+import time
+from collections import deque
+
+# BLAS / OpenMP 스레드 수는 numpy / cv2 / torch가 로드되기 전에 정해야 해서 제일 먼저
+import resources
+resources.set_thread_env("config.yaml")
+
+import yaml
+import cv2
+import csv
+import logging
+import threading
+from datetime import datetime
+
+from infer_yolo import build_detector
+from temporal_lstm import TemporalSmoother
+from rules import HelmetJudge, alert_type, analyze_safety
+from alerts import Notifier, level_for
+from slog import setup_logging
+from framebus import FrameSlot, DEFAULT_NAME
+from uplink import AlertBatcher
+from replay import DetRecorder
+from cliprec import ClipRecorder
+from blackbox import BlackBox
+from hotreload import ConfigWatcher, DetectorSwap, is_live
+import metrics
+
+log = logging.getLogger("main")
+
+
+# ---------------------------------------
+#   Flask 서버 주소
+# ---------------------------------------
+SERVER_IP = "localhost"
+SERVER_URL = f"http://{SERVER_IP}:5000"
+
+
+CSV_PATH = "safety_log.csv"
+
+
+# ---------------------------------------
+#   CSV 파일 초기 생성
+# ---------------------------------------
+def init_csv(filename=CSV_PATH):
+    try:
+        with open(filename, "x", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["time", "helmet", "vest", "final"])
+    except FileExistsError:
+        pass  # 이미 있으면 생성 안 함
+
+
+# ---------------------------------------
+#   CSV에 로그 기록
+# ---------------------------------------
+def write_csv(helmet_on, vest_on, alert_type, filename=CSV_PATH):
+    helmet_text = "ON" if helmet_on else "OFF"
+    vest_text = "ON" if vest_on else "OFF"
+
+    # alert 타입을 웹 대시보드용으로 재정의
+    if alert_type == "ok":
+        final_text = "SAFE"
+    elif alert_type in ["no_helmet", "no_vest"]:
+        final_text = "WARNING"
+    else:
+        final_text = "DANGER"
+
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    with open(filename, "a", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow([now, helmet_text, vest_text, final_text])
+
+    log.debug("[CSV] Saved: %s | Helmet=%s | Vest=%s | Final=%s",
+              now, helmet_text, vest_text, final_text)
+
+
+# ---------------------------------------
+#   메인 실행
+# ---------------------------------------
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--soak", type=float, metavar="HOURS",
+                    help="하드웨어 없이 가짜 소스로 HOURS 시간 최대 속도로 돌리고 drift 리포트 작성")
+    ap.add_argument("--source", default="synth",
+                    help="soak 소스: synth, synth:<empty|single|group|crowd>, 또는 .ssdr 녹화 파일")
+    ap.add_argument("--soak-interval", type=float, default=60.0, help="soak 샘플링 주기(초)")
+    ap.add_argument("--report", default="soak_report.json")
+    ap.add_argument("--soak-dir", help="soak 중 CSV / 녹화 / 블랙박스 / 클립을 쓸 디렉터리 (기본: 임시 디렉터리)")
+    ap.add_argument("--no-tracemalloc", action="store_true", help="tracemalloc 끄기 (오버헤드 없이)")
+    args = ap.parse_args()
+
+    # 설정 파일 불러오기
+    with open("config.yaml", "r", encoding="utf-8") as f:
+        cfg = yaml.safe_load(f)
+
+    log_listener = setup_logging(cfg.get("logging"))
+    file_cfg = cfg          # hot reload 비교 기준 (soak은 아래에서 출력 경로만 바꾼 사본으로 돈다)
+
+    monitor = None
+    csv_path = CSV_PATH
+    uplink = None
+    if args.soak:
+        from soak import SoakMonitor, build_source, isolate, NullBoard, NullAdmin, NullUplink
+        # 가짜 프레임 결과가 실제 CSV / 서버 / 스트림 슬롯 / metrics 포트 / 블랙박스에 섞이지 않게
+        soak_dir = args.soak_dir or tempfile.mkdtemp(prefix="soak_")
+        cfg = isolate(cfg, soak_dir)
+        csv_path = os.path.join(soak_dir, "safety_log.csv")
+        uplink = NullUplink()
+        log.info("[SOAK] outputs -> %s (stream shm %s)", soak_dir, cfg["stream"]["shm_name"])
+        cam, det = build_source(args.source, cfg["camera"])
+        det.depth = int(cfg["inference"].get("inflight_depth", 1))
+        gpio = NullBoard()
+        admin_notifier = NullAdmin()
+        monitor = SoakMonitor(metrics.REGISTRY, args.soak * 3600.0,
+                              interval_s=args.soak_interval, trace=not args.no_tracemalloc)
+    else:
+        # 카메라 / GPIO / 블루투스는 라즈베리파이 전용 모듈이라 여기서 import
+        from sensors import Camera, GPIOBoard
+        from admit_bt import AdminNotifier
+        cam = Camera(cfg["camera"])
+        gpio = GPIOBoard(cfg["gpio"])
+        det = build_detector(cfg["inference"])
+        admin_notifier = AdminNotifier()
+    names = det.names
+
+    # 코어 / 스레드 예산: 라이브러리 스레드 풀 크기 → 스레드는 아래 루프 시작 전에 역할별로 고정
+    res = resources.ResourceManager(cfg.get("resources"))
+    res.apply_libs()
+
+    smooth = TemporalSmoother(window=cfg["logic"]["temporal_window"])
+    judge = HelmetJudge(cfg["logic"])
+    judge._ensure_ids(names)
+
+    notifier = Notifier(gpio, cfg["gpio"])
+
+    draw = cfg["logic"]["draw_visual"]
+    show = cfg["logic"]["show_window"] and monitor is None
+
+    # 웹 MJPEG 스트림용 shared memory 슬롯
+    stream_cfg = cfg.get("stream") or {}
+    slot = None
+    if stream_cfg.get("enabled", True):
+        slot = FrameSlot(stream_cfg.get("shm_name", DEFAULT_NAME),
+                         stream_cfg.get("max_width", 960), stream_cfg.get("max_height", 540))
+
+    # Flask 서버로 상태 전송 (배치로 /ingest)
+    server_cfg = cfg.get("server") or {}
+    if uplink is None:
+        uplink = AlertBatcher(
+            server_cfg.get("url", SERVER_URL),
+            device_id=(cfg.get("device") or {}).get("id") or None,
+            interval_s=server_cfg.get("batch_interval_s", 1.0),
+            heartbeat_s=server_cfg.get("heartbeat_s", 5.0),
+        )
+
+    # CSV 초기화
+    init_csv(csv_path)
+
+    # 오프라인 평가용 detection 녹화 (python replay.py 로 재생)
+    rec_path = (cfg.get("record") or {}).get("path") or ""
+    recorder = None
+    if rec_path:
+        recorder = DetRecorder(time.strftime(rec_path), names,
+                               cfg["camera"]["width"], cfg["camera"]["height"])
+        log.info("[REC] recording detections -> %s", recorder.path)
+
+    # 위반 전/후 영상 클립 (링 버퍼 + 별도 인코더 프로세스)
+    clip_cfg = cfg.get("clips") or {}
+    clips = None
+    clip_triggers = set(clip_cfg.get("triggers", ["no_helmet", "no_both"]))
+    if clip_cfg.get("enabled", False):
+        clips = ClipRecorder(
+            clip_cfg.get("dir", "clips"), fps=clip_cfg.get("fps", 8),
+            pre_s=clip_cfg.get("pre_s", 5.0), post_s=clip_cfg.get("post_s", 5.0),
+            width=clip_cfg.get("width", 426), height=clip_cfg.get("height", 240),
+            codec=clip_cfg.get("codec", "mp4v"), ext=clip_cfg.get("ext", ".mp4"),
+        )
+
+    # config.yaml 변경 감시: logic / gpio 패턴 / clips.triggers / inference 는 재시작 없이 반영
+    watcher = ConfigWatcher("config.yaml", current=file_cfg)
+    det_swap = DetectorSwap(build_detector)
+
+    # 단계별 latency / 드롭 프레임 계측 (/metrics)
+    metrics_cfg = cfg.get("metrics") or {}
+    reg = metrics.REGISTRY
+    if metrics_cfg.get("enabled", True):
+        port = metrics_cfg.get("port", metrics.DEFAULT_PORT)
+        try:
+            srv = metrics.start_exporter(reg, port=port, host=metrics_cfg.get("host", "0.0.0.0"))
+            log.info("[METRICS] /metrics on port %d", srv.server_address[1])
+        except OSError as e:
+            # 포트가 이미 쓰이는 중이어도 안전 감시는 계속 돌아야 함 (/metrics만 없이)
+            log.warning("[METRICS] cannot serve /metrics on port %s (%s), running without it", port, e)
+    h_frame = reg.stage("frame").hist
+    t_capture = reg.stage("capture")
+    t_infer = reg.stage("infer")
+    t_judge = reg.stage("judge")
+    t_smooth = reg.stage("smooth")
+    t_analyze = reg.stage("analyze")
+    t_uplink = reg.stage("sink_uplink")
+    t_notify = reg.stage("sink_notify")
+    t_bt = reg.stage("sink_bt")
+    t_csv = reg.stage("sink_csv")
+    t_stream = reg.stage("sink_stream")
+    t_record = reg.stage("sink_record")
+    t_clip = reg.stage("sink_clip")
+    t_display = reg.stage("display")
+    t_blackbox = reg.stage("sink_blackbox")
+    frames = reg.counter("frames", "Frames processed by the main loop.")
+    dropped = reg.counter("dropped_frames", "Camera frames missed because the loop ran slower than camera.fps.")
+    cam_period = 1.0 / max(1, cfg["camera"].get("fps", 30))
+    reg.gauge("uplink_queue_depth", lambda: len(uplink._q), "Events waiting to be sent to the server.")
+    reg.gauge("fps", lambda: fps, "Main loop frames per second.")
+
+    # 블랙박스: 프레임별 detection / 사람별 판정 / smoothing / 단계 시간 (python blackbox.py 로 조회)
+    bb_cfg = cfg.get("blackbox") or {}
+    blackbox = None
+    bb_timers = (t_capture, t_infer, t_judge, t_smooth, t_analyze, t_uplink, t_notify, t_bt,
+                 t_csv, t_stream, t_record, t_clip, t_display, t_blackbox)
+    if bb_cfg.get("path"):
+        blackbox = BlackBox(
+            bb_cfg["path"], names,
+            stages=("frame", "capture", "infer", "judge", "smooth", "analyze", "uplink", "notify", "bt",
+                    "csv", "stream", "record", "clip", "display", "blackbox"),
+            slots=bb_cfg.get("slots", 54000), max_dets=bb_cfg.get("max_dets", 32),
+            max_persons=bb_cfg.get("max_persons", 16), flush_s=bb_cfg.get("flush_s", 1.0),
+        )
+        judge.record_persons = True      # 사람별 판정(last_persons)은 블랙박스가 있을 때만 만든다
+
+    fps = 0.0
+    last_alert = None
+    prev_alert = None
+    inflight = deque()      # submit() 해둔 (frame, 캡처 시각)
+    last_time = 0
+    SEND_INTERVAL = 2
+
+    if monitor is not None:
+        monitor.start()
+
+    res.assign(inline_infer=det.depth <= 1)
+    if clips is not None:
+        res.pin_process(clips._proc.pid, "io")
+    n_threads = threading.active_count()
+
+    try:
+        prev = time.time()
+
+        while True:
+            # 바뀐 설정은 프레임 사이에서 한 번에 적용
+            upd = watcher.poll()
+            if upd is not None:
+                new_cfg, changed = upd
+                logic = new_cfg["logic"]
+                judge.configure(logic)
+                smooth.resize(logic.get("temporal_window", smooth.window))
+                draw = logic.get("draw_visual", draw)
+                notifier.reconfigure(new_cfg["gpio"])
+                clip_triggers = set((new_cfg.get("clips") or {}).get("triggers", clip_triggers))
+                if "inference" in changed and monitor is None:
+                    det_swap.start(new_cfg["inference"])   # 모델은 백그라운드에서 새로 로드
+                applied = [c for c in changed if is_live(c)]
+                if applied:
+                    log.info("[CFG] applied changes: %s", ", ".join(applied))
+                restart = [c for c in changed if not is_live(c)]
+                if restart:
+                    log.warning("[CFG] restart main.py to apply: %s", ", ".join(restart))
+
+            new_det = det_swap.ready()
+            if new_det is not None:
+                while inflight:          # 이전 모델에 넣어둔 프레임은 결과만 비우고 버림
+                    inflight.popleft()
+                    try:
+                        det.result()
+                    except Exception:
+                        pass
+                det.close()
+                det = new_det
+                names = det.names
+                judge._ensure_ids(names, reset=True)
+                res.apply_libs()           # CPU 모델로 바뀌었으면 이제 torch가 로드돼 있음
+                log.info("[CFG] detector reloaded")
+
+            # 스레드가 새로 생기거나 없어졌으면(모델 재로드, worker 시작 ...) 역할별 코어 / nice 다시 적용
+            if threading.active_count() != n_threads:
+                res.assign(inline_infer=det.depth <= 1)
+                n_threads = threading.active_count()
+
+            frame_start = time.perf_counter()
+            with t_capture:
+                frame = cam.read()
+
+            # FPS 계산
+            now = time.time()
+            fps = 1 / (now - prev)
+            # 카메라 주기보다 늦게 돌아온 만큼은 놓친 프레임으로 집계
+            missed = int((now - prev) / cam_period + 0.5) - 1
+            if missed > 0:
+                dropped.inc(missed)
+            prev = now
+            frames.inc()
+            log.info("FPS=%.1f", fps)
+
+            # inflight_depth > 1 이면 이번 프레임은 넣어두고 이전 프레임 결과를 받는다
+            # (프레임 N 추론 중에 N+1 캡처 / N-1 후처리가 겹침. t_infer는 기다린 시간만)
+            with t_infer:
+                if det.depth > 1:
+                    det.submit(frame)
+                    inflight.append((frame, now))
+                    if len(inflight) < det.depth:
+                        continue
+                    frame, now = inflight.popleft()
+                    dets = det.result()
+                else:
+                    dets = det.infer(frame)
+
+            if recorder is not None:
+                with t_record:
+                    recorder.write(now, dets)
+
+            with t_judge:
+                unsafe_prob, overlay = judge.evaluate(frame, dets, draw=draw)
+            with t_smooth:
+                smooth.push(unsafe_prob)
+                smooth_val = smooth.decision()
+
+            # YOLO 분석
+            with t_analyze:
+                helmet_on, helmet_off, vest_on, vest_off = analyze_safety(dets, names)
+
+            log.debug("[STATE] helmet_on=%s, helmet_off=%s, vest_on=%s, vest_off=%s",
+                      helmet_on, helmet_off, vest_on, vest_off)
+
+            alert = alert_type(helmet_on, helmet_off, vest_on, vest_off)
+
+            # Flask에 전송
+            if alert != last_alert or now - last_time > SEND_INTERVAL:
+                with t_uplink:
+                    uplink.send(alert)
+                last_alert = alert
+                last_time = now
+
+            # GPIO & 블루투스 알림
+            with t_notify:
+                notifier.set_level(level_for(alert))
+            with t_bt:
+                admin_notifier.send_state(alert != "ok")
+
+            # CSV 저장
+            with t_csv:
+                write_csv(helmet_on, vest_on, alert, csv_path)
+
+            # 디버그 HUD 표시
+            if draw:
+                hud = overlay if overlay is not None else frame
+                cv2.putText(hud, f"Alert:{alert} Helmet:{helmet_on} Vest:{vest_on}",
+                            (8, 24), cv2.FONT_HERSHEY_SIMPLEX, 0.7,
+                            (0, 255, 0) if alert == "ok" else (0, 165, 255), 2)
+
+            # 클립 링 버퍼에 쓰고, 위반으로 바뀐 순간이면 클립 시작
+            if clips is not None:
+                with t_clip:
+                    clips.push(overlay if overlay is not None else frame, now)
+                    if alert in clip_triggers and alert != prev_alert:
+                        clips.trigger(alert, now)
+            prev_alert = alert
+
+            # 웹에서 보고 있을 때만 최신 프레임을 슬롯에 덮어쓰기
+            if slot is not None and slot.watched():
+                with t_stream:
+                    slot.publish(overlay if overlay is not None else frame)
+
+            # 카메라 출력
+            key = 0
+            if show:
+                with t_display:
+                    cv2.imshow("smart_safety", overlay if overlay is not None else frame)
+                    key = cv2.waitKey(1) & 0xFF
+
+            if blackbox is not None:
+                with t_blackbox:
+                    blackbox.write(now, dets, judge.last_persons, alert,
+                                   (helmet_on, helmet_off, vest_on, vest_off), unsafe_prob, smooth_val,
+                                   time.perf_counter() - frame_start, bb_timers)
+
+            h_frame.observe(time.perf_counter() - frame_start)
+            if key == 27:
+                break
+            if monitor is not None and monitor.done():
+                break
+
+    finally:
+        watcher.close()
+        if monitor is not None:
+            monitor.stop()
+            monitor.report(args.report)
+        notifier.close()
+        det.close()
+        uplink.close()
+        if recorder is not None:
+            recorder.close()
+        if clips is not None:
+            clips.close()
+        if blackbox is not None:
+            blackbox.close()
+        cam.close()
+        if slot is not None:
+            slot.close()
+        if show:
+            cv2.destroyAllWindows()
+        log_listener.stop()
+
+
+if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,199 @@
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# ---------------------------------------
+#   가벼운 per-stage latency 계측 + Prometheus text 노출
+#   - 히스토그램은 고정 버킷(로그 간격)이라 메모리가 일정하고 observe는 bisect 한 번
+#   - p50/p95/p99는 버킷 안에서 선형 보간한 근사값
+# ---------------------------------------
+def log_buckets(lo=1e-6, hi=10.0, factor=1.25):
+    out = []
+    b = lo
+    while b < hi:
+        out.append(b)
+        b *= factor
+    out.append(hi)
+    return tuple(out)
+
+
+DEFAULT_BUCKETS = log_buckets()
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.bounds = buckets
+        self.counts = [0] * (len(buckets) + 1)   # 마지막 칸은 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, v):
+        self.counts[bisect.bisect_left(self.bounds, v)] += 1
+        self.sum += v
+        self.count += 1
+
+    def quantile(self, q):
+        return quantile(self.bounds, list(self.counts), q)
+
+    def snapshot(self):
+        """현재 버킷 카운트 복사본. 두 snapshot의 차이로 구간별 quantile을 낼 수 있다."""
+        return list(self.counts)
+
+
+def quantile(bounds, counts, q):
+    total = sum(counts)
+    if not total:
+        return float("nan")
+    rank = q * total
+    acc = 0
+    for i, c in enumerate(counts):
+        if acc + c >= rank and c:
+            lo = bounds[i - 1] if i > 0 else 0.0
+            hi = bounds[i] if i < len(bounds) else bounds[-1]
+            return lo + (hi - lo) * (rank - acc) / c
+        acc += c
+    return bounds[-1]
+
+
+class StageTimer:
+    """
+    with 블록 시간을 히스토그램에 기록. 같은 stage를 중첩해서 쓰지 않는다는 전제.
+    last는 마지막 블록 시간(초). 블랙박스가 프레임마다 읽고 0으로 돌려놓는다.
+    """
+
+    __slots__ = ("hist", "_t0", "last")
+
+    def __init__(self, hist):
+        self.hist = hist
+        self._t0 = 0.0
+        self.last = 0.0
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.last = dt = time.perf_counter() - self._t0
+        self.hist.observe(dt)
+        return False
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, n=1):
+        with self._lock:
+            self.value += n
+
+
+class Registry:
+    def __init__(self, prefix="smart_safety"):
+        self.prefix = prefix
+        self.stages = {}      # stage 이름 -> Histogram
+        self.counters = {}    # 이름 -> (doc, Counter)
+        self.gauges = {}      # 이름 -> (doc, 값을 돌려주는 함수)
+        self._lock = threading.Lock()
+
+    def stage(self, name):
+        with self._lock:
+            h = self.stages.get(name)
+            if h is None:
+                h = self.stages[name] = Histogram()
+        return StageTimer(h)
+
+    def counter(self, name, doc=""):
+        with self._lock:
+            if name not in self.counters:
+                self.counters[name] = (doc, Counter())
+            return self.counters[name][1]
+
+    def gauge(self, name, fn, doc=""):
+        with self._lock:
+            self.gauges[name] = (doc, fn)
+
+    def summary(self):
+        """{stage: {"count", "mean", "p50", "p95", "p99"}} (초 단위)."""
+        with self._lock:
+            stages = dict(self.stages)
+        out = {}
+        for name, h in stages.items():
+            out[name] = {"count": h.count, "mean": h.sum / h.count if h.count else float("nan")}
+            for q in QUANTILES:
+                out[name][f"p{int(q * 100)}"] = h.quantile(q)
+        return out
+
+    def render(self):
+        p = self.prefix
+        lines = []
+        with self._lock:
+            stages = sorted(self.stages.items())
+            counters = sorted(self.counters.items())
+            gauges = sorted(self.gauges.items())
+
+        name = f"{p}_stage_seconds"
+        lines.append(f"# HELP {name} Per-stage processing time of the main loop.")
+        lines.append(f"# TYPE {name} histogram")
+        for stage, h in stages:
+            acc = 0
+            for b, c in zip(h.bounds, h.counts):
+                acc += c
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{b:.6g}"}} {acc}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {h.count}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {h.sum:.6f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {h.count}')
+
+        qname = f"{p}_stage_quantile_seconds"
+        lines.append(f"# HELP {qname} Approximate per-stage latency quantiles.")
+        lines.append(f"# TYPE {qname} gauge")
+        for stage, h in stages:
+            for q in QUANTILES:
+                lines.append(f'{qname}{{stage="{stage}",quantile="{q}"}} {h.quantile(q):.6f}')
+
+        for cname, (doc, c) in counters:
+            lines.append(f"# HELP {p}_{cname}_total {doc}")
+            lines.append(f"# TYPE {p}_{cname}_total counter")
+            lines.append(f"{p}_{cname}_total {c.value}")
+
+        for gname, (doc, fn) in gauges:
+            try:
+                v = float(fn())
+            except Exception:
+                continue
+            lines.append(f"# HELP {p}_{gname} {doc}")
+            lines.append(f"# TYPE {p}_{gname} gauge")
+            lines.append(f"{p}_{gname} {v:g}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+# node_exporter(9100)와 같은 Pi에서 돌 수 있어서 다른 포트
+DEFAULT_PORT = 9896
+
+
+def start_exporter(registry=REGISTRY, port=DEFAULT_PORT, host="0.0.0.0"):
+    """별도 스레드에서 /metrics를 Prometheus text 형식으로 제공. 포트를 못 열면 OSError."""
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    srv = ThreadingHTTPServer((host, port), _Handler)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
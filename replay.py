@@ -0,0 +1,274 @@
+"""
+detection 녹화 / 재생 도구.
+
+main.py가 config.yaml의 record.path가 설정되어 있으면 프레임마다 detection을
+compact binary(.ssdr)로 저장한다 (DetRecorder). 이 파일을 카메라 / 모델 없이
+HelmetJudge → TemporalSmoother 에 최대 속도로 다시 흘려서
+  - 라벨 대비 알림 precision / recall (구간 단위 + 프레임 단위)
+  - 알림 지연 (라벨 구간 시작 → 알림 켜짐)
+  - 초당 판정 수
+를 출력한다.
+
+    python replay.py records/20250101_090000.ssdr --labels day1.csv
+    python replay.py records/*.ssdr --set helmet_min_conf=0.45 --window 8
+
+라벨 CSV: start,end[,note]  (녹화 시작 기준 초. 알림이 떠야 하는 unsafe 구간)
+각 녹화 파일 옆에 <파일>.labels.csv 가 있으면 자동으로 사용한다.
+
+파일 형식 (little endian)
+  header : b"SSDR" | u16 version | u16 width | u16 height | u32 len | names JSON
+  frame  : f64 time | u16 n | n x (u16 cls, f32 conf, f32 x1, y1, x2, y2)
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+import yaml
+
+from rules import HelmetJudge
+from temporal_lstm import TemporalSmoother
+
+MAGIC = b"SSDR"
+VERSION = 1
+_HEAD = struct.Struct("<4sHHHI")
+_FRAME = struct.Struct("<dH")
+_DET = struct.Struct("<Hf4f")
+
+
+# ---------------------------------------
+#   녹화
+# ---------------------------------------
+class DetRecorder:
+    """프레임마다 (time, dets)를 append. 버퍼링해서 쓰고 close()에서 flush."""
+
+    def __init__(self, path, names, width, height, buffering=1 << 16):
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self.path = path
+        self.frames = 0
+        self._f = open(path, "wb", buffering=buffering)
+        if isinstance(names, (list, tuple)):
+            names = dict(enumerate(names))
+        meta = json.dumps({str(k): v for k, v in (names or {}).items()}).encode("utf-8")
+        self._f.write(_HEAD.pack(MAGIC, VERSION, width, height, len(meta)))
+        self._f.write(meta)
+
+    def write(self, t, dets):
+        parts = [_FRAME.pack(t, len(dets))]
+        for d in dets:
+            x1, y1, x2, y2 = d.get("box") or (0, 0, 0, 0)
+            parts.append(_DET.pack(int(d.get("cls", 0)) & 0xFFFF, float(d.get("conf", 0.0)),
+                                   x1, y1, x2, y2))
+        self._f.write(b"".join(parts))
+        self.frames += 1
+
+    def close(self):
+        if not self._f.closed:
+            self._f.close()
+
+
+# ---------------------------------------
+#   읽기
+# ---------------------------------------
+def read_header(f):
+    magic, ver, w, h, n = _HEAD.unpack(f.read(_HEAD.size))
+    if magic != MAGIC:
+        raise ValueError(f"not a detection recording: {getattr(f, 'name', f)}")
+    if ver != VERSION:
+        raise ValueError(f"unsupported recording version {ver}")
+    names = {int(k): v for k, v in json.loads(f.read(n).decode("utf-8")).items()}
+    return names, w, h
+
+
+def read_frames(f):
+    """(time, dets) generator. 전원이 나가서 잘린 마지막 프레임은 버린다."""
+    while True:
+        head = f.read(_FRAME.size)
+        if len(head) < _FRAME.size:
+            return
+        t, n = _FRAME.unpack(head)
+        body = f.read(n * _DET.size)
+        if len(body) < n * _DET.size:
+            return
+        dets = []
+        for cls, conf, x1, y1, x2, y2 in _DET.iter_unpack(body):
+            dets.append({"cls": cls, "conf": conf, "box": [x1, y1, x2, y2]})
+        yield t, dets
+
+
+def load(path):
+    with open(path, "rb") as f:
+        names, w, h = read_header(f)
+        return names, w, h, list(read_frames(f))
+
+
+def load_labels(path):
+    spans = []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            if not row or row[0].strip().startswith("#"):
+                continue
+            try:
+                spans.append((float(row[0]), float(row[1])))
+            except ValueError:
+                continue       # 헤더 줄
+    return sorted(spans)
+
+
+# ---------------------------------------
+#   재생
+# ---------------------------------------
+def run(frames, names, width, height, logic, window, threshold):
+    """
+    rules + smoothing만 돌려서 프레임별 (t, raw, alert) 리스트와 걸린 시간(초) 리턴.
+    t는 녹화 시작 기준 초.
+    """
+    judge = HelmetJudge(logic)
+    judge._ensure_ids(names)
+    smooth = TemporalSmoother(window=window)
+    frame = np.empty((max(1, height), max(1, width), 3), np.uint8)   # evaluate는 크기만 씀
+    t0 = frames[0][0] if frames else 0.0
+
+    out = []
+    start = time.perf_counter()
+    for t, dets in frames:
+        unsafe_prob, _ = judge.evaluate(frame, dets, draw=False)
+        smooth.push(unsafe_prob)
+        out.append((t - t0, unsafe_prob, smooth.decision() >= threshold))
+    return out, time.perf_counter() - start
+
+
+def episodes(timeline):
+    """알림이 켜져 있던 구간 [(on, off), ...]."""
+    spans = []
+    on = None
+    for t, _, alert in timeline:
+        if alert and on is None:
+            on = t
+        elif not alert and on is not None:
+            spans.append((on, t))
+            on = None
+    if on is not None:
+        spans.append((on, timeline[-1][0]))
+    return spans
+
+
+def score(timeline, labels, grace):
+    """
+    구간 단위:
+      recall    = 알림이 (grace 안에) 한 번이라도 켜진 라벨 구간 / 라벨 구간
+      precision = 라벨 구간과 겹친 알림 구간 / 알림 구간
+      latency   = 라벨 시작 → 그 구간에서 처음 알림이 켜져 있던 프레임
+    프레임 단위 precision / recall은 알림 on/off를 라벨과 프레임마다 비교.
+    """
+    eps = episodes(timeline)
+    hit_eps = sum(1 for a, b in eps
+                  if any(a <= e + grace and b >= s for s, e in labels))
+
+    latencies = []
+    for s, e in labels:
+        for t, _, alert in timeline:
+            if t < s:
+                continue
+            if t > e + grace:
+                break
+            if alert:
+                latencies.append(t - s)
+                break
+
+    tp = fp = fn = 0
+    for t, _, alert in timeline:
+        truth = any(s <= t <= e for s, e in labels)
+        if alert and truth:
+            tp += 1
+        elif alert:
+            fp += 1
+        elif truth:
+            fn += 1
+
+    def ratio(a, b):
+        return a / b if b else float("nan")
+
+    return {
+        "alerts": len(eps),
+        "labels": len(labels),
+        "precision": ratio(hit_eps, len(eps)),
+        "recall": ratio(len(latencies), len(labels)),
+        "frame_precision": ratio(tp, tp + fp),
+        "frame_recall": ratio(tp, tp + fn),
+        "latency_mean": ratio(sum(latencies), len(latencies)),
+        "latency_max": max(latencies) if latencies else float("nan"),
+    }
+
+
+def _parse_set(items):
+    out = {}
+    for s in items:
+        k, _, v = s.partition("=")
+        out[k.strip()] = yaml.safe_load(v)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("files", nargs="+", help=".ssdr 녹화 파일")
+    ap.add_argument("--labels", help="라벨 CSV (파일이 하나일 때). 없으면 <파일>.labels.csv")
+    ap.add_argument("--config", default="config.yaml")
+    ap.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                    help="logic 값 덮어쓰기 (예: helmet_min_conf=0.45)")
+    ap.add_argument("--window", type=int, help="TemporalSmoother window (기본: logic.temporal_window)")
+    ap.add_argument("--threshold", type=float, help="알림 기준 (기본: logic.alert_threshold)")
+    ap.add_argument("--grace", type=float, default=2.0, help="라벨 구간 끝난 뒤에도 인정하는 시간(초)")
+    ap.add_argument("--json", action="store_true", help="결과를 JSON으로 출력")
+    args = ap.parse_args()
+
+    logging.disable(logging.INFO)     # HJ 디버그 로그는 끄고 잰다
+    with open(args.config, "r", encoding="utf-8") as f:
+        logic = dict((yaml.safe_load(f) or {}).get("logic") or {})
+    logic.update(_parse_set(args.set))
+    window = args.window or logic.get("temporal_window", 12)
+    threshold = args.threshold if args.threshold is not None else logic.get("alert_threshold", 0.5)
+
+    results = []
+    for path in args.files:
+        names, w, h, frames = load(path)
+        timeline, elapsed = run(frames, names, w, h, logic, window, threshold)
+        r = {"file": path, "frames": len(frames),
+             "duration_s": timeline[-1][0] if timeline else 0.0,
+             "decisions_per_s": len(frames) / elapsed if elapsed > 0 else float("nan")}
+
+        lp = args.labels if args.labels and len(args.files) == 1 else path + ".labels.csv"
+        if os.path.isfile(lp):
+            r.update(score(timeline, load_labels(lp), args.grace))
+        else:
+            r["alerts"] = len(episodes(timeline))
+        results.append(r)
+
+    if args.json:
+        json.dump({"logic": logic, "window": window, "threshold": threshold, "results": results},
+                  sys.stdout, indent=2)
+        print()
+        return
+
+    print(f"window={window} threshold={threshold} overrides={_parse_set(args.set) or '-'}")
+    for r in results:
+        print(f"\n{r['file']}: {r['frames']} frames, {r['duration_s']:.1f}s recorded, "
+              f"{r['decisions_per_s']:.0f} decisions/s, {r['alerts']} alerts")
+        if "recall" in r:
+            print(f"  precision={r['precision']:.3f} recall={r['recall']:.3f} "
+                  f"(frame: {r['frame_precision']:.3f} / {r['frame_recall']:.3f}) "
+                  f"over {r['labels']} labeled spans")
+            print(f"  latency mean={r['latency_mean']:.2f}s max={r['latency_max']:.2f}s")
+        else:
+            print("  (라벨 없음: precision / recall 생략)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import logging
+import os
+import sys
+import threading
+
+import yaml
+
+log = logging.getLogger("resources")
+
+
+# ---------------------------------------
+#   CPU 코어 / 스레드 예산 (config.yaml resources)
+#
+#   4코어 Pi에서 torch / OpenCV / BLAS 기본 스레드 풀(각각 코어 수만큼)과
+#   우리 스레드(uplink, 알림, 블루투스, 블랙박스 flush ...)가 같은 코어를 두고 다투면
+#   프레임 latency 꼬리가 튄다. 그래서
+#   - 라이브러리 스레드 풀 크기를 정하고 (BLAS / OpenMP는 import 전에 환경 변수로만 가능)
+#   - 스레드를 이름으로 main / infer / io 역할로 나눠 코어를 고정하고
+#   - io 스레드는 nice를 올려서 main loop와 추론이 먼저 돌게 한다.
+#   Linux는 스레드마다 affinity / nice가 따로라서 native_id로 스레드 하나씩 적용.
+#   새 스레드는 만든 스레드의 설정을 물려받으므로 assign()을 다시 부르기 전까지는 main 설정.
+# ---------------------------------------
+ROLES = ("main", "infer", "io")
+
+# 이름이 이걸로 시작하면 infer 역할 (BaseDetector worker, detsvc 배치 스레드)
+INFER_THREADS = ("detector-", "detsvc-")
+
+_THREAD_ENV = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+               "NUMEXPR_NUM_THREADS", "VECLIB_MAXIMUM_THREADS")
+
+
+def thread_env(res_cfg):
+    """BLAS / OpenMP 스레드 수 환경 변수 dict. 꺼져 있거나 0이면 빈 dict."""
+    res_cfg = res_cfg or {}
+    n = int(res_cfg.get("blas_threads", 0) or 0)
+    if not res_cfg.get("enabled", False) or n <= 0:
+        return {}
+    return {k: str(n) for k in _THREAD_ENV}
+
+
+def set_thread_env(path="config.yaml"):
+    """
+    numpy / cv2 / torch import 전에 호출 (BLAS 스레드 풀은 라이브러리 로드 시점에 만들어짐).
+    이미 환경 변수로 지정한 값은 그대로 둔다.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cfg = yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError):
+        return
+    for k, v in thread_env(cfg.get("resources")).items():
+        os.environ.setdefault(k, v)
+
+
+class ResourceManager:
+    def __init__(self, res_cfg):
+        res_cfg = res_cfg or {}
+        self.enabled = bool(res_cfg.get("enabled", False))
+        self.torch_threads = int(res_cfg.get("torch_threads", 0) or 0)
+        self.opencv_threads = int(res_cfg.get("opencv_threads", 0) or 0)
+        self.io_nice = int(res_cfg.get("io_nice", 0) or 0)
+        self._can_pin = hasattr(os, "sched_setaffinity")
+        self.avail = set(os.sched_getaffinity(0)) if self._can_pin else set()
+        cores = res_cfg.get("cores") or {}
+        self.cores = {role: self._usable(role, cores.get(role)) for role in ROLES}
+        self._done = {}               # native_id -> (cores, nice) 이미 적용한 스레드
+        if self.enabled and not self._can_pin:
+            log.warning("[RES] sched_setaffinity not available on %s, thread pinning disabled", sys.platform)
+
+    def _usable(self, role, wanted):
+        if not wanted:
+            return None
+        s = {int(c) for c in wanted}
+        if self._can_pin:
+            s &= self.avail
+            if not s:
+                if self.enabled:
+                    log.warning("[RES] cores.%s=%s not available (have %s), not pinning",
+                                role, list(wanted), sorted(self.avail))
+                return None
+        return frozenset(s)
+
+    def apply_libs(self):
+        """OpenCV / torch intra-op 스레드 수. torch는 이미 로드된 경우만 (CPU 모델일 때)."""
+        if not self.enabled:
+            return
+        if self.opencv_threads > 0:
+            import cv2
+            cv2.setNumThreads(self.opencv_threads)
+        if self.torch_threads > 0 and "torch" in sys.modules:
+            torch = sys.modules["torch"]
+            if torch.get_num_threads() != self.torch_threads:
+                torch.set_num_threads(self.torch_threads)
+        log.info("[RES] threads: opencv=%s torch=%s blas=%s",
+                 self.opencv_threads or "default",
+                 (self.torch_threads or "default") if "torch" in sys.modules else "-",
+                 os.environ.get("OPENBLAS_NUM_THREADS", "default"))
+
+    def plan(self, thread, inline_infer=False):
+        """스레드 하나의 (코어 set 또는 None, nice 또는 None)."""
+        if thread is threading.main_thread():
+            cores = self.cores["main"]
+            if inline_infer and self.cores["infer"]:
+                # depth 1이면 main loop에서 바로 추론 → torch / OpenCV 풀도 main 스레드에서 생김
+                cores = (cores or frozenset()) | self.cores["infer"]
+            return cores, None
+        if thread.name.startswith(INFER_THREADS):
+            return self.cores["infer"], None
+        return self.cores["io"], self.io_nice or None
+
+    def assign(self, inline_infer=False):
+        """
+        살아 있는 Python 스레드에 역할별 코어 / nice 적용. 바뀐 게 없는 스레드는 건너뛴다.
+        런타임이 만든 외부 스레드(Dummy, 콜백용)는 건드리지 않는다.
+        """
+        if not self.enabled:
+            return
+        done = {}
+        for t in threading.enumerate():
+            tid = t.native_id
+            if tid is None or isinstance(t, threading._DummyThread):
+                continue
+            want = self.plan(t, inline_infer)
+            if self._done.get(tid) != want:
+                self._apply(tid, want, t.name)
+            done[tid] = want
+        self._done = done
+
+    def pin_process(self, pid, role="io"):
+        """자식 프로세스(클립 인코더 등)를 역할 코어 / nice로. 그 뒤에 생기는 스레드는 물려받음."""
+        if not self.enabled:
+            return
+        nice = (self.io_nice or None) if role == "io" else None
+        self._apply(pid, (self.cores[role], nice), f"pid {pid}")
+
+    def _apply(self, tid, want, label):
+        cores, nice = want
+        if cores and self._can_pin:
+            try:
+                os.sched_setaffinity(tid, cores)
+            except OSError as e:
+                log.warning("[RES] affinity %s -> %s failed: %s", label, sorted(cores), e)
+        if nice:
+            try:
+                os.setpriority(os.PRIO_PROCESS, tid, nice)
+            except (OSError, AttributeError) as e:
+                log.warning("[RES] nice %s -> %d failed: %s", label, nice, e)
+        log.debug("[RES] %s (tid %d): cores=%s nice=%s", label, tid,
+                  sorted(cores) if cores else "-", nice)
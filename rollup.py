@@ -0,0 +1,129 @@
+import calendar
+import math
+import threading
+import time
+
+from logtail import FINALS
+
+
+TIME_FMT = "%Y-%m-%d %H:%M:%S"
+
+# (이름, 버킷 크기(초), 보관 기간(초) / None이면 무제한)
+LEVELS = (
+    ("minute", 60, 2 * 86400),
+    ("hour", 3600, 90 * 86400),
+    ("day", 86400, None),
+)
+
+MAX_POINTS = 1000
+# 한 포인트를 만들 때 합치는 하위 버킷 최대 개수 (조회 비용 상한 = points * 이 값)
+MAX_MERGE = 60
+
+
+def parse_time(s):
+    """CSV time 문자열 → 벽시계 기준 epoch초 (timezone/DST 변환 없이 그대로)."""
+    return calendar.timegm(time.strptime(s, TIME_FMT))
+
+
+def format_time(ts):
+    return time.strftime(TIME_FMT, time.gmtime(ts))
+
+
+class Rollups:
+    """
+    상태(SAFE / WARNING / DANGER)별 개수를 분/시/일 버킷으로 누적.
+    LogTail의 listener로 붙어서 새 row가 들어올 때마다 add_row()로 증분 갱신되고,
+    series()는 요청 구간 길이와 상관없이 최대 points개 버킷만 훑는다.
+    """
+
+    def __init__(self, levels=LEVELS):
+        self.levels = levels
+        self.buckets = {name: {} for name, _, _ in levels}   # bucket 시작 → [SAFE, WARNING, DANGER]
+        self.newest = None
+        self._lock = threading.Lock()
+        self._minute_key = None     # 같은 분이 연속으로 오니까 직전 분 파싱 결과만 캐시
+        self._minute_ts = 0
+
+    # ------------------------------------------------------------------
+    #  LogTail listener
+    # ------------------------------------------------------------------
+    def reset(self):
+        with self._lock:
+            for b in self.buckets.values():
+                b.clear()
+            self.newest = None
+
+    def add_row(self, row):
+        final = row.get("final")
+        if final not in FINALS:
+            return
+        t = row.get("time", "")
+        try:
+            if t[:16] != self._minute_key:
+                self._minute_ts = calendar.timegm(time.strptime(t[:16], "%Y-%m-%d %H:%M"))
+                self._minute_key = t[:16]
+            ts = self._minute_ts + int(t[17:19] or 0)
+        except ValueError:
+            return
+        self.add(ts, FINALS.index(final))
+
+    def add(self, ts, idx):
+        with self._lock:
+            for name, step, keep in self.levels:
+                b = self.buckets[name]
+                k = ts - ts % step
+                cnt = b.get(k)
+                if cnt is None:
+                    cnt = b[k] = [0, 0, 0]
+                    if keep is not None:
+                        self._prune(b, k - keep)
+                cnt[idx] += 1
+            if self.newest is None or ts > self.newest:
+                self.newest = ts
+
+    @staticmethod
+    def _prune(b, horizon):
+        # dict는 삽입 순서(=대부분 시간 순)라 앞에서부터 지우면 됨
+        while b:
+            k = next(iter(b))
+            if k >= horizon:
+                break
+            del b[k]
+
+    # ------------------------------------------------------------------
+    #  조회
+    # ------------------------------------------------------------------
+    def series(self, start, end, points=200, res=None):
+        """
+        [start, end) 구간을 최대 points개 포인트로 다운샘플링한 시계열.
+        res(minute/hour/day)를 주면 그보다 촘촘하게는 나누지 않는다.
+        """
+        points = max(1, min(int(points), MAX_POINTS))
+        span = max(1, end - start)
+        names = [n for n, _, _ in self.levels]
+        min_step = dict((n, s) for n, s, _ in self.levels).get(res, 0)
+
+        with self._lock:
+            # 구간을 보관 중이고 하위 버킷 합산 비용이 상한 이하인 가장 촘촘한 레벨
+            for name, step, keep in self.levels:
+                if step < min_step:
+                    continue
+                if keep is not None and self.newest is not None and start < self.newest - keep:
+                    continue
+                if span / step <= points * MAX_MERGE or name == names[-1]:
+                    break
+
+            width = max(step, min_step, math.ceil(span / points / step) * step)
+            b = self.buckets[name]
+            out = []
+            t = start - start % width
+            while t < end:
+                tot = [0, 0, 0]
+                for k in range(t, t + width, step):
+                    c = b.get(k)
+                    if c:
+                        tot[0] += c[0]; tot[1] += c[1]; tot[2] += c[2]
+                out.append({"time": format_time(t), "SAFE": tot[0], "WARNING": tot[1], "DANGER": tot[2]})
+                t += width
+
+        return {"level": name, "step": width, "points": out}
@@ -1,389 +1,895 @@
-from flask import Flask, request, jsonify, send_file
-import time
-import csv
-import json
-
-app = Flask(__name__)
-
-latest_alert = None  # 최근 알림 저장용 변수
-
-
-# ===========================================================
-# 1) 기본 대시보드 화면 (실시간 상태만 표시)
-# ===========================================================
-@app.route("/")
-def index():
-    html = """
-    <!DOCTYPE html>
-    <html lang="ko">
-    <head>
-        <meta charset="UTF-8">
-        <title>스마트 안전 모니터링</title>
-        <style>
-            body { font-family: Arial, sans-serif; padding: 20px; }
-            .status-box {
-                border: 2px solid #333; border-radius: 10px;
-                padding: 20px; width: 300px; text-align: center;
-            }
-            .safe { background-color: #d4f7d4; }
-            .danger { background-color: #ffcccc; }
-        </style>
-    </head>
-    <body>
-        <h1>스마트 안전 모니터링 대시보드</h1>
-        <div id="status" class="status-box">
-            <h2>상태: <span id="status-text">데이터 없음</span></h2>
-            <p id="time-text"></p>
-        </div>
-
-        <script>
-            function updateStatus() {
-                fetch("/get_alert")
-                    .then(r => r.json())
-                    .then(data => {
-                        const box = document.getElementById("status");
-                        const txt = document.getElementById("status-text");
-                        const timeTxt = document.getElementById("time-text");
-
-                        if (!data || !data.type) {
-                            txt.textContent = "데이터 없음";
-                            timeTxt.textContent = "";
-                            box.className = "status-box";
-                            return;
-                        }
-
-                        if (data.type === "no_helmet") {
-                            box.className = "status-box danger";
-                            txt.textContent = "⚠ 안전모 미착용!";
-                        } else if (data.type === "ok") {
-                            box.className = "status-box safe";
-                            txt.textContent = "✅ 정상 (착용)";
-                        } else {
-                            box.className = "status-box";
-                            txt.textContent = "상태: " + data.type;
-                        }
-
-                        if (data.time) {
-                            const ts = new Date(data.time * 1000);
-                            timeTxt.textContent = "감지 시간: " + ts.toLocaleString();
-                        }
-                    });
-            }
-            setInterval(updateStatus, 1000);
-            updateStatus();
-        </script>
-    </body>
-    </html>
-    """
-    return html
-
-
-
-# ===========================================================
-# 2) 라즈베리파이 → 서버 알림 전달 API
-# ===========================================================
-@app.route("/alert", methods=["POST"])
-def alert():
-    global latest_alert
-    data = request.get_json()
-    alert_type = data.get("type", "unknown")
-
-    latest_alert = {
-        "type": alert_type,
-        "time": time.time()
-    }
-    print("새 알림 수신:", latest_alert)
-    return "ok"
-
-
-
-# ===========================================================
-# 3) 최근 알림 조회 API
-# ===========================================================
-@app.route("/get_alert")
-def get_alert():
-    if latest_alert is None:
-        return jsonify({})
-    return jsonify(latest_alert)
-
-
-
-# ===========================================================
-# 4) CSV 파일 그대로 제공 API
-# ===========================================================
-@app.route("/get_csv")
-def get_csv():
-    try:
-        with open("safety_log.csv", "r", encoding="utf-8") as f:
-            return f.read(), 200
-    except FileNotFoundError:
-        return "CSV file not found", 404
-
-
-
-# ===========================================================
-# 5) CSV 테이블 페이지 (/logs)
-# ===========================================================
-@app.route("/logs")
-def logs_page():
-    rows = []
-    try:
-        with open("safety_log.csv", "r", encoding="utf-8") as f:
-            reader = csv.reader(f)
-            header = next(reader, [])
-            for r in reader:
-                rows.append(r)
-    except FileNotFoundError:
-        header = ["time", "helmet", "vest", "final"]
-
-    html = """
-    <html><head>
-    <meta charset="utf-8"><title>Smart Safety Log</title>
-    <style>
-        body { font-family: Arial; padding: 20px; }
-        table { border-collapse: collapse; width: 100%; }
-        th, td { border:1px solid #999; padding: 8px; text-align:center; }
-        th { background:#eee; }
-        tr:nth-child(even){ background:#f9f9f9; }
-    </style>
-    </head><body>
-    <h2>📒 Smart Safety Log</h2>
-    <table><tr>
-    """
-
-    for h in header:
-        html += f"<th>{h}</th>"
-    html += "</tr>"
-
-    for row in rows:
-        html += "<tr>"
-        for col in row:
-            html += f"<td>{col}</td>"
-        html += "</tr>"
-
-    html += """
-    </table><br>
-    <a href="/download_csv">📥 CSV 다운로드</a>
-    </body></html>
-    """
-    return html
-
-
-
-# ===========================================================
-# 6) CSV 다운로드
-# ===========================================================
-@app.route("/download_csv")
-def download_csv():
-    try:
-        return send_file("safety_log.csv", as_attachment=True)
-    except FileNotFoundError:
-        return "CSV 파일 없음"
-
-
-
-# ===========================================================
-# 7) 그래프 포함 Dashboard 페이지
-# ===========================================================
-def read_csv():
-    result = []
-    try:
-        with open("safety_log.csv", "r", encoding="utf-8") as f:
-            for row in csv.DictReader(f):
-                result.append(row)
-    except FileNotFoundError:
-        pass
-    return result
-
-
-@app.route("/dashboard")
-def dashboard():
-
-    html = """
-    <html>
-    <head>
-        <meta charset="utf-8">
-        <title>Smart Safety Dashboard</title>
-        <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-
-        <style>
-            body { font-family: Arial; padding: 20px; }
-
-            .card {
-                border: 1px solid #ccc;
-                padding: 15px;
-                border-radius: 10px;
-                width: 300px;
-                margin-bottom: 20px;
-            }
-
-            .safe { background-color: #dfffd8; }
-            .warning { background-color: #fff5cc; }
-            .danger { background-color: #ffd1d1; }
-
-            table {
-                width: 100%;
-                border-collapse: collapse;
-                margin-top: 20px;
-            }
-            th, td {
-                border: 1px solid #999;
-                padding: 8px;
-                text-align: center;
-            }
-            th { background: #f2f2f2; }
-
-        </style>
-    </head>
-
-    <body>
-
-        <h1>📊 Smart Safety Dashboard</h1>
-
-        <!-- 상태 카드 -->
-        <div id="status_card" class="card">
-            <h3>⏱ 시간: <span id="latest_time">-</span></h3>
-            <p>🪖 헬멧: <span id="latest_helmet">-</span></p>
-            <p>🦺 조끼: <span id="latest_vest">-</span></p>
-            <p>⚠ 상태: <span id="latest_final">-</span></p>
-        </div>
-
-        <!-- 그래프 -->
-        <h2>상태 그래프</h2>
-        <canvas id="chart" width="400" height="200"></canvas>
-
-        <!-- 로그 테이블 -->
-        <h2>최근 로그</h2>
-        <table>
-            <tr>
-                <th>Time</th>
-                <th>Helmet</th>
-                <th>Vest</th>
-                <th>Final</th>
-            </tr>
-            <tbody id="log_table"></tbody>
-        </table>
-
-        <script>
-
-            let chart = null;
-
-            function updateDashboard() {
-                fetch("/dashboard_data")
-                .then(r => r.json())
-                .then(data => {
-
-                    // -------------------------
-                    // 최신 상태 카드 업데이트
-                    // -------------------------
-                    document.getElementById("latest_time").innerText = data.latest.time;
-                    document.getElementById("latest_helmet").innerText = data.latest.helmet;
-                    document.getElementById("latest_vest").innerText = data.latest.vest;
-                    document.getElementById("latest_final").innerText = data.latest.final;
-
-                    const card = document.getElementById("status_card");
-                    card.className = "card " +
-                        (data.latest.final === "SAFE" ? "safe"
-                         : data.latest.final === "WARNING" ? "warning"
-                         : "danger");
-
-                    // -------------------------
-                    // 그래프 업데이트
-                    // -------------------------
-                    let count = data.count;
-
-                    if (chart === null) {
-                        const ctx = document.getElementById("chart").getContext("2d");
-                        chart = new Chart(ctx, {
-                            type: "bar",
-                            data: {
-                                labels: ["SAFE", "WARNING", "DANGER"],
-                                datasets: [{
-                                    label: "Count",
-                                    data: [count.SAFE, count.WARNING, count.DANGER],
-                                    backgroundColor: ["#66dd66", "#ffdd55", "#ff6666"]
-                                }]
-                            }
-                        });
-                    } else {
-                        chart.data.datasets[0].data = [
-                            count.SAFE, count.WARNING, count.DANGER
-                        ];
-                        chart.update();
-                    }
-
-
-                    // -------------------------
-                    // 로그 테이블 업데이트
-                    // -------------------------
-                    let html = "";
-                    for (let row of data.logs) {
-                        html += `
-                            <tr>
-                                <td>${row.time}</td>
-                                <td>${row.helmet}</td>
-                                <td>${row.vest}</td>
-                                <td>${row.final}</td>
-                            </tr>
-                        `;
-                    }
-                    document.getElementById("log_table").innerHTML = html;
-
-                });
-            }
-
-            // 1초마다 업데이트
-            setInterval(updateDashboard, 1000);
-            updateDashboard();
-
-        </script>
-
-    </body>
-    </html>
-    """
-
-    return html
-
-
-
-@app.route("/dashboard_data")
-def dashboard_data():
-    logs = read_csv()
-
-    # 최신 상태 결정
-    if logs:
-        last = logs[-1]
-        latest_info = {
-            "time": last["time"],
-            "helmet": last["helmet"],
-            "vest": last["vest"],
-            "final": last["final"],
-        }
-    else:
-        latest_info = {
-            "time": "-",
-            "helmet": "-",
-            "vest": "-",
-            "final": "-"
-        }
-
-    # 상태 개수 카운트
-    count = {"SAFE": 0, "WARNING": 0, "DANGER": 0}
-    for row in logs:
-        if row["final"] in count:
-            count[row["final"]] += 1
-
-    return jsonify({
-        "latest": latest_info,
-        "count": count,
-        "logs": logs[-100:]  # 최근 100개만
-    })
-
-
-
-
-# ===========================================================
-# 8) 서버 실행 (항상 가장 마지막에 있어야 함)
-# ===========================================================
-if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000)
+import argparse
+import signal
+import sys
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context
+import time
+import csv
+import json
+import io
+import math
+import os
+import threading
+import zlib
+from collections import OrderedDict
+import yaml
+from html import escape
+from urllib.parse import urlencode
+
+from logtail import LogTail, seek_time
+from events import EventHub
+from rollup import Rollups, parse_time, format_time
+from framebus import FrameReader, MjpegStreamer, DEFAULT_NAME
+from fleet import FleetRegistry, SqliteFleetRegistry
+
+app = Flask(__name__)
+
+
+def _load_cfg(path="config.yaml"):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        return {}
+
+
+CFG = _load_cfg()
+SERVER_CFG = CFG.get("server") or {}
+
+
+def _make_fleet():
+    """
+    워커 프로세스가 하나면 메모리, 여러 개면 모든 워커가 공유하는 SQLite 파일.
+    (--workers > 1 로 띄우면 fork 전에 SMART_SAFETY_STORE=sqlite 로 다시 만든다)
+    """
+    store = os.environ.get("SMART_SAFETY_STORE") or SERVER_CFG.get("store", "memory")
+    if store == "sqlite":
+        return SqliteFleetRegistry(SERVER_CFG.get("store_path", "fleet_state.db"))
+    return FleetRegistry(max_devices=1000, stale_s=10.0)
+
+
+fleet = _make_fleet()   # 장치별 최근 알림 / heartbeat
+
+log_tail = LogTail("safety_log.csv", keep=100)  # dashboard_data용 incremental reader
+rollups = Rollups()                              # 분/시/일 단위 상태 집계 (/history)
+log_tail.add_listener(rollups)
+# 끊긴 클라이언트는 다음 write(heartbeat) 때 정리되므로 heartbeat를 짧게 유지
+hub = EventHub(max_queue=64, max_clients=256, heartbeat_s=5.0)  # /stream 구독자들
+
+LOG_PUMP_S = 0.5   # 로그 파일 새 row 확인 주기 (구독자가 있을 때만)
+
+_stream_cfg = CFG.get("stream") or {}
+mjpeg = MjpegStreamer(                           # main.py가 shared memory에 올린 프레임 → MJPEG
+    FrameReader(_stream_cfg.get("shm_name", DEFAULT_NAME)),
+    fps=_stream_cfg.get("fps", 10),
+    quality=_stream_cfg.get("jpeg_quality", 70),
+)
+
+
+# ===========================================================
+# 1) 기본 대시보드 화면 (실시간 상태만 표시)
+# ===========================================================
+@app.route("/")
+def index():
+    html = """
+    <!DOCTYPE html>
+    <html lang="ko">
+    <head>
+        <meta charset="UTF-8">
+        <title>스마트 안전 모니터링</title>
+        <style>
+            body { font-family: Arial, sans-serif; padding: 20px; }
+            .status-box {
+                border: 2px solid #333; border-radius: 10px;
+                padding: 20px; width: 300px; text-align: center;
+            }
+            .safe { background-color: #d4f7d4; }
+            .danger { background-color: #ffcccc; }
+        </style>
+    </head>
+    <body>
+        <h1>스마트 안전 모니터링 대시보드</h1>
+        <div id="status" class="status-box">
+            <h2>상태: <span id="status-text">데이터 없음</span></h2>
+            <p id="time-text"></p>
+        </div>
+
+        <h2>실시간 영상</h2>
+        <img src="/video_feed" style="max-width: 100%; border: 1px solid #333;" alt="영상 없음">
+
+        <script>
+            function applyStatus(data) {
+                const box = document.getElementById("status");
+                const txt = document.getElementById("status-text");
+                const timeTxt = document.getElementById("time-text");
+
+                if (!data || !data.type) {
+                    txt.textContent = "데이터 없음";
+                    timeTxt.textContent = "";
+                    box.className = "status-box";
+                    return;
+                }
+
+                if (data.type === "no_helmet") {
+                    box.className = "status-box danger";
+                    txt.textContent = "⚠ 안전모 미착용!";
+                } else if (data.type === "ok") {
+                    box.className = "status-box safe";
+                    txt.textContent = "✅ 정상 (착용)";
+                } else {
+                    box.className = "status-box";
+                    txt.textContent = "상태: " + data.type;
+                }
+
+                if (data.time) {
+                    const ts = new Date(data.time * 1000);
+                    timeTxt.textContent = "감지 시간: " + ts.toLocaleString();
+                }
+            }
+
+            function updateStatus() {
+                fetch("/get_alert")
+                    .then(r => r.json())
+                    .then(applyStatus);
+            }
+
+            // EventSource가 되면 /stream push로 받고, 안 되면 1초 polling
+            let poller = null;
+            function startPolling() {
+                if (poller !== null) return;
+                poller = setInterval(updateStatus, 1000);
+                updateStatus();
+            }
+
+            if (window.EventSource) {
+                const es = new EventSource("/stream?topics=alert");
+                es.addEventListener("alert", e => applyStatus(JSON.parse(e.data)));
+                es.onerror = () => {
+                    if (es.readyState === EventSource.CLOSED) startPolling();
+                };
+            } else {
+                startPolling();
+            }
+        </script>
+    </body>
+    </html>
+    """
+    return html
+
+
+
+# ===========================================================
+# 2) 라즈베리파이 → 서버 알림 전달 API
+# ===========================================================
+@app.route("/alert", methods=["POST"])
+def alert():
+    """예전 단건 API. device를 안 주면 "default" 장치로 취급."""
+    data = request.get_json()
+    alert_type = data.get("type", "unknown")
+
+    latest = fleet.ingest(data.get("device", "default"), [{"type": alert_type, "time": time.time()}])
+    _push_alert(latest)
+    print("새 알림 수신:", latest)
+    return "ok"
+
+
+def _bad_event(ev):
+    """/ingest 이벤트 하나 검사. 문제 있으면 이유 문자열, 괜찮으면 None."""
+    if not isinstance(ev, dict):
+        return "must be an object"
+    if not isinstance(ev.get("type", "unknown"), str):
+        return "type must be a string"
+    t = ev.get("time", 0.0)
+    if isinstance(t, bool) or not isinstance(t, (int, float)) or not math.isfinite(t):
+        return "time must be a number"
+    return None
+
+
+@app.route("/ingest", methods=["POST"])
+def ingest():
+    """
+    여러 장치용 배치 API.
+      {"device": "pi-01", "events": [{"type": "no_helmet", "time": 1700000000.0}, ...]}
+    events가 비어 있으면 heartbeat로만 처리. SSE에는 배치의 마지막 상태만 push.
+    """
+    data = request.get_json(silent=True) or {}
+    device = data.get("device")
+    events = data.get("events") or []
+    if not device or not isinstance(events, list):
+        return jsonify({"error": "device and events[] required"}), 400
+    for i, ev in enumerate(events):
+        bad = _bad_event(ev)
+        if bad:
+            return jsonify({"error": f"events[{i}]: {bad}"}), 400
+
+    latest = fleet.ingest(str(device), events)
+    if events:
+        _push_alert(latest)
+    return jsonify({"accepted": len(events)})
+
+
+@app.route("/fleet")
+def fleet_overview():
+    """장치별 최신 상태 / 마지막 수신 시각 / 온라인 여부 / 이벤트 수."""
+    return jsonify(fleet.overview())
+
+
+
+# ===========================================================
+# 3) 최근 알림 조회 API
+# ===========================================================
+_json_cache = OrderedDict()   # key -> (version, 직렬화된 body)
+_json_cache_lock = threading.Lock()
+JSON_CACHE_MAX = 64
+
+
+def _cached_json(key, version, build):
+    """
+    polling용 JSON 응답을 version 단위로 캐시.
+    - ETag는 version 그대로라서 If-None-Match가 맞으면 body 없이 304
+    - version이 그대로면 build()/직렬화 없이 캐시된 body를 재사용
+    version은 새 알림 / 로그 추가 때만 바뀌므로 조용한 현장에서는 거의 매번 304가 된다.
+    """
+    tag = str(version)
+    headers = {"ETag": f'"{tag}"', "Cache-Control": "no-cache"}
+    if request.if_none_match.contains(tag):
+        return Response(status=304, headers=headers)
+
+    with _json_cache_lock:
+        hit = _json_cache.get(key)
+        if hit is not None and hit[0] == version:
+            _json_cache.move_to_end(key)
+            return Response(hit[1], mimetype="application/json", headers=headers)
+
+    body = app.json.dumps(build())
+    with _json_cache_lock:
+        _json_cache[key] = (version, body)
+        _json_cache.move_to_end(key)
+        while len(_json_cache) > JSON_CACHE_MAX:
+            _json_cache.popitem(last=False)
+    return Response(body, mimetype="application/json", headers=headers)
+
+
+@app.route("/get_alert")
+def get_alert():
+    """?device= 를 주면 그 장치의 최근 알림, 없으면 전체 장치 중 가장 최근 알림."""
+    device = request.args.get("device")
+    return _cached_json(f"alert:{device}", f"{fleet.epoch}-{fleet.alert_version()}",
+                        lambda: fleet.latest(device) or {})
+
+
+
+# ===========================================================
+# 4) CSV 파일 그대로 제공 API
+# ===========================================================
+CSV_PATH = "safety_log.csv"
+CSV_CHUNK = 64 * 1024
+
+
+def _gzip_chunks(path, size):
+    """파일 앞 size 바이트를 CSV_CHUNK 단위로 읽으면서 gzip 압축해서 흘려보냄."""
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)   # wbits=31 → gzip 헤더
+    with open(path, "rb") as f:
+        left = size
+        while left > 0:
+            chunk = f.read(min(CSV_CHUNK, left))
+            if not chunk:
+                break
+            left -= len(chunk)
+            out = z.compress(chunk)
+            if out:
+                yield out
+    yield z.flush()
+
+
+def _send_csv(as_attachment):
+    """
+    CSV를 메모리에 통째로 올리지 않고 청크 단위로 전송.
+    - Accept-Encoding: gzip 이고 Range 요청이 아니면 gzip 스트림
+    - 그 외에는 send_file(conditional) → Range(206) / If-Modified-Since 지원
+    """
+    try:
+        size = os.path.getsize(CSV_PATH)
+    except OSError:
+        return "CSV file not found", 404
+
+    gz = "gzip" in request.headers.get("Accept-Encoding", "") and request.range is None
+    if not gz:
+        return send_file(CSV_PATH, mimetype="text/csv", as_attachment=as_attachment,
+                         download_name="safety_log.csv", conditional=True)
+
+    headers = {"Content-Encoding": "gzip", "Vary": "Accept-Encoding"}
+    if as_attachment:
+        headers["Content-Disposition"] = "attachment; filename=safety_log.csv"
+    return Response(_gzip_chunks(CSV_PATH, size), mimetype="text/csv", headers=headers)
+
+
+@app.route("/get_csv")
+def get_csv():
+    return _send_csv(as_attachment=False)
+
+
+
+# ===========================================================
+# 5) CSV 테이블 페이지 (/logs)
+# ===========================================================
+LOGS_HEAD = """
+    <html><head>
+    <meta charset="utf-8"><title>Smart Safety Log</title>
+    <style>
+        body { font-family: Arial; padding: 20px; }
+        table { border-collapse: collapse; width: 100%; }
+        th, td { border:1px solid #999; padding: 8px; text-align:center; }
+        th { background:#eee; }
+        tr:nth-child(even){ background:#f9f9f9; }
+    </style>
+    </head><body>
+    <h2>📒 Smart Safety Log</h2>
+    <form method="get">
+        from <input name="from" value="{frm}" placeholder="YYYY-mm-dd HH:MM:SS">
+        to <input name="to" value="{to}" placeholder="YYYY-mm-dd HH:MM:SS">
+        <input type="hidden" name="limit" value="{limit}">
+        <button>조회</button>
+    </form>
+    <table><tr>
+    """
+
+
+def _logs_html(f, header, start, frm, to, limit):
+    """/logs 페이지를 한 줄씩 만들어서 흘려보내는 generator."""
+    yield LOGS_HEAD.replace("{frm}", escape(frm)).replace("{to}", escape(to)).replace("{limit}", str(limit))
+    yield "".join(f"<th>{escape(h)}</th>" for h in header) + "</tr>"
+
+    to_key = to.encode("utf-8") if to else None
+    pos, n, done = start, 0, True
+    try:
+        f.seek(start)
+        while True:
+            line = f.readline()
+            if not line or not line.endswith(b"\n"):
+                break               # 끝 or 아직 쓰는 중인 줄
+            if to_key is not None and line.split(b",", 1)[0][:len(to_key)] > to_key:
+                break
+            if n >= limit:
+                done = False
+                break
+            pos += len(line)
+            n += 1
+            row = next(csv.reader([line.decode("utf-8", errors="replace")]), [])
+            yield "<tr>" + "".join(f"<td>{escape(c)}</td>" for c in row) + "</tr>\n"
+    finally:
+        f.close()
+
+    yield "</table><br>"
+    if not done:
+        q = urlencode({"after": pos, "to": to, "limit": limit})
+        yield f'<a href="/logs?{escape(q)}">다음 {limit}개 ▶</a> &nbsp; '
+    yield """
+    <a href="/download_csv">📥 CSV 다운로드</a>
+    </body></html>
+    """
+
+
+@app.route("/logs")
+def logs_page():
+    """
+    ?from= / ?to= 시간 범위, ?limit= 페이지 크기, ?after= 다음 페이지 byte cursor.
+    from은 시간순 정렬을 이용해 이분 탐색으로 바로 찾아가고,
+    HTML은 한 번에 만들지 않고 row 단위로 스트리밍한다.
+    """
+    frm = request.args.get("from", "")
+    to = request.args.get("to", "")
+    limit = max(1, min(request.args.get("limit", 200, type=int), 5000))
+
+    try:
+        f = open(CSV_PATH, "rb")
+    except FileNotFoundError:
+        f = io.BytesIO(b"time,helmet,vest,final\n")
+    try:
+        header = next(csv.reader([f.readline().decode("utf-8-sig", errors="replace")]), [])
+        after = request.args.get("after", type=int)
+        if after is not None:
+            start = max(f.tell(), after)
+        elif frm:
+            start = seek_time(f, frm)
+        else:
+            start = f.tell()
+    except BaseException:
+        f.close()
+        raise
+
+    resp = Response(stream_with_context(_logs_html(f, header, start, frm, to, limit)),
+                    mimetype="text/html")
+    # generator가 한 번도 안 돌고 끝나면(첫 chunk 전에 끊김) finally가 안 불리므로 응답 닫을 때도 닫음
+    resp.call_on_close(f.close)
+    return resp
+
+
+
+# ===========================================================
+# 6) CSV 다운로드
+# ===========================================================
+@app.route("/download_csv")
+def download_csv():
+    return _send_csv(as_attachment=True)
+
+
+
+# ===========================================================
+# 7) 그래프 포함 Dashboard 페이지
+# ===========================================================
+@app.route("/dashboard")
+def dashboard():
+
+    html = """
+    <html>
+    <head>
+        <meta charset="utf-8">
+        <title>Smart Safety Dashboard</title>
+        <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
+
+        <style>
+            body { font-family: Arial; padding: 20px; }
+
+            .card {
+                border: 1px solid #ccc;
+                padding: 15px;
+                border-radius: 10px;
+                width: 300px;
+                margin-bottom: 20px;
+            }
+
+            .safe { background-color: #dfffd8; }
+            .warning { background-color: #fff5cc; }
+            .danger { background-color: #ffd1d1; }
+
+            table {
+                width: 100%;
+                border-collapse: collapse;
+                margin-top: 20px;
+            }
+            th, td {
+                border: 1px solid #999;
+                padding: 8px;
+                text-align: center;
+            }
+            th { background: #f2f2f2; }
+
+        </style>
+    </head>
+
+    <body>
+
+        <h1>📊 Smart Safety Dashboard</h1>
+
+        <!-- 상태 카드 -->
+        <div id="status_card" class="card">
+            <h3>⏱ 시간: <span id="latest_time">-</span></h3>
+            <p>🪖 헬멧: <span id="latest_helmet">-</span></p>
+            <p>🦺 조끼: <span id="latest_vest">-</span></p>
+            <p>⚠ 상태: <span id="latest_final">-</span></p>
+        </div>
+
+        <!-- 그래프 -->
+        <h2>상태 그래프</h2>
+        <canvas id="chart" width="400" height="200"></canvas>
+
+        <h2>시간대별 추이</h2>
+        <select id="range">
+            <option value="3600">최근 1시간</option>
+            <option value="86400">최근 1일</option>
+            <option value="604800">최근 7일</option>
+            <option value="2592000">최근 30일</option>
+        </select>
+        <canvas id="history" width="400" height="200"></canvas>
+
+        <!-- 로그 테이블 -->
+        <h2>최근 로그</h2>
+        <table>
+            <tr>
+                <th>Time</th>
+                <th>Helmet</th>
+                <th>Vest</th>
+                <th>Final</th>
+            </tr>
+            <tbody id="log_table"></tbody>
+        </table>
+
+        <script>
+
+            let chart = null;
+            let cursor = null;
+            let rows = [];
+
+            function applyDashboard(data) {
+
+                    // -------------------------
+                    // 최신 상태 카드 업데이트
+                    // -------------------------
+                    document.getElementById("latest_time").innerText = data.latest.time;
+                    document.getElementById("latest_helmet").innerText = data.latest.helmet;
+                    document.getElementById("latest_vest").innerText = data.latest.vest;
+                    document.getElementById("latest_final").innerText = data.latest.final;
+
+                    const card = document.getElementById("status_card");
+                    card.className = "card " +
+                        (data.latest.final === "SAFE" ? "safe"
+                         : data.latest.final === "WARNING" ? "warning"
+                         : "danger");
+
+                    // -------------------------
+                    // 그래프 업데이트
+                    // -------------------------
+                    let count = data.count;
+
+                    if (chart === null) {
+                        const ctx = document.getElementById("chart").getContext("2d");
+                        chart = new Chart(ctx, {
+                            type: "bar",
+                            data: {
+                                labels: ["SAFE", "WARNING", "DANGER"],
+                                datasets: [{
+                                    label: "Count",
+                                    data: [count.SAFE, count.WARNING, count.DANGER],
+                                    backgroundColor: ["#66dd66", "#ffdd55", "#ff6666"]
+                                }]
+                            }
+                        });
+                    } else {
+                        chart.data.datasets[0].data = [
+                            count.SAFE, count.WARNING, count.DANGER
+                        ];
+                        chart.update();
+                    }
+
+
+                    // -------------------------
+                    // 로그 테이블 업데이트
+                    // -------------------------
+                    // cursor 이후 새 row만 받아서 뒤에 붙임 (reset이면 전체 교체)
+                    // push/poll 타이밍 차이로 앞부분이 겹치면 겹친 만큼 버리고,
+                    // 중간이 비면 전체를 다시 받는다.
+                    if (data.reset || cursor === null) {
+                        rows = data.logs;
+                    } else if (data.since <= cursor) {
+                        if (data.cursor <= cursor) return;
+                        rows = rows.concat(data.logs.slice(cursor - data.since));
+                    } else {
+                        cursor = null;
+                        updateDashboard();
+                        return;
+                    }
+                    rows = rows.slice(-100);
+                    cursor = data.cursor;
+
+                    let html = "";
+                    for (let row of rows) {
+                        html += `
+                            <tr>
+                                <td>${row.time}</td>
+                                <td>${row.helmet}</td>
+                                <td>${row.vest}</td>
+                                <td>${row.final}</td>
+                            </tr>
+                        `;
+                    }
+                    document.getElementById("log_table").innerHTML = html;
+            }
+
+            function updateDashboard() {
+                const url = cursor === null ? "/dashboard_data" : "/dashboard_data?since=" + cursor;
+                fetch(url)
+                .then(r => r.json())
+                .then(applyDashboard);
+            }
+
+            // EventSource가 되면 /stream push로 받고, 안 되면 1초마다 polling
+            let poller = null;
+            function startPolling() {
+                if (poller !== null) return;
+                poller = setInterval(updateDashboard, 1000);
+                updateDashboard();
+            }
+
+            // -------------------------
+            // 시간대별 추이 (/history, 1분마다)
+            // -------------------------
+            let history = null;
+            function updateHistory() {
+                const span = document.getElementById("range").value;
+                fetch("/history?span=" + span + "&points=120")
+                .then(r => r.json())
+                .then(data => {
+                    const labels = data.points.map(p => p.time);
+                    const sets = ["SAFE", "WARNING", "DANGER"].map((k, i) => ({
+                        label: k,
+                        data: data.points.map(p => p[k]),
+                        borderColor: ["#66dd66", "#ffdd55", "#ff6666"][i],
+                        fill: false,
+                        pointRadius: 0
+                    }));
+                    if (history === null) {
+                        const ctx = document.getElementById("history").getContext("2d");
+                        history = new Chart(ctx, { type: "line", data: { labels: labels, datasets: sets } });
+                    } else {
+                        history.data.labels = labels;
+                        history.data.datasets = sets;
+                        history.update();
+                    }
+                });
+            }
+            document.getElementById("range").onchange = updateHistory;
+            setInterval(updateHistory, 60000);
+            updateHistory();
+
+            if (window.EventSource) {
+                const es = new EventSource("/stream?topics=log");
+                es.addEventListener("log", e => applyDashboard(JSON.parse(e.data)));
+                es.onerror = () => {
+                    if (es.readyState === EventSource.CLOSED) startPolling();
+                };
+            } else {
+                startPolling();
+            }
+
+        </script>
+
+    </body>
+    </html>
+    """
+
+    return html
+
+
+
+def _dashboard_payload(since=None):
+    """
+    since(cursor) 이후 row만 담은 dashboard 데이터.
+    파일 전체를 다시 읽지 않고 LogTail이 새로 붙은 줄만 읽어서 반영.
+    """
+    log_tail.poll()
+    last, count, cursor, logs, reset = log_tail.view(since)
+
+    # 최신 상태 결정
+    if last:
+        latest_info = {
+            "time": last["time"],
+            "helmet": last["helmet"],
+            "vest": last["vest"],
+            "final": last["final"],
+        }
+    else:
+        latest_info = {
+            "time": "-",
+            "helmet": "-",
+            "vest": "-",
+            "final": "-"
+        }
+
+    return {
+        "latest": latest_info,
+        "count": count,
+        "logs": logs,  # 최근 100개 중 cursor 이후분
+        "since": since,
+        "cursor": cursor,
+        "reset": reset,
+    }
+
+
+@app.route("/dashboard_data")
+def dashboard_data():
+    since = request.args.get("since", type=int)
+    log_tail.poll()
+    return _cached_json(f"dash:{since}", log_tail.version(),
+                        lambda: _dashboard_payload(since))
+
+
+
+@app.route("/history")
+def history():
+    """
+    상태별 개수 시계열.
+      start / end : "YYYY-mm-dd HH:MM:SS" (end 기본값: 마지막 로그 시각)
+      span        : start 대신 end로부터의 길이(초), 기본 3600
+      points      : 최대 포인트 수 (기본 200, 상한 1000)
+      res         : minute / hour / day 중 최소 해상도
+    미리 집계된 버킷만 합산하므로 한 달 조회도 한 시간 조회와 비용이 같다.
+    """
+    log_tail.poll()
+    try:
+        if request.args.get("end"):
+            end = parse_time(request.args["end"])
+        else:
+            end = (rollups.newest if rollups.newest is not None else parse_time(time.strftime("%Y-%m-%d %H:%M:%S"))) + 1
+        if request.args.get("start"):
+            start = parse_time(request.args["start"])
+        else:
+            start = end - request.args.get("span", 3600, type=int)
+    except ValueError:
+        return jsonify({"error": "time format must be YYYY-mm-dd HH:MM:SS"}), 400
+    if end <= start:
+        return jsonify({"error": "end must be after start"}), 400
+
+    res = request.args.get("res")
+    if res not in (None, "minute", "hour", "day"):
+        return jsonify({"error": "res must be minute, hour or day"}), 400
+
+    data = rollups.series(start, end, request.args.get("points", 200, type=int), res)
+    data["start"] = format_time(start)
+    data["end"] = format_time(end)
+    return jsonify(data)
+
+
+
+# ===========================================================
+# 8) 실시간 push 스트림 (Server-Sent Events)
+# ===========================================================
+_pump_started = False
+_pump_lock = threading.Lock()
+
+
+_last_pushed = None
+
+
+def _push_alert(latest):
+    """같은 알림을 두 번 push하지 않도록 마지막으로 보낸 것과 비교."""
+    global _last_pushed
+    if latest is not None and latest != _last_pushed:
+        _last_pushed = latest
+        hub.publish("alert", latest)
+
+
+def _log_pump():
+    """
+    구독자가 있을 때만 로그 파일을 따라가면서 새 row를 "log" 이벤트로 push.
+    상태 저장소를 여러 워커가 공유하면 다른 워커가 받은 알림도 여기서 push.
+    """
+    cursor = None
+    version = None
+    while True:
+        time.sleep(LOG_PUMP_S)
+        if not hub.clients():
+            continue
+        payload = _dashboard_payload(cursor)
+        if payload["cursor"] != cursor:
+            hub.publish("log", payload)
+            cursor = payload["cursor"]
+        if fleet.shared and fleet.version() != version:
+            version = fleet.version()
+            _push_alert(fleet.latest())
+
+
+def _ensure_pump():
+    global _pump_started
+    with _pump_lock:
+        if not _pump_started:
+            threading.Thread(target=_log_pump, daemon=True).start()
+            _pump_started = True
+
+
+@app.route("/stream")
+def stream():
+    """
+    ?topics=alert,log 로 받을 이벤트 종류 선택 (기본: 전부).
+    접속 직후 현재 상태 스냅샷을 먼저 보내고, 이후엔 변경분만 push.
+    """
+    topics = [t for t in request.args.get("topics", "").split(",") if t]
+    q = hub.subscribe(topics)
+    if q is None:
+        return "too many stream clients", 503
+    _ensure_pump()
+
+    initial = []
+    latest = fleet.latest()
+    if (not topics or "alert" in topics) and latest is not None:
+        initial.append(hub.format("alert", latest))
+    if not topics or "log" in topics:
+        initial.append(hub.format("log", _dashboard_payload(None)))
+
+    return Response(
+        hub.stream(q, initial),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+
+
+# ===========================================================
+# 9) 실시간 영상 (MJPEG)
+# ===========================================================
+@app.route("/video_feed")
+def video_feed():
+    """
+    main.py가 shared memory 슬롯에 덮어쓰는 최신 annotated 프레임을 MJPEG으로 전송.
+    JPEG 인코딩은 시청자 수와 상관없이 프레임당 한 번, 시청자가 있을 때만 한다.
+    """
+    return Response(mjpeg.stream(), mimetype="multipart/x-mixed-replace; boundary=frame")
+
+
+
+# ===========================================================
+# 10) 서버 실행 (항상 가장 마지막에 있어야 함)
+# ===========================================================
+def _shutdown():
+    """열려 있는 SSE / MJPEG 스트림을 끝내서 워커가 바로 내려갈 수 있게 함."""
+    hub.close()
+    mjpeg.close()
+
+
+def _serve_waitress(host, port, threads):
+    try:
+        from waitress import create_server
+    except ImportError:
+        sys.exit("--prod 는 waitress가 필요합니다: pip install waitress")
+
+    srv = create_server(app, host=host, port=port, threads=threads,
+                        channel_timeout=60, connection_limit=1000)
+
+    def _stop(signum, frame):
+        _shutdown()
+        raise KeyboardInterrupt   # waitress run()이 잡아서 task dispatcher를 정리함
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    print(f"[SERVER] waitress http://{host}:{port} threads={threads}")
+    srv.run()
+    srv.close()
+
+
+def _serve_gunicorn(host, port, threads, workers):
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        sys.exit("--workers > 1 은 gunicorn이 필요합니다: pip install gunicorn")
+
+    def post_worker_init(worker):
+        # SIGTERM을 받으면 먼저 스트림을 닫고 gunicorn 기본 graceful 종료로 넘김
+        orig = worker.handle_exit
+
+        def handle_exit(signum, frame):
+            _shutdown()
+            orig(signum, frame)
+        signal.signal(signal.SIGTERM, handle_exit)
+
+    class _App(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{host}:{port}")
+            self.cfg.set("workers", workers)
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("threads", threads)
+            self.cfg.set("graceful_timeout", 10)
+            self.cfg.set("timeout", 60)
+            self.cfg.set("keepalive", 5)
+            self.cfg.set("post_worker_init", post_worker_init)
+
+        def load(self):
+            return app
+
+    print(f"[SERVER] gunicorn http://{host}:{port} workers={workers} threads={threads}")
+    _App().run()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Smart Safety 웹 서버")
+    ap.add_argument("--host", default=SERVER_CFG.get("host", "0.0.0.0"))
+    ap.add_argument("--port", type=int, default=SERVER_CFG.get("port", 5000))
+    ap.add_argument("--prod", action="store_true",
+                    help="개발 서버 대신 waitress(워커 1개) / gunicorn(워커 여러 개)로 실행")
+    ap.add_argument("--threads", type=int, default=SERVER_CFG.get("threads", 16))
+    ap.add_argument("--workers", type=int, default=SERVER_CFG.get("workers", 1))
+    args = ap.parse_args()
+
+    if not args.prod:
+        app.run(host=args.host, port=args.port, threaded=True)
+    elif args.workers > 1:
+        # 워커끼리 알림 상태를 공유해야 하므로 SQLite 저장소로 전환 (워커가 import할 때 적용)
+        global fleet
+        os.environ["SMART_SAFETY_STORE"] = "sqlite"
+        fleet = _make_fleet()
+        _serve_gunicorn(args.host, args.port, args.threads, args.workers)
+    else:
+        _serve_waitress(args.host, args.port, args.threads)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+
+
+# ---------------------------------------
+#   프레임마다 찍히는 로그용 logging 설정
+#   - 메시지 key별 rate limit + "N번 반복" 집계
+#   - QueueHandler로 넘기고 포맷/출력은 리스너 스레드에서 처리
+# ---------------------------------------
+DEFAULT_FORMAT = "%(asctime)s %(levelname)s [%(name)s] %(message)s"
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    같은 key의 메시지는 interval 초에 한 번만 통과시킨다.
+    key는 extra={"key": ...}로 지정하고, 없으면 포맷 전 msg 문자열을 그대로 쓴다.
+    막힌 개수는 다음에 통과하는 레코드의 repeated 속성에 실어 보낸다.
+    """
+
+    def __init__(self, interval=1.0, clock=time.monotonic):
+        super().__init__()
+        self.interval = float(interval)
+        self.clock = clock
+        self._last = {}        # key -> 마지막 통과 시각
+        self._dropped = {}     # key -> 그 사이 막힌 개수
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.interval <= 0 or record.levelno >= logging.WARNING:
+            record.repeated = 0
+            return True
+
+        key = getattr(record, "key", None) or record.msg
+        now = self.clock()
+        with self._lock:
+            last = self._last.get(key)
+            if last is not None and now - last < self.interval:
+                self._dropped[key] = self._dropped.get(key, 0) + 1
+                return False
+            self._last[key] = now
+            record.repeated = self._dropped.pop(key, 0)
+        return True
+
+
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    기본 QueueHandler.prepare()는 호출한 스레드에서 메시지를 포맷한다.
+    같은 프로세스 안의 큐라 그럴 필요가 없으므로 레코드를 그대로 넘긴다.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class _RepeatFormatter(logging.Formatter):
+    def format(self, record):
+        s = super().format(record)
+        n = getattr(record, "repeated", 0)
+        if n:
+            s += f" (same message repeated {n} times)"
+        return s
+
+
+def setup_logging(log_cfg=None):
+    """
+    config.yaml의 logging 섹션으로 root logger를 설정하고 QueueListener를 리턴.
+    종료할 때 listener.stop()을 불러 남은 로그를 flush 한다.
+    """
+    log_cfg = log_cfg or {}
+    level = getattr(logging, str(log_cfg.get("level", "INFO")).upper(), logging.INFO)
+
+    out = logging.StreamHandler(sys.stdout)
+    out.setFormatter(_RepeatFormatter(log_cfg.get("format", DEFAULT_FORMAT)))
+
+    q = queue.SimpleQueue()
+    qh = _LazyQueueHandler(q)
+    qh.addFilter(RateLimitFilter(log_cfg.get("rate_limit_s", 1.0)))
+
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.addHandler(qh)
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(q, out, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,327 @@
+"""
+main.py 장시간 soak 모드.
+
+    python main.py --soak 8                          # synth 장면으로 8시간
+    python main.py --soak 2 --source records/a.ssdr  # 녹화 detection 반복 재생
+    python main.py --soak 0.1 --soak-interval 10     # 짧게 확인
+    python main.py --soak 1 --soak-dir soak_out      # 출력 파일을 남겨서 볼 때
+
+카메라 / 모델 / GPIO / 블루투스 대신 가짜 소스를 끼워서 main loop를 쉬지 않고 돌리고,
+interval마다 RSS, tracemalloc 상위 할당 위치, 열린 fd 수, 스레드 수,
+단계별 latency(p50/p99, 그 구간만)를 샘플링한다.
+끝나면 soak_report.json 에 샘플 전체와 drift 판정을 저장하고 요약을 출력한다.
+
+실제 설치 상태는 건드리지 않는다 (isolate): CSV / 녹화 / 블랙박스 / 클립은 --soak-dir
+(기본: 임시 디렉터리) 아래에 쓰고, 스트림 슬롯은 별도 shm 이름, /metrics는 빈 포트(127.0.0.1),
+서버 전송은 NullUplink로 버린다. 나머지 경로는 실제와 똑같이 돈다.
+"""
+import copy
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from itertools import cycle
+
+import numpy as np
+
+import synth
+from infer_yolo import BaseDetector
+from metrics import quantile
+
+log = logging.getLogger("soak")
+
+# drift 판정 기준: (지표 이름 접두사, 비교 방식, 한도, 최소 절대 변화량)
+#   ratio: 끝 구간 / 시작 구간 - 1 이 한도 초과,  delta: 끝 - 시작 이 한도 이상
+#   최소 절대 변화량은 µs 단위 stage의 흔들림을 drift로 잡지 않기 위한 것
+DRIFT_LIMITS = (
+    ("rss_mb", "ratio", 0.10, 5.0),
+    ("traced_mb", "ratio", 0.10, 1.0),
+    ("fds", "delta", 2, 0),
+    ("threads", "delta", 1, 0),
+    ("p50_ms.", "ratio", 0.20, 0.5),
+    ("p99_ms.", "ratio", 0.30, 2.0),
+)
+
+
+# ---------------------------------------
+#   하드웨어 대신 쓰는 소스
+# ---------------------------------------
+class SyntheticCamera:
+    def __init__(self, width, height):
+        self.frame = np.full((height, width, 3), 96, np.uint8)
+
+    def read(self):
+        return self.frame.copy()      # 실제 카메라처럼 매 프레임 새 배열
+
+    def close(self):
+        pass
+
+
+class NullBoard:
+    def led_on(self): pass
+    def led_off(self): pass
+    def buzz_on(self): pass
+    def buzz_off(self): pass
+
+
+class NullAdmin:
+    def send_state(self, unsafe):
+        pass
+
+
+class NullUplink:
+    """AlertBatcher 대신: 가짜 알림이 실제 서버에 실제 device id로 올라가지 않게 개수만 센다."""
+
+    def __init__(self):
+        self._q = deque()        # uplink_queue_depth gauge용 (항상 비어 있음)
+        self.sent = 0
+
+    def send(self, alert_type, ts=None):
+        self.sent += 1
+
+    def close(self, flush_timeout=2.0):
+        pass
+
+
+def isolate(cfg, workdir):
+    """
+    soak용 설정 사본: 파일 출력은 workdir 아래로, 스트림 shm은 별도 이름으로,
+    metrics는 127.0.0.1 빈 포트로. 실제 파이프라인이 같은 장비에서 돌고 있어도 겹치지 않는다.
+    """
+    cfg = copy.deepcopy(cfg)
+    os.makedirs(workdir, exist_ok=True)
+
+    stream = cfg.setdefault("stream", {}) or {}
+    cfg["stream"] = stream
+    stream["shm_name"] = f"{stream.get('shm_name', 'smart_safety_frame')}_soak_{os.getpid()}"
+
+    rec = cfg.get("record") or {}
+    if rec.get("path"):
+        rec["path"] = os.path.join(workdir, os.path.basename(rec["path"]))
+    bb = cfg.get("blackbox") or {}
+    if bb.get("path"):
+        bb["path"] = os.path.join(workdir, os.path.basename(bb["path"]))
+    clips = cfg.get("clips") or {}
+    if clips:
+        clips["dir"] = os.path.join(workdir, "clips")
+
+    m = cfg.setdefault("metrics", {}) or {}
+    cfg["metrics"] = m
+    m["port"] = 0
+    m["host"] = "127.0.0.1"
+    return cfg
+
+
+class SourceDetector(BaseDetector):
+    """미리 정해진 detection 시퀀스를 돌려주는 detector (frame은 무시)."""
+
+    def __init__(self, names, dets_iter):
+        self.names = names
+        self._it = dets_iter
+
+    def infer(self, frame_bgr):
+        return next(self._it)
+
+
+def build_source(spec, cam_cfg, seed=0):
+    """spec: "synth" / "synth:<scene>" / .ssdr 경로 → (camera, detector)"""
+    cam = SyntheticCamera(cam_cfg["width"], cam_cfg["height"])
+    if spec.startswith("synth"):
+        scene = spec.partition(":")[2] or "group"
+        return cam, SourceDetector(synth.NAMES, synth.frames(seed, scene))
+
+    from replay import load
+    names, _, _, frames = load(spec)
+    if not frames:
+        raise ValueError(f"empty recording: {spec}")
+    return cam, SourceDetector(names, cycle([d for _, d in frames]))
+
+
+# ---------------------------------------
+#   샘플링
+# ---------------------------------------
+def _rss_mb():
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    import resource       # /proc 없는 환경: 최대 RSS로 대신
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _fd_count():
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return -1
+
+
+class SoakMonitor:
+    def __init__(self, registry, duration_s, interval_s=60.0, top=10, trace=True):
+        self.registry = registry
+        self.duration_s = duration_s
+        self.interval_s = interval_s
+        self.top = top
+        self.trace = trace
+        self.samples = []
+        self._t0 = time.time()
+        self._prev = {}               # stage -> 직전 버킷 카운트
+        self._base_snap = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.trace and not tracemalloc.is_tracing():
+            tracemalloc.start(1)
+        self._t0 = time.time()
+        self._thread = threading.Thread(target=self._run, name="soak-monitor", daemon=True)
+        self._thread.start()
+        log.info("[SOAK] %.2fh, sample every %.0fs", self.duration_s / 3600.0, self.interval_s)
+
+    def done(self):
+        return time.time() - self._t0 >= self.duration_s
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.sample()                 # 마지막 구간
+        if self.trace:
+            tracemalloc.stop()
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            self.sample()
+
+    def _snapshot(self):
+        snap = tracemalloc.take_snapshot()
+        return snap.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),          # 샘플 기록 자체
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+    def sample(self):
+        s = {
+            "t": round(time.time() - self._t0, 1),
+            "rss_mb": round(_rss_mb(), 2),
+            "fds": _fd_count(),
+            "threads": threading.active_count(),
+        }
+
+        # 단계별 latency: 누적 히스토그램에서 직전 샘플과의 차이만
+        with self.registry._lock:
+            stages = dict(self.registry.stages)
+        for name, h in sorted(stages.items()):
+            cur = h.snapshot()
+            prev = self._prev.get(name) or [0] * len(cur)
+            delta = [a - b for a, b in zip(cur, prev)]
+            self._prev[name] = cur
+            if sum(delta):
+                s[f"p50_ms.{name}"] = round(quantile(h.bounds, delta, 0.5) * 1000, 4)
+                s[f"p99_ms.{name}"] = round(quantile(h.bounds, delta, 0.99) * 1000, 4)
+                s[f"n.{name}"] = sum(delta)
+
+        if self.trace and tracemalloc.is_tracing():
+            s["traced_mb"] = round(tracemalloc.get_traced_memory()[0] / 2**20, 3)
+            snap = self._snapshot()
+            if self._base_snap is None:
+                self._base_snap = snap
+            else:
+                s["top_growth"] = [
+                    {"where": str(st.traceback[0]), "size_kb": round(st.size_diff / 1024, 1),
+                     "count": st.count_diff}
+                    for st in snap.compare_to(self._base_snap, "lineno")[:self.top]
+                    if st.size_diff > 0
+                ]
+
+        self.samples.append(s)
+        log.info("[SOAK] t=%ss rss=%.1fMB fds=%s threads=%s frame_p99=%sms",
+                 s["t"], s["rss_mb"], s["fds"], s["threads"], s.get("p99_ms.frame", "-"))
+        return s
+
+    # ---------------------------------------
+    #   drift 판정
+    # ---------------------------------------
+    def drift(self, warmup=0.1):
+        """
+        첫 warmup 비율의 샘플은 버리고(import / 캐시 채우기), 남은 샘플을 3등분해서
+        시작 1/3 과 끝 1/3 의 median을 비교한다. 기울기는 시간당 최소제곱 기울기.
+        """
+        rows = self.samples[int(len(self.samples) * warmup):]
+        if len(rows) < 3:
+            return {}
+        keys = sorted({k for r in rows for k, v in r.items() if isinstance(v, (int, float)) and k != "t"
+                       and not k.startswith("n.")})
+        third = max(1, len(rows) // 3)
+        out = {}
+        for k in keys:
+            pts = [(r["t"], r[k]) for r in rows if k in r]
+            if len(pts) < 3:
+                continue
+            start = _median([v for _, v in pts[:third]])
+            end = _median([v for _, v in pts[-third:]])
+            d = {"start": start, "end": end, "slope_per_h": round(_slope(pts) * 3600, 4), "flag": False}
+            for prefix, mode, limit, min_abs in DRIFT_LIMITS:
+                if not k.startswith(prefix):
+                    continue
+                d["mode"] = mode
+                if mode == "ratio":
+                    d["growth"] = round(end / start - 1.0, 4) if start > 0 else 0.0
+                    d["flag"] = d["growth"] > limit and end - start >= min_abs and d["slope_per_h"] > 0
+                else:
+                    d["growth"] = end - start
+                    d["flag"] = d["growth"] >= limit
+                break
+            out[k] = d
+        return out
+
+    def report(self, path="soak_report.json"):
+        drift = self.drift()
+        flagged = sorted(k for k, d in drift.items() if d["flag"])
+        last_top = next((s["top_growth"] for s in reversed(self.samples) if s.get("top_growth")), [])
+        rep = {
+            "duration_s": round(time.time() - self._t0, 1),
+            "interval_s": self.interval_s,
+            "flagged": flagged,
+            "drift": drift,
+            "top_growth": last_top,
+            "samples": self.samples,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(rep, f, indent=2)
+
+        print(f"\n[SOAK] {rep['duration_s'] / 3600:.2f}h, {len(self.samples)} samples -> {path}")
+        print(f"{'metric':<28} {'start':>10} {'end':>10} {'slope/h':>10} {'growth':>8}")
+        for k, d in drift.items():
+            g = d.get("growth")
+            gs = "" if g is None else (f"{g:+.1%}" if d["mode"] == "ratio" else f"{g:+g}")
+            print(f"{k:<28} {d['start']:>10.3f} {d['end']:>10.3f} {d['slope_per_h']:>10.3f} {gs:>8}"
+                  f"{'  DRIFT' if d['flag'] else ''}")
+        if last_top:
+            print("top allocation growth since first sample:")
+            for t in last_top[:5]:
+                print(f"  {t['size_kb']:>10.1f} KB  {t['count']:>+7d}  {t['where']}")
+        print("no drift detected" if not flagged else f"DRIFT: {', '.join(flagged)}")
+        return rep
+
+
+def _median(xs):
+    xs = sorted(xs)
+    n = len(xs)
+    return xs[n // 2] if n % 2 else (xs[n // 2 - 1] + xs[n // 2]) / 2.0
+
+
+def _slope(pts):
+    n = len(pts)
+    mx = sum(t for t, _ in pts) / n
+    my = sum(v for _, v in pts) / n
+    den = sum((t - mx) ** 2 for t, _ in pts)
+    return sum((t - mx) * (v - my) for t, v in pts) / den if den else 0.0
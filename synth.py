@@ -0,0 +1,85 @@
+import random
+
+
+# ---------------------------------------
+#   카메라 / 모델 없이 돌리기 위한 가짜 detection 생성기
+#   (벤치마크, soak 테스트용. 같은 seed면 항상 같은 결과)
+# ---------------------------------------
+NAMES = {0: "person", 1: "head_helmet", 2: "head_nohelmet", 3: "vest"}
+FRAME_W, FRAME_H = 1280, 720
+
+# 시나리오 이름 -> 사람 수
+SCENES = {
+    "empty": 0,
+    "single": 1,
+    "group": 10,
+    "crowd": 150,     # 사람+헬멧+조끼+노이즈 박스 합쳐서 수백 개
+}
+
+
+def _clip(v, lo, hi):
+    return max(lo, min(hi, v))
+
+
+def person_dets(rng, helmet_p=0.8, vest_p=0.8, w=FRAME_W, h=FRAME_H):
+    """사람 한 명 + (확률적으로) helmet / no-helmet / vest 박스."""
+    pw = rng.randint(30, 220)
+    ph = int(pw * rng.uniform(2.0, 3.0))
+    x1 = rng.randint(0, max(0, w - pw - 1))
+    y1 = rng.randint(0, max(0, h - ph - 1))
+    x2, y2 = x1 + pw, _clip(y1 + ph, 0, h - 1)
+    ph = y2 - y1
+    dets = [{"cls": 0, "conf": rng.uniform(0.4, 0.95), "box": [x1, y1, x2, y2]}]
+
+    # 머리 (사람 박스 위쪽 ~25%)
+    hx1 = x1 + int(pw * rng.uniform(0.15, 0.3))
+    hx2 = x2 - int(pw * rng.uniform(0.15, 0.3))
+    hy1 = y1 + int(ph * rng.uniform(0.0, 0.05))
+    hy2 = y1 + int(ph * rng.uniform(0.18, 0.28))
+    if hx2 > hx1 and hy2 > hy1:
+        cls = 1 if rng.random() < helmet_p else 2
+        dets.append({"cls": cls, "conf": rng.uniform(0.3, 0.95), "box": [hx1, hy1, hx2, hy2]})
+
+    # 상체 조끼
+    if rng.random() < vest_p:
+        vy1 = y1 + int(ph * rng.uniform(0.25, 0.35))
+        vy2 = y1 + int(ph * rng.uniform(0.55, 0.7))
+        dets.append({"cls": 3, "conf": rng.uniform(0.3, 0.95), "box": [x1, vy1, x2, vy2]})
+    return dets
+
+
+def noise_dets(rng, n, w=FRAME_W, h=FRAME_H):
+    """사람과 상관없는 낮은 confidence 오검출."""
+    out = []
+    for _ in range(n):
+        bw, bh = rng.randint(5, 80), rng.randint(5, 80)
+        x1, y1 = rng.randint(0, w - bw - 1), rng.randint(0, h - bh - 1)
+        out.append({"cls": rng.randint(1, 3), "conf": rng.uniform(0.01, 0.3),
+                    "box": [x1, y1, x1 + bw, y1 + bh]})
+    return out
+
+
+def scene(rng, persons, helmet_p=0.8, vest_p=0.8, noise=None):
+    dets = []
+    for _ in range(persons):
+        dets.extend(person_dets(rng, helmet_p, vest_p))
+    dets.extend(noise_dets(rng, persons // 2 if noise is None else noise))
+    rng.shuffle(dets)
+    return dets
+
+
+def frames(seed=0, scene_name="group", n=None, unsafe_p=0.2, burst=30):
+    """
+    detection 리스트를 계속 만들어내는 generator.
+    burst 프레임 단위로 safe / unsafe 구간이 바뀌어서 TemporalSmoother 전환도 같이 돈다.
+    """
+    rng = random.Random(seed)
+    persons = SCENES.get(scene_name, scene_name)
+    i = 0
+    unsafe = False
+    while n is None or i < n:
+        if i % burst == 0:
+            unsafe = rng.random() < unsafe_p
+        hp = 0.2 if unsafe else 0.98
+        yield scene(rng, persons, helmet_p=hp, vest_p=hp)
+        i += 1
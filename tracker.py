@@ -1,4 +1,4 @@
-# TODO: 간단 centroid tracker or ByteTrack 연동
-class DummyTracker:
-    def update(self, dets):
-        return dets
+# TODO: 간단 centroid tracker or ByteTrack 연동
+class DummyTracker:
+    def update(self, dets):
+        return dets
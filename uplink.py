@@ -0,0 +1,95 @@
+import logging
+import socket
+import threading
+import time
+from collections import deque
+
+import requests
+
+log = logging.getLogger("uplink")
+
+
+class AlertBatcher:
+    """
+    상태 변화 이벤트를 모아서 server.py /ingest 로 한 번에 보내는 백그라운드 전송기.
+    - send()는 큐에 넣기만 하므로 메인 루프를 막지 않는다.
+    - interval_s마다(또는 max_batch개 모이면) 전송, 보낼 게 없어도 heartbeat_s마다 빈 배치로 생존 신호.
+    - 서버가 죽어 있으면 큐는 max_queue까지만 쌓고 오래된 것부터 버린다.
+    """
+
+    def __init__(self, base_url, device_id=None, interval_s=1.0, heartbeat_s=5.0,
+                 max_batch=200, max_queue=5000, timeout=2.0):
+        self.url = base_url.rstrip("/") + "/ingest"
+        self.device_id = device_id or socket.gethostname()
+        self.interval_s = interval_s
+        self.heartbeat_s = heartbeat_s
+        self.max_batch = max_batch
+        self.timeout = timeout
+
+        self._q = deque(maxlen=max_queue)
+        self._lock = threading.Lock()        # send()와 전송 스레드가 큐를 같이 만지므로
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._session = requests.Session()   # keep-alive 재사용
+        self._last_sent = 0.0
+        self.sent = 0
+        self.failed = 0
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def send(self, alert_type, ts=None):
+        with self._lock:
+            self._q.append({"type": alert_type, "time": time.time() if ts is None else ts})
+            n = len(self._q)
+        if n >= self.max_batch:
+            self._wake.set()
+
+    def close(self, flush_timeout=2.0):
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=flush_timeout)
+
+    # ------------------------------------------------------------------
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval_s)
+            self._wake.clear()
+            stopping = self._stop.is_set()
+
+            while self._q:
+                # 보낼 묶음은 큐에서 빼서 들고 있는다. 전송 중에 큐가 넘쳐 앞쪽이 버려져도
+                # 보내지 않은 이벤트를 popleft로 지워버리는 일이 없게.
+                with self._lock:
+                    batch = [self._q.popleft() for _ in range(min(self.max_batch, len(self._q)))]
+                if not self._post(batch):
+                    self._requeue(batch)
+                    break
+
+            if not self._q and time.time() - self._last_sent > self.heartbeat_s:
+                self._post([])
+
+            if stopping:
+                return
+
+    def _requeue(self, batch):
+        """실패한 묶음을 큐 앞에 되돌림. 넘치면 지금처럼 오래된 것부터 버린다."""
+        with self._lock:
+            merged = batch + list(self._q)
+            self._q.clear()
+            self._q.extend(merged[-self._q.maxlen:] if self._q.maxlen else merged)
+
+    def _post(self, events):
+        try:
+            r = self._session.post(self.url, json={"device": self.device_id, "events": events},
+                                   timeout=self.timeout)
+            r.raise_for_status()
+        except Exception as e:
+            self.failed += 1
+            log.warning("[ALERT] Failed: %s", e)
+            return False
+        self._last_sent = time.time()
+        self.sent += len(events)
+        if events:
+            log.info("[ALERT] Sent %d event(s), last=%s", len(events), events[-1]["type"])
+        return True